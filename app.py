@@ -3,6 +3,10 @@ import yfinance as yf
 import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
+from downsampling import target_points, ohlc_buckets, PIXELS_PER_CANDLE
+
+# Width in pixels the wide layout gives the chart
+CHART_WIDTH = 1600
 
 # Page config
 st.set_page_config(
@@ -35,12 +39,13 @@ if st.sidebar.button("Analyze Stock"):
             # Display basic info
             st.subheader(f"{symbol} Stock Analysis")
             
-            # Create price chart
-            fig = go.Figure(data=[go.Candlestick(x=data.index,
-                open=data['Open'],
-                high=data['High'],
-                low=data['Low'],
-                close=data['Close'])])
+            # Create price chart, aggregating bars beyond what the page can show
+            candles = ohlc_buckets(data, target_points(CHART_WIDTH, PIXELS_PER_CANDLE))
+            fig = go.Figure(data=[go.Candlestick(x=candles.index,
+                open=candles['Open'],
+                high=candles['High'],
+                low=candles['Low'],
+                close=candles['Close'])])
             
             fig.update_layout(
                 title=f"{symbol} Stock Price",
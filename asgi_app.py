@@ -0,0 +1,388 @@
+import asyncio
+import json
+import os
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from email.utils import formatdate
+import flask_app
+from flask_app import (HISTORY_DAYS, HTML_TEMPLATE, STREAM_INTERVAL, chart_range, chart_width,
+                       compute_signal_arrays, create_chart, dashboard_payload, screen_page, screen_records,
+                       screen_request, signal_request, stream_after, with_signals)
+from data_providers import YFinanceProvider
+from instrumentation import metrics
+from live import ProviderFeed
+from streaming import StreamHub
+
+
+class Busy(Exception):
+    """Raised when the worker pool already has as many jobs as it may queue"""
+
+
+class AsyncDashboard:
+    """
+    The dashboard as an ASGI application, for production serving:
+
+        uvicorn asgi_app:app --host 0.0.0.0 --port 8000
+
+    It serves the routes and pages of flask_app.py, but its handlers are
+    coroutines on one event loop. Bar downloads are awaited through the
+    provider's ``fetch_history_async``, at most ``max_fetches`` at a time.
+    Signal, chart and screener work runs in a process pool, so a slow
+    download or a chart build never holds up other requests. At most
+    ``max_jobs`` jobs wait for the pool; a request that would queue more
+    gets a 503 straight away instead of a reply after seconds. Responses
+    share flask_app's bar-aligned cache, and concurrent misses for the same
+    page share one computation.
+
+    ``/stream`` subscribes the browser to a StreamHub for server-sent
+    chart updates. Streams are long-lived, so they count against
+    ``max_streams`` rather than the request limits and have no timeout.
+
+    Each request has ``timeout`` seconds before it is answered with a 504.
+    The download or chart it was waiting for keeps running and fills the
+    cache for the next request. Beyond ``max_pending`` requests in
+    progress, new ones are turned away with a 503 rather than queued.
+    """
+
+    def __init__(self, provider=None, workers: int = None, max_fetches: int = 32,
+                 max_pending: int = 512, max_jobs: int = None, timeout: float = 10.0, cache=None,
+                 hub: StreamHub = None, max_streams: int = 10000, keepalive: float = 15.0):
+        """
+        Args:
+            provider (DataProvider): Source of dashboard bars, defaults to yfinance
+            workers (int): Processes for signal and chart work, defaults to all
+                cores; 0 runs it in the event loop's thread pool instead
+            max_fetches (int): Downloads in flight at once
+            max_pending (int): Requests in progress before new ones get a 503
+            max_jobs (int): Jobs queued for or running in the pool before
+                new ones get a 503, defaults to 8 per worker
+            timeout (float): Seconds per request before a 504
+            cache (TTLCache): Response cache, defaults to flask_app's
+            hub (StreamHub): Source of /stream events, defaults to one fed by ``provider``
+            max_streams (int): Open streams before new ones get a 503
+            keepalive (float): Quiet seconds before a stream sends a keep-alive comment
+        """
+        self.provider = provider if provider is not None else YFinanceProvider()
+        self.workers = os.cpu_count() if workers is None else workers
+        self.max_fetches = max_fetches
+        self.max_pending = max_pending
+        self.max_jobs = max_jobs or 8 * max(1, self.workers)
+        self.timeout = timeout
+        self.cache = cache if cache is not None else flask_app.response_cache
+        self.hub = hub if hub is not None else StreamHub(ProviderFeed(self.provider, history_period='6mo'),
+                                                         interval=STREAM_INTERVAL)
+        self.max_streams = max_streams
+        self.keepalive = keepalive
+        self.streams = 0
+        self.template = flask_app.app.jinja_env.from_string(HTML_TEMPLATE)
+        self.routes = {
+            '/': self.index,
+            '/api/chart': self.api_chart,
+            '/api/signals': self.api_signals,
+            '/screen': self.screen,
+            '/cache/stats': self.cache_stats,
+            '/metrics': self.metrics,
+        }
+        self.pending = 0
+        self.jobs = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._fetches = None
+        self._pool = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        if self._fetches is None:
+            self._fetches = asyncio.Semaphore(self.max_fetches)
+
+        if scope['path'] == '/stream' and scope['method'] == 'GET':
+            await self.stream(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        handler = self.routes.get(scope['path'])
+        endpoint = handler.__name__ if handler is not None else 'unknown'
+        if handler is None:
+            response = _json(404, {'error': 'Not found'})
+        elif scope['method'] not in ('GET', 'HEAD'):
+            response = _json(405, {'error': 'Method not allowed'})
+        elif self.pending >= self.max_pending:
+            self.rejected += 1
+            response = _json(503, {'error': 'Server busy, try again'}, [('Retry-After', '1')])
+        else:
+            query = {}
+            for key, value in urllib.parse.parse_qsl(scope['query_string'].decode('latin-1')):
+                query.setdefault(key, value)
+            headers = {key.decode('latin-1').lower(): value.decode('latin-1')
+                       for key, value in scope['headers']}
+            self.pending += 1
+            try:
+                response = await asyncio.wait_for(handler(query, headers), self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                response = _json(504, {'error': 'Request timed out'})
+            except Busy:
+                self.rejected += 1
+                response = _json(503, {'error': 'Server busy, try again'}, [('Retry-After', '1')])
+            except Exception as e:
+                print(f"Error serving {scope['path']}: {str(e)}")
+                response = _json(500, {'error': 'Internal server error'})
+            finally:
+                self.pending -= 1
+
+        status, headers, body = response
+        headers = [('Content-Length', str(len(body)))] + headers
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(key.lower().encode('latin-1'), value.encode('latin-1'))
+                                for key, value in headers]})
+        await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+        if metrics.enabled:
+            metrics.observe('http_request_seconds', time.perf_counter() - start, endpoint=endpoint)
+            metrics.inc('http_requests_total', endpoint=endpoint, status=status)
+            metrics.inc('http_response_bytes_total', len(body), endpoint=endpoint)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                flask_app.enable_metrics()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def stream(self, scope, receive, send):
+        """Server-sent chart updates for a symbol, see flask_app.stream"""
+        query = dict(urllib.parse.parse_qsl(scope['query_string'].decode('latin-1')))
+        headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in scope['headers']}
+        symbol = query.get('symbol', '').upper().strip()
+        try:
+            after = stream_after(headers.get('last-event-id'), query.get('after'))
+        except ValueError:
+            symbol, error = None, _json(400, {'error': 'Invalid event id'})
+        else:
+            error = _json(400, {'error': 'No symbol given'}) if not symbol else None
+        if error is None and self.streams >= self.max_streams:
+            self.rejected += 1
+            error = _json(503, {'error': 'Server busy, try again'}, [('Retry-After', '1')])
+        if error is not None:
+            status, response_headers, body = error
+            await send({'type': 'http.response.start', 'status': status,
+                        'headers': [(key.lower().encode('latin-1'), value.encode('latin-1'))
+                                    for key, value in response_headers]})
+            await send({'type': 'http.response.body', 'body': body})
+            return
+
+        subscription = self.hub.subscribe(symbol, after, asynchronous=True)
+        self.streams += 1
+        disconnected = asyncio.ensure_future(_disconnect(receive))
+        try:
+            await send({'type': 'http.response.start', 'status': 200,
+                        'headers': [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'),
+                                    (b'x-accel-buffering', b'no')]})
+            await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+            while not (subscription.closed and subscription.queue.empty()):
+                get = asyncio.ensure_future(subscription.queue.get())
+                done, _ = await asyncio.wait({get, disconnected}, timeout=self.keepalive,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if disconnected in done:
+                    get.cancel()
+                    return
+                if get in done:
+                    frame = get.result()[1]
+                else:
+                    get.cancel()
+                    frame = b': keep-alive\n\n'
+                await send({'type': 'http.response.body', 'body': frame, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            self.streams -= 1
+            disconnected.cancel()
+            subscription.close()
+
+    # Handlers: (query, request headers) -> (status, headers, body)
+
+    async def index(self, query: dict, headers: dict) -> tuple:
+        symbol = query.get('symbol', '').upper().strip()
+        width = chart_width(query.get('width'))
+        if not symbol:
+            return _html(self.template.render(symbol='', stock_data=None, chart_data=None,
+                                              latest_signal=None, error=None))
+
+        # Identical requests within a bar share one download and chart build
+        entry = await self.cache.get_or_compute_async(('page', symbol, HISTORY_DAYS, width),
+                                                      lambda: self._page(symbol, width),
+                                                      cacheable=lambda page: page[1] is None)
+        validators = [('ETag', f'"{entry.etag}"'),
+                      ('Last-Modified', formatdate(entry.created, usegmt=True)),
+                      ('Cache-Control', f'max-age={entry.max_age()}, must-revalidate')]
+        if _etag_matches(headers, entry.etag):
+            return 304, validators, b''
+        status, response_headers, body = _html(entry.value[0])
+        return status, response_headers + validators, body
+
+    async def api_chart(self, query: dict, headers: dict) -> tuple:
+        symbol = query.get('symbol', '').upper().strip()
+        width = chart_width(query.get('width'))
+        if not symbol:
+            return _json(400, {'error': 'No symbol given'})
+        try:
+            data = await self.load_chart_data(symbol)
+        except Busy:
+            raise
+        except Exception as e:
+            print(f"Error fetching {symbol}: {str(e)}")
+            data = None
+        if data is None:
+            return _json(404, {'error': 'Error fetching data. Please try again.'})
+        try:
+            data, x_range = chart_range(data, query.get('start'), query.get('end'))
+        except ValueError:
+            return _json(400, {'error': 'Invalid range'})
+        chart = await self._run(create_chart, data, symbol, width, x_range)
+        return 200, [('Content-Type', 'application/json')], chart.encode()
+
+    async def api_signals(self, query: dict, headers: dict) -> tuple:
+        try:
+            symbols, strategy_name, params, period, interval = signal_request(query)
+        except ValueError as e:
+            return _json(400, {'error': str(e)})
+
+        key = ('signals', tuple(symbols), strategy_name, json.dumps(params, sort_keys=True), period, interval)
+        entry = await self.cache.get_or_compute_async(
+            key, lambda: self._signals(symbols, strategy_name, params, period, interval))
+        validators = [('ETag', f'"{entry.etag}"'), ('Cache-Control', f'max-age={entry.max_age()}')]
+        if _etag_matches(headers, entry.etag):
+            return 304, validators, b''
+        return _json(200, {'strategy': strategy_name, 'params': params, 'period': period,
+                           'interval': interval, 'symbols': entry.value}, validators)
+
+    async def screen(self, query: dict, headers: dict) -> tuple:
+        try:
+            strategy_name, params, interval, signal, page, per_page = screen_request(query)
+        except ValueError as e:
+            return _json(400, {'error': str(e)})
+
+        start = time.perf_counter()
+        key = ('screen', strategy_name, json.dumps(params, sort_keys=True), interval, signal)
+        entry = await self.cache.get_or_compute_async(
+            key, lambda: self._run(screen_records, strategy_name, params, interval, signal))
+        return _json(200, screen_page(entry.value, strategy_name, params, interval, signal,
+                                      page, per_page, time.perf_counter() - start))
+
+    async def cache_stats(self, query: dict, headers: dict) -> tuple:
+        return _json(200, self.cache.stats())
+
+    async def metrics(self, query: dict, headers: dict) -> tuple:
+        return (200, [('Content-Type', 'text/plain; version=0.0.4')],
+                metrics.render_prometheus().encode())
+
+    # Work behind the handlers
+
+    async def load_chart_data(self, symbol: str):
+        """Cached dashboard history with SMA/crossover signals, shared by the page and the zoom endpoint"""
+        entry = await self.cache.get_or_compute_async(('data', symbol, HISTORY_DAYS),
+                                                      lambda: self._download(symbol),
+                                                      cacheable=lambda data: data is not None)
+        return entry.value
+
+    async def _download(self, symbol: str):
+        start = datetime.now() - timedelta(days=HISTORY_DAYS)
+        async with self._fetches:
+            with metrics.timer('dashboard_stage_seconds', stage='download'):
+                data = await self.provider.fetch_history_async(symbol, '1d', start=start)
+        if data is None or data.empty:
+            return None
+        if metrics.enabled:
+            metrics.inc('fetch_bytes_total', int(data.memory_usage(index=True).sum()), provider='dashboard')
+        return await self._run(with_signals, data)
+
+    async def _page(self, symbol: str, width: int) -> tuple:
+        # (rendered page, error message or None)
+        try:
+            data = await self.load_chart_data(symbol)
+            if data is None:
+                error = "Invalid stock symbol. Please check and try again."
+            else:
+                stock_data, chart_data, latest_signal = await self._run(dashboard_payload, data, symbol, width)
+                return self.template.render(symbol=symbol, stock_data=stock_data, chart_data=chart_data,
+                                            latest_signal=latest_signal, error=None), None
+        except Busy:
+            raise
+        except Exception as e:
+            print(f"Error fetching {symbol}: {str(e)}")
+            error = "Error fetching data. Please try again."
+        return self.template.render(symbol=symbol, stock_data=None, chart_data=None,
+                                    latest_signal=None, error=error), error
+
+    async def _signals(self, symbols: list, strategy_name: str, params: dict, period: str,
+                       interval: str) -> dict:
+        # The fetcher's store, batching and rate limits are blocking, so the
+        # whole load runs in a thread, counted against the download limit
+        async with self._fetches:
+            return await asyncio.to_thread(compute_signal_arrays, symbols, strategy_name,
+                                           params, period, interval)
+
+    async def _run(self, fn, *args):
+        """Run ``fn(*args)`` in the worker pool"""
+        if self.jobs >= self.max_jobs:
+            raise Busy()
+        loop = asyncio.get_running_loop()
+        self.jobs += 1
+        try:
+            return await loop.run_in_executor(self._get_pool(), fn, *args)
+        finally:
+            self.jobs -= 1
+
+    def _get_pool(self):
+        if self.workers and self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def stats(self) -> dict:
+        """Requests in progress, pool jobs, open streams, and requests turned away when busy or timed out"""
+        return {'pending': self.pending, 'jobs': self.jobs, 'streams': self.streams,
+                'rejected': self.rejected, 'timeouts': self.timeouts}
+
+    def close(self):
+        """Stop the streams and shut the worker pool down"""
+        self.hub.close()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+async def _disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def _json(status: int, value, headers: list = None) -> tuple:
+    body = json.dumps(value, default=str).encode()
+    return status, [('Content-Type', 'application/json')] + (headers or []), body
+
+
+def _html(page: str) -> tuple:
+    return 200, [('Content-Type', 'text/html; charset=utf-8')], page.encode()
+
+
+def _etag_matches(headers: dict, etag: str) -> bool:
+    tags = [tag.strip() for tag in headers.get('if-none-match', '').split(',')]
+    return '*' in tags or any(tag.removeprefix('W/').strip('"') == etag for tag in tags if tag)
+
+
+app = AsyncDashboard()
+metrics.register_stats('asgi', app.stats)
+
+if __name__ == '__main__':
+    import uvicorn
+    print("Starting AI Trading Bot...")
+    print("Access the dashboard at http://localhost:8000")
+    uvicorn.run(app, host='127.0.0.1', port=8000, log_level='warning')
@@ -0,0 +1,85 @@
+"""
+Benchmark the array-based execution engine against the original
+``iterrows`` loop and check that both produce identical fills.
+
+    python -m benchmarks.bench_execution --bars 1000000 --legacy-bars 100000
+
+The legacy loop is timed on ``--legacy-bars`` and extrapolated linearly,
+since running it over a million bars takes minutes.
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from execution import execute_signals, BUY
+
+
+def legacy_execute(signals: pd.DataFrame, capital: float) -> tuple:
+    """The bar-by-bar loop TradingBot._execute_trades used to run"""
+    held = 0
+    position = 0
+    trades = []
+    for index, row in signals.iterrows():
+        if row['Signal'] == 1 and position <= 0:
+            price = row['Close']
+            shares = int(capital * 0.1 / price)
+            if shares > 0:
+                cost = shares * price
+                capital -= cost
+                held += shares
+                trades.append((index, 'BUY', shares, price, cost))
+                position = 1
+        elif row['Signal'] == -1 and position >= 0:
+            if held > 0:
+                price = row['Close']
+                shares = held
+                revenue = shares * price
+                capital += revenue
+                held = 0
+                trades.append((index, 'SELL', shares, price, revenue))
+                position = -1
+    return capital, held, trades
+
+
+def make_signals(n_bars: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n_bars)))
+    fast = pd.Series(close).rolling(20).mean()
+    slow = pd.Series(close).rolling(50).mean()
+    signal = np.where(fast > slow, 1, np.where(fast < slow, -1, 0))
+    index = pd.date_range('2015-01-01', periods=n_bars, freq='min')
+    return pd.DataFrame({'Close': close, 'Signal': signal}, index=index)
+
+
+def run_engine(signals: pd.DataFrame, capital: float) -> tuple:
+    capital, held, _, ledger = execute_signals(signals['Signal'].to_numpy(),
+                                               signals['Close'].to_numpy(), capital)
+    trades = [(signals.index[bar], 'BUY' if side == BUY else 'SELL', int(shares), price, amount)
+              for bar, side, shares, price, amount in zip(ledger['bar'], ledger['side'],
+                                                          ledger['shares'], ledger['price'],
+                                                          ledger['amount'])]
+    return capital, held, trades
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bars', type=int, default=1_000_000)
+    parser.add_argument('--legacy-bars', type=int, default=100_000)
+    parser.add_argument('--capital', type=float, default=10000.0)
+    args = parser.parse_args()
+
+    signals = make_signals(args.bars)
+    subset = signals.iloc[:args.legacy_bars]
+
+    start = time.perf_counter()
+    expected = legacy_execute(subset, args.capital)
+    legacy = (time.perf_counter() - start) * args.bars / len(subset)
+    assert run_engine(subset, args.capital) == expected, "engine diverged from the legacy loop"
+
+    start = time.perf_counter()
+    capital, held, trades = run_engine(signals, args.capital)
+    engine = time.perf_counter() - start
+
+    print(f"bars:             {args.bars:,} ({len(trades):,} trades)")
+    print(f"legacy loop:      {legacy:8.3f}s (extrapolated from {len(subset):,} bars)")
+    print(f"execution engine: {engine:8.3f}s ({legacy / engine:.0f}x)")
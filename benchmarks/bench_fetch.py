@@ -0,0 +1,41 @@
+"""
+Benchmark serial vs concurrent multi-symbol loading against a local
+stand-in provider that sleeps to simulate network latency.
+
+    python -m benchmarks.bench_fetch --symbols 500 --latency 0.05
+"""
+import argparse
+import time
+from benchmarks.synthetic import synthetic_universe
+from data_fetcher import StockDataFetcher
+from data_providers import InMemoryProvider
+
+
+def make_frames(n_symbols: int, n_bars: int, seed: int = 0) -> dict:
+    return synthetic_universe(n_symbols, n_bars, seed=seed, freq='D', start='2020-01-01', volatility=0.01)
+
+
+def time_load(frames: dict, latency: float, max_workers: int, batch_size: int) -> float:
+    provider = InMemoryProvider(frames, latency=latency, max_batch_size=batch_size)
+    fetcher = StockDataFetcher(store_dir=None, provider=provider, max_workers=max_workers)
+    start = time.perf_counter()
+    fetcher.get_multiple_stocks(list(frames), period='1y', interval='1d')
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--bars', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=50)
+    args = parser.parse_args()
+
+    frames = make_frames(args.symbols, args.bars)
+    serial = time_load(frames, args.latency, max_workers=1, batch_size=1)
+    concurrent = time_load(frames, args.latency, args.workers, batch_size=1)
+    batched = time_load(frames, args.latency, args.workers, args.batch_size)
+    print(f"serial:               {serial:8.3f}s")
+    print(f"concurrent:           {concurrent:8.3f}s ({serial / concurrent:.1f}x)")
+    print(f"concurrent + batched: {batched:8.3f}s ({serial / batched:.1f}x)")
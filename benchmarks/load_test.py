@@ -0,0 +1,188 @@
+"""
+Load-test the async dashboard (asgi_app.py) under uvicorn, with bars from
+a local fake provider that sleeps to simulate network latency.
+
+    python -m benchmarks.load_test --users 200 --duration 20 --symbols 300 --latency 0.05
+
+Every simulated user sends requests back to back over its own keep-alive
+connection. Most requests load the dashboard page of a random symbol, which
+downloads the bars and builds the chart on the symbol's first visit and is
+cached after that. The rest (``--zoom-share``) ask for a zoomed chart,
+which is built on every request. The report lists requests/sec, latency
+percentiles and status codes of the requests sent after ``--warmup``
+seconds, by which time the pages of most symbols are cached.
+
+Pass ``--url`` to load a server that is already running instead.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import multiprocessing
+import random
+import time
+import urllib.parse
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import synthetic_universe
+
+
+def _serve(port: int, n_symbols: int, n_bars: int, latency: float, workers: int, timeout: float):
+    import uvicorn
+    from asgi_app import AsyncDashboard
+    from data_providers import InMemoryProvider
+
+    start = pd.Timestamp.now().normalize() - pd.Timedelta(days=n_bars - 1)
+    frames = synthetic_universe(n_symbols, n_bars, freq='D', start=start, volatility=0.01)
+    app = AsyncDashboard(InMemoryProvider(frames, latency=latency), workers=workers, timeout=timeout)
+    uvicorn.run(app, host='127.0.0.1', port=port, log_level='warning', backlog=4096)
+
+
+async def _get(reader, writer, host: str, path: str) -> tuple:
+    # (status, whether the connection can be reused, body)
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError('connection closed')
+    length, keep_alive = 0, status_line.startswith(b'HTTP/1.1')
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+        elif name.lower() == 'connection':
+            keep_alive = value.strip().lower() != 'close'
+    body = await reader.readexactly(length)
+    return int(status_line.split()[1]), keep_alive, body
+
+
+async def _user(host: str, port: int, paths, deadline: float, latencies: list, statuses: collections.Counter):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        path = next(paths)
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            status, keep_alive, _ = await _get(reader, writer, host, path)
+        except (OSError, asyncio.IncompleteReadError):
+            status, keep_alive = 'error', False
+        latencies.append(time.perf_counter() - start)
+        statuses[status] += 1
+        if not keep_alive and writer is not None:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+def _paths(rng: random.Random, symbols: list, zoom_share: float, end: pd.Timestamp):
+    while True:
+        symbol = rng.choice(symbols)
+        if rng.random() < zoom_share:
+            lo = end - pd.Timedelta(days=rng.randint(10, 60))
+            yield (f'/api/chart?symbol={symbol}&start={lo.date()}'
+                   f'&end={(lo + pd.Timedelta(days=10)).date()}&width=800')
+        else:
+            yield f'/?symbol={symbol}'
+
+
+async def _wait_ready(host: str, port: int, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def load(host: str, port: int, users: int, duration: float, symbols: list,
+               zoom_share: float, warmup: float = 0.0, seed: int = 0) -> dict:
+    """
+    Run ``users`` concurrent users for ``warmup`` + ``duration`` seconds and
+    summarize the requests of the last ``duration`` seconds
+    """
+    await _wait_ready(host, port)
+    end = pd.Timestamp.now().normalize()
+    paths = [_paths(random.Random(seed + i), symbols, zoom_share, end) for i in range(users)]
+    if warmup:
+        deadline = time.perf_counter() + warmup
+        await asyncio.gather(*(_user(host, port, p, deadline, [], collections.Counter()) for p in paths))
+
+    latencies, statuses = [], collections.Counter()
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(_user(host, port, p, deadline, latencies, statuses) for p in paths))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        _, _, body = await _get(reader, writer, host, '/cache/stats')
+        cache = json.loads(body)
+    except (OSError, asyncio.IncompleteReadError, ValueError):
+        cache = {}
+    writer.close()
+
+    latencies = np.asarray(latencies) * 1000
+    return {
+        'users': users,
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'requests_per_sec': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+        'p90_ms': float(np.percentile(latencies, 90)) if len(latencies) else 0.0,
+        'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+        'max_ms': float(latencies.max()) if len(latencies) else 0.0,
+        'statuses': dict(statuses),
+        'cache_hit_rate': cache.get('hit_rate'),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--warmup', type=float, default=5.0, help='Seconds of load before measuring')
+    parser.add_argument('--symbols', type=int, default=300)
+    parser.add_argument('--bars', type=int, default=250)
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds per fake download')
+    parser.add_argument('--zoom-share', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, default=None, help='Server worker processes')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Server request timeout')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--url', help='Load this running server instead of starting one')
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url = urllib.parse.urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        host, port = '127.0.0.1', args.port
+        server = multiprocessing.Process(target=_serve, args=(port, args.symbols, args.bars, args.latency,
+                                                             args.workers, args.timeout))
+        server.start()
+    try:
+        symbols = [f'SYM{i}' for i in range(args.symbols)]
+        result = asyncio.run(load(host, port, args.users, args.duration, symbols, args.zoom_share,
+                                  args.warmup))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+
+    print(f"users:        {result['users']}")
+    print(f"requests:     {result['requests']} in {result['seconds']:.1f}s")
+    print(f"requests/sec: {result['requests_per_sec']:.1f}")
+    print(f"latency:      p50 {result['p50_ms']:.1f} ms, p90 {result['p90_ms']:.1f} ms, "
+          f"p99 {result['p99_ms']:.1f} ms, max {result['max_ms']:.1f} ms")
+    print(f"statuses:     {result['statuses']}")
+    if result['cache_hit_rate'] is not None:
+        print(f"cache hits:   {result['cache_hit_rate']:.1%}")
@@ -0,0 +1,320 @@
+"""
+Benchmark suite over the project's hot paths on seeded synthetic data.
+
+    python -m benchmarks.run --bars 1000,100000 --output bench.json
+    python -m benchmarks.run --bars 1000,100000 --compare bench.json
+
+Each case is timed ``--repeat`` times per bar count and the median and
+minimum are written as JSON. With ``--compare`` the run is checked against
+a saved result: cases whose median slowed down by more than
+``--threshold`` are reported and the exit status is 1.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import synthetic_ohlcv, synthetic_universe
+from feature_cache import FeatureStore
+from instrumentation import metrics
+from ledger import TradeLedger
+from strategies import STRATEGIES
+import utils
+
+CASES = {}
+
+
+def case(name: str):
+    """
+    Register a benchmark. The decorated function receives the bar count and
+    symbol count and returns the zero-argument callable to time.
+    """
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def _uncached(strategy):
+    # A store that keeps nothing, so every run computes its indicators
+    strategy.features = FeatureStore(max_entries=0)
+    return strategy
+
+
+def _make_bot(strategy_name: str):
+    from trading_bot import TradingBot
+    return TradingBot(['SYM0'], strategy=strategy_name, data_fetcher=object())
+
+
+for _name in STRATEGIES:
+    def _strategy_case(n_bars, n_symbols, name=_name):
+        data = synthetic_ohlcv(n_bars)
+        strategy = _uncached(STRATEGIES[name]())
+        return lambda: strategy.generate_signals(data)
+    case(f'strategies.{_name}')(_strategy_case)
+
+
+@case('strategies.ensemble')
+def _ensemble(n_bars, n_symbols):
+    from strategies import EnsembleStrategy
+    data = synthetic_ohlcv(n_bars)
+    ensemble = EnsembleStrategy(list(STRATEGIES))
+    return lambda: ensemble.compute(data)
+
+
+@case('trading_bot.execute_trades')
+def _execute_trades(n_bars, n_symbols):
+    bot = _make_bot('MA')
+    signals = _uncached(bot.strategy).generate_signals(synthetic_ohlcv(n_bars))
+
+    def run():
+        bot.capital = 10000
+        bot.positions['SYM0'] = 0
+        bot.trades = TradeLedger()
+        bot._execute_trades('SYM0', signals)
+    return run
+
+
+for _name in STRATEGIES:
+    def _plot_case(n_bars, n_symbols, name=_name):
+        from rendering import ChartRenderer
+        bot = _make_bot(name)
+        # Redraw every time rather than skipping the unchanged chart
+        bot.renderer = ChartRenderer('sync', directory=tempfile.mkdtemp(prefix='bench_plots_'),
+                                     skip_unchanged=False)
+        signals = _uncached(bot.strategy).generate_signals(synthetic_ohlcv(n_bars))
+        return lambda: bot._plot_results('SYM0', signals)
+    case(f'trading_bot.plot_results.{_name}')(_plot_case)
+
+
+@case('utils.risk_metrics')
+def _risk_metrics(n_bars, n_symbols):
+    prices = synthetic_ohlcv(n_bars, seed=1)['Close']
+    market = synthetic_ohlcv(n_bars, seed=2)['Close']
+    return lambda: utils.calculate_risk_metrics(prices, market)
+
+
+@case('utils.risk_metrics_matrix')
+def _risk_metrics_matrix(n_bars, n_symbols):
+    universe = synthetic_universe(n_symbols, n_bars)
+    prices = pd.DataFrame({symbol: df['Close'] for symbol, df in universe.items()})
+    market = prices.mean(axis=1)
+    return lambda: utils.calculate_risk_metrics_matrix(prices, market)
+
+
+@case('utils.trade_metrics')
+def _trade_metrics(n_bars, n_symbols):
+    bot = _make_bot('RSI')
+    bot._execute_trades('SYM0', _uncached(bot.strategy).generate_signals(synthetic_ohlcv(n_bars)))
+    trades = bot.trades
+    return lambda: utils.calculate_trade_metrics(trades)
+
+
+def _offline_dashboard(n_bars: int):
+    """GET for the dashboard with yf.download stubbed only while a request runs"""
+    import flask_app
+    data = synthetic_ohlcv(n_bars, freq='D', tz=None)
+    client = flask_app.app.test_client()
+
+    def get(path: str):
+        download, flask_app.yf.download = flask_app.yf.download, lambda *args, **kwargs: data.copy()
+        try:
+            return client.get(path)
+        finally:
+            flask_app.yf.download = download
+    return get
+
+
+@case('flask.index')
+def _flask_index(n_bars, n_symbols):
+    import flask_app
+    get = _offline_dashboard(n_bars)
+
+    def run():
+        flask_app.response_cache.invalidate()
+        response = get('/?symbol=SYM0')
+        assert response.status_code == 200
+    return run
+
+
+@case('flask.index.cached')
+def _flask_index_cached(n_bars, n_symbols):
+    _flask_index(n_bars, n_symbols)()
+    get = _offline_dashboard(n_bars)
+    return lambda: get('/?symbol=SYM0')
+
+
+@case('trading_bot.portfolio_status')
+def _portfolio_status(n_bars, n_symbols):
+    from quotes import FakeQuoteServer, HTTPQuoteSource, QuoteService
+    from data_fetcher import StockDataFetcher
+    server = FakeQuoteServer(latency=0.02).start()
+    # ttl=0 so every valuation goes back to the quote server
+    quotes = QuoteService(HTTPQuoteSource(server.url), ttl=0)
+    bot = _make_bot('MA')
+    bot.data_fetcher = StockDataFetcher(store_dir=None, quotes=quotes)
+    bot.positions = {f'SYM{i}': 10 for i in range(n_symbols)}
+    return bot.get_portfolio_status
+
+
+@case('data_fetcher.multiple_stocks')
+def _fetch(n_bars, n_symbols):
+    from data_fetcher import StockDataFetcher
+    from data_providers import InMemoryProvider
+    provider = InMemoryProvider(synthetic_universe(n_symbols, n_bars, freq='D'), max_batch_size=50)
+    fetcher = StockDataFetcher(store_dir=None, provider=provider)
+    return lambda: fetcher.get_multiple_stocks(list(provider.frames), period='max')
+
+
+@case('pipeline.chunked')
+def _chunked(n_bars, n_symbols):
+    from pipeline import ChunkedPipeline
+    data = synthetic_ohlcv(n_bars)
+    strategy = STRATEGIES['RSI']()
+
+    def run():
+        ChunkedPipeline(strategy, memory_budget=4 * 1024 * 1024).run(data, 'SYM0')
+    return run
+
+
+@case('walk_forward.run')
+def _walk_forward(n_bars, n_symbols):
+    from walk_forward import WalkForward
+    universe = synthetic_universe(n_symbols, n_bars)
+    grid = {'short_window': [5, 10, 20], 'long_window': [30, 50, 100]}
+    wf = WalkForward('MA', grid, train_size=max(1, n_bars // 4), test_size=max(1, n_bars // 8),
+                     processes=1)
+    return lambda: wf.run(universe)
+
+
+@case('simulation.block_bootstrap')
+def _block_bootstrap(n_bars, n_symbols):
+    from simulation import MonteCarlo
+    returns = synthetic_ohlcv(n_bars, seed=1)['Close'].pct_change().dropna()
+    mc = MonteCarlo(n_paths=1000, method='block')
+    return lambda: mc.run(returns)
+
+
+@case('screener.scan')
+def _screen(n_bars, n_symbols):
+    from data_store import OHLCVStore
+    from screener import Screener
+    store = OHLCVStore(tempfile.mkdtemp(prefix='bench_screen_'))
+    for symbol, df in synthetic_universe(n_symbols, n_bars).items():
+        store.write(symbol, '1d', df)
+    screener = Screener(store, bars=n_bars, ttl=0)
+    strategy = STRATEGIES['RSI']()
+    return lambda: screener.scan(strategy)
+
+
+@case('streaming.delta')
+def _stream_delta(n_bars, n_symbols):
+    from streaming import ChartDeltas
+    df = synthetic_ohlcv(n_bars + 1)
+    deltas = ChartDeltas()
+    deltas.update(df.iloc[:-1])
+    bar = df.iloc[-1:]
+    # The per-bar cost of one symbol, shared by all of its subscribers
+    return lambda: json.dumps(deltas.update(bar))
+
+
+def run_suite(bar_counts: list, n_symbols: int, repeat: int, selected: list = None) -> dict:
+    """Time every selected case at every bar count"""
+    results = {}
+    for name, setup in CASES.items():
+        if selected and not any(name.startswith(prefix) for prefix in selected):
+            continue
+        for n_bars in bar_counts:
+            key = f'{name}[{n_bars}]'
+            # A case that switches instrumentation on must not slow down the next
+            metrics_enabled = metrics.enabled
+            try:
+                fn = setup(n_bars, n_symbols)
+                fn()  # warm-up
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    fn()
+                    timings.append(time.perf_counter() - start)
+                results[key] = {'median_s': statistics.median(timings), 'min_s': min(timings),
+                                'repeat': repeat}
+            except Exception as e:
+                results[key] = {'error': f'{type(e).__name__}: {e}'}
+            finally:
+                metrics.enabled = metrics_enabled
+            print(f"{key:55s} {_describe(results[key])}", flush=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Cases whose median is more than ``threshold`` times the baseline's"""
+    regressions = []
+    for key, result in results.items():
+        before = baseline.get(key)
+        if not before or 'median_s' not in before or 'median_s' not in result:
+            continue
+        ratio = result['median_s'] / before['median_s'] if before['median_s'] else float('inf')
+        if ratio > threshold:
+            regressions.append((key, before['median_s'], result['median_s'], ratio))
+    return regressions
+
+
+def _describe(result: dict) -> str:
+    if 'error' in result:
+        return f"ERROR {result['error']}"
+    return f"median {result['median_s'] * 1000:10.3f} ms   min {result['min_s'] * 1000:10.3f} ms"
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bars', default='1000,100000',
+                        help='Comma-separated bar counts, e.g. 1000,100000,10000000')
+    parser.add_argument('--symbols', type=int, default=20, help='Symbols for multi-symbol cases')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cases', default='', help='Comma-separated case name prefixes to run')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='Allowed slowdown ratio before a case counts as a regression')
+    args = parser.parse_args(argv)
+
+    bar_counts = [int(n) for n in args.bars.split(',') if n]
+    selected = [c for c in args.cases.split(',') if c]
+    results = run_suite(bar_counts, args.symbols, args.repeat, selected)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'bars': bar_counts,
+            'symbols': args.symbols,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for key, before, after, ratio in regressions:
+            print(f"REGRESSION {key}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
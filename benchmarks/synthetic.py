@@ -0,0 +1,54 @@
+"""
+Seeded synthetic OHLCV data for benchmarks.
+
+Prices follow a geometric random walk with intrabar ranges drawn around
+each close; volume is log-normal and rises with the size of the move, as
+real volume does. The same seed always produces the same bars.
+"""
+import numpy as np
+import pandas as pd
+
+
+def synthetic_ohlcv(n_bars: int, seed: int = 0, freq: str = 'min', start: str = '2015-01-01',
+                    price: float = 100.0, volatility: float = 0.001,
+                    tz: str = 'America/New_York') -> pd.DataFrame:
+    """
+    Generate one symbol's bars
+
+    Args:
+        n_bars (int): Number of bars
+        seed (int): Random seed
+        freq (str): Bar spacing as a pandas frequency
+        start (str): Timestamp of the first bar
+        price (float): Starting price
+        volatility (float): Standard deviation of log returns per bar
+        tz (str): Timezone of the index, or None for naive timestamps
+
+    Returns:
+        pd.DataFrame: Open/High/Low/Close/Volume in the shape yfinance returns
+    """
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, volatility, n_bars)
+    close = price * np.exp(np.cumsum(returns))
+    open_ = np.r_[price, close[:-1]] * np.exp(rng.normal(0, volatility / 4, n_bars))
+    wick = np.abs(rng.normal(0, volatility / 2, (2, n_bars)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    volume = rng.lognormal(10, 0.5, n_bars) * (1 + np.abs(returns) / volatility)
+
+    index = pd.date_range(start, periods=n_bars, freq=freq, tz=tz, name='Datetime')
+    return pd.DataFrame({
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume': volume.astype(np.int64),
+    }, index=index)
+
+
+def synthetic_universe(n_symbols: int, n_bars: int, seed: int = 0, **kwargs) -> dict:
+    """Generate ``n_symbols`` independent symbols named SYM0, SYM1, ..."""
+    rng = np.random.default_rng(seed)
+    prices = rng.uniform(10, 500, n_symbols)
+    return {f'SYM{i}': synthetic_ohlcv(n_bars, seed=seed + i + 1, price=prices[i], **kwargs)
+            for i in range(n_symbols)}
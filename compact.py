@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# Largest absolute error float32 may introduce in a price column (a hundredth of a cent)
+PRICE_TOLERANCE = 1e-4
+
+
+def compact_frame(df: pd.DataFrame, tolerance: float = PRICE_TOLERANCE) -> pd.DataFrame:
+    """
+    The same bars in smaller dtypes:
+
+    - float64 columns become float32 when every value round-trips within
+      ``tolerance`` (prices up to ~1000 keep a hundredth of a cent)
+    - Volume becomes uint32, or uint64 above 4.29 billion, when it holds
+      whole non-negative numbers without NaNs
+    - Signal becomes int8 codes (1 buy, -1 sell, 0 hold)
+    - text columns become categoricals
+
+    Columns already compact are left as they are. Returns a new frame.
+    """
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        values = series.to_numpy()
+        if name == 'Signal':
+            columns[name] = _signal_codes(series)
+        elif name == 'Volume' and series.dtype.kind in 'fiu':
+            columns[name] = _volume(values)
+        elif series.dtype == np.float64:
+            narrow = values.astype(np.float32)
+            with np.errstate(invalid='ignore'):
+                error = np.abs(narrow.astype(np.float64) - values)
+            fits = len(values) == 0 or not np.any(error > tolerance)
+            columns[name] = narrow if fits else values
+        elif series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+            columns[name] = series.astype('category')
+        else:
+            columns[name] = series
+    return pd.DataFrame(columns, index=df.index)
+
+
+def compact_universe(data: dict, tolerance: float = PRICE_TOLERANCE) -> pd.DataFrame:
+    """
+    Stack {symbol: frame} into one long frame of compact columns with a
+    categorical Symbol column, in symbol order then time order
+    """
+    frames = [compact_frame(df, tolerance).assign(Symbol=symbol)
+              for symbol, df in data.items() if df is not None and not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    stacked = pd.concat(frames)
+    stacked['Symbol'] = pd.Categorical(stacked['Symbol'], categories=list(dict.fromkeys(
+        symbol for symbol, df in data.items() if df is not None and not df.empty)))
+    return stacked
+
+
+def memory_usage(df: pd.DataFrame) -> int:
+    """Bytes held by a frame's columns and index"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _volume(values: np.ndarray) -> np.ndarray:
+    if len(values) == 0:
+        return values.astype(np.uint32)
+    if values.dtype.kind == 'f' and (np.isnan(values).any() or np.any(values != np.floor(values))):
+        return values
+    if values.min() < 0:
+        return values
+    return values.astype(np.uint32 if values.max() < 2 ** 32 else np.uint64)
+
+
+def _signal_codes(series: pd.Series) -> np.ndarray:
+    if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+        codes = series.map({'BUY': 1, 'SELL': -1, 'HOLD': 0})
+        return codes.fillna(0).to_numpy().astype(np.int8)
+    return series.to_numpy().astype(np.int8)
@@ -1,44 +1,177 @@
-import yfinance as yf
+import time
 import pandas as pd
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from data_store import OHLCVStore, first_bar, period_start
+from compact import compact_frame
+from data_providers import YFinanceProvider
+from instrumentation import metrics
+from quotes import QuoteService
 
 class StockDataFetcher:
-    def __init__(self):
-        self.cache = {}
-        
+    def __init__(self, store_dir: str = 'market_data', max_staleness: pd.Timedelta = None,
+                 provider=None, max_workers: int = 8, retries: int = 3, backoff: float = 0.5,
+                 quotes=None, compact: bool = False):
+        """
+        Args:
+            store_dir (str): Directory of the on-disk bar store, or None to always download
+            max_staleness (pd.Timedelta): How long stored bars are served without
+                checking for new ones. Defaults to one bar of the requested interval.
+            provider (DataProvider): Source of bars, defaults to Yahoo Finance
+            max_workers (int): Concurrent requests when fetching several symbols
+            retries (int): Attempts per request before giving up
+            backoff (float): Initial retry delay in seconds, doubled after each failure
+            quotes (QuoteService): Live price service, created on first use if not given
+            compact (bool): Return (and store) bars in compact dtypes, see compact.compact_frame
+        """
+        self.store = OHLCVStore(store_dir) if store_dir else None
+        self.max_staleness = max_staleness
+        self.provider = provider if provider is not None else YFinanceProvider()
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self._quotes = quotes
+        self.compact = compact
+
     def get_stock_data(self, symbol: str, period: str = "1mo", interval: str = "1d"):
         """
-        Fetch stock data from Yahoo Finance
-        
+        Fetch stock data, serving bars already on disk and downloading only the
+        missing tail
+
         Args:
             symbol (str): Stock symbol (e.g., 'AAPL')
             period (str): Data period (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max)
             interval (str): Data interval (1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo)
-            
+
         Returns:
             pd.DataFrame: DataFrame with stock data
         """
-        try:
-            ticker = yf.Ticker(symbol)
-            df = ticker.history(period=period, interval=interval)
-            self.cache[symbol] = df
+        for _, df in self.iter_stock_data([symbol], period, interval):
             return df
+
+    def iter_stock_data(self, symbols: list, period: str = "1mo", interval: str = "1d"):
+        """
+        Fetch several symbols concurrently, yielding ``(symbol, DataFrame)``
+        pairs as each one completes. Symbols already fresh on disk are yielded
+        first; the rest are grouped into provider batches and requested from a
+        bounded thread pool. Failed symbols are yielded with ``None``.
+        """
+        start = period_start(period, now=self.provider.current_time())
+        requests = {}
+        for symbol in symbols:
+            try:
+                request = self._plan(symbol, interval, period, start)
+            except Exception as e:
+                print(f"Error fetching data for {symbol}: {str(e)}")
+                yield symbol, None
+                continue
+            if request is None:
+                metrics.inc('fetch_symbols_total', source='store')
+                yield symbol, self._finish(symbol, interval, start, None, None)
+            else:
+                metrics.inc('fetch_symbols_total', source='provider')
+                requests.setdefault(tuple(request.items()), []).append(symbol)
+
+        batch_size = max(1, self.provider.max_batch_size)
+        batches = [(dict(request), group[i:i + batch_size])
+                   for request, group in requests.items()
+                   for i in range(0, len(group), batch_size)]
+        if not batches:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+            futures = {pool.submit(self._fetch_batch, batch, interval, request): (request, batch)
+                       for request, batch in batches}
+            for future in as_completed(futures):
+                request, batch = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    for symbol in batch:
+                        print(f"Error fetching data for {symbol}: {str(e)}")
+                        yield symbol, None
+                    continue
+                for symbol in batch:
+                    yield symbol, self._finish(symbol, interval, start, request, results.get(symbol))
+
+    def _plan(self, symbol: str, interval: str, period: str, start):
+        """Decide what has to be downloaded: None, the whole period, or the tail"""
+        if self.store is None or not self.store.covers(symbol, interval, start):
+            return {'period': period}
+        if self.store.is_fresh(symbol, interval, self.max_staleness):
+            return None
+        return {'start': self.store.last_timestamp(symbol, interval)}
+
+    def _fetch_batch(self, symbols: list, interval: str, request: dict) -> dict:
+        """Request one batch from the provider with rate limiting and retry/backoff"""
+        delay = self.backoff
+        provider = type(self.provider).__name__
+        for attempt in range(self.retries):
+            self.provider.limiter.acquire()
+            metrics.inc('fetch_requests_total', provider=provider)
+            try:
+                with metrics.timer('fetch_request_seconds', provider=provider):
+                    results = self.provider.fetch_batch(symbols, interval, **request)
+                if metrics.enabled:
+                    metrics.inc('fetch_bytes_total', provider=provider,
+                                value=sum(int(df.memory_usage(index=True).sum())
+                                          for df in results.values() if df is not None))
+                return results
+            except Exception:
+                metrics.inc('fetch_errors_total', provider=provider)
+                if attempt == self.retries - 1:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+
+    def _finish(self, symbol: str, interval: str, start, request: dict, df: pd.DataFrame):
+        """Merge a download into the store and read the requested range back"""
+        try:
+            if self.compact and df is not None:
+                df = compact_frame(df)
+            if self.store is None:
+                return df
+            if request is not None and 'period' in request:
+                if df is None or df.empty:
+                    return df
+                # Providers cap how far back some intervals go (1m bars: 7
+                # days), so only 'max' vouches for history before the first bar
+                self.store.write(symbol, interval, df,
+                                 covered_from=None if start is None else first_bar(df))
+            elif request is not None:
+                self.store.append(symbol, interval, df)
+            stored = self.store.read(symbol, interval, start=start)
+            # Partitions written before compact mode still hold float64
+            return compact_frame(stored) if self.compact and stored is not None else stored
         except Exception as e:
             print(f"Error fetching data for {symbol}: {str(e)}")
             return None
-    
+
+    @property
+    def quotes(self) -> QuoteService:
+        if self._quotes is None:
+            self._quotes = QuoteService()
+        return self._quotes
+
     def get_live_price(self, symbol: str) -> float:
         """Get the current price of a stock"""
         try:
-            ticker = yf.Ticker(symbol)
-            return ticker.info['regularMarketPrice']
+            return self.quotes.get_price(symbol)
         except Exception as e:
             print(f"Error fetching live price for {symbol}: {str(e)}")
             return None
-    
+
+    def get_live_prices(self, symbols: list) -> dict:
+        """
+        Current prices for several stocks in batched requests. Symbols without
+        a price map to their last known price, or None.
+        """
+        try:
+            return self.quotes.get_prices(symbols)
+        except Exception as e:
+            print(f"Error fetching live prices: {str(e)}")
+            return {symbol: None for symbol in symbols}
+
     def get_multiple_stocks(self, symbols: list, period: str = "1mo", interval: str = "1d"):
-        """Fetch data for multiple stocks"""
-        data = {}
-        for symbol in symbols:
-            data[symbol] = self.get_stock_data(symbol, period, interval)
-        return data
+        """Fetch data for multiple stocks concurrently"""
+        data = dict(self.iter_stock_data(symbols, period, interval))
+        return {symbol: data.get(symbol) for symbol in symbols}
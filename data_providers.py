@@ -0,0 +1,198 @@
+import asyncio
+import os
+import threading
+import time
+import pandas as pd
+import yfinance as yf
+from data_store import period_start
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing ``rate`` requests per second"""
+
+    def __init__(self, rate: float = None, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be made"""
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class DataProvider:
+    """
+    Source of OHLCV bars. Subclasses implement ``fetch_history`` and may
+    override ``fetch_batch`` when the backend can serve several symbols in one
+    request (advertised through ``max_batch_size``).
+    """
+    max_batch_size = 1
+    rate_limit = None  # requests per second, None for unlimited
+
+    def __init__(self, rate_limit: float = None, burst: int = 1, now=None):
+        if rate_limit is not None:
+            self.rate_limit = rate_limit
+        self.limiter = RateLimiter(self.rate_limit, burst)
+        self.now = None if now is None else pd.Timestamp(now)
+
+    def current_time(self) -> pd.Timestamp:
+        """Reference time that periods are measured back from"""
+        if self.now is not None:
+            return self.now if self.now.tz is not None else self.now.tz_localize('UTC')
+        return pd.Timestamp.now(tz='UTC')
+
+    def fetch_history(self, symbol: str, interval: str = '1d', period: str = None, start=None) -> pd.DataFrame:
+        """Fetch bars for either a whole period or everything since ``start``"""
+        raise NotImplementedError
+
+    def fetch_batch(self, symbols: list, interval: str = '1d', period: str = None, start=None) -> dict:
+        """Fetch several symbols, returning a dict of symbol -> DataFrame"""
+        return {symbol: self.fetch_history(symbol, interval, period=period, start=start)
+                for symbol in symbols}
+
+    async def fetch_history_async(self, symbol: str, interval: str = '1d', period: str = None,
+                                  start=None) -> pd.DataFrame:
+        """Awaitable ``fetch_history``; blocking backends run in a thread"""
+        return await asyncio.to_thread(self.fetch_history, symbol, interval, period=period, start=start)
+
+
+class YFinanceProvider(DataProvider):
+    """Yahoo Finance through yfinance, batching symbols into ``yf.download`` calls"""
+    max_batch_size = 50
+    rate_limit = 2.0
+
+    def fetch_history(self, symbol: str, interval: str = '1d', period: str = None, start=None) -> pd.DataFrame:
+        ticker = yf.Ticker(symbol)
+        if start is not None:
+            return ticker.history(start=start, interval=interval)
+        return ticker.history(period=period, interval=interval)
+
+    def fetch_batch(self, symbols: list, interval: str = '1d', period: str = None, start=None) -> dict:
+        if len(symbols) == 1:
+            return {symbols[0]: self.fetch_history(symbols[0], interval, period=period, start=start)}
+
+        # Same adjustments, action columns and exchange time zone as Ticker.history
+        kwargs = dict(interval=interval, group_by='ticker', auto_adjust=True, actions=True,
+                      ignore_tz=False, threads=False, progress=False)
+        if start is not None:
+            raw = yf.download(symbols, start=start, **kwargs)
+        else:
+            raw = yf.download(symbols, period=period, **kwargs)
+
+        data = {}
+        for symbol in symbols:
+            if symbol not in raw.columns.get_level_values(0):
+                data[symbol] = None
+                continue
+            df = raw[symbol].dropna(how='all')
+            if 'Volume' in df.columns:
+                df['Volume'] = df['Volume'].fillna(0).astype('int64')
+            df.columns.name = None
+            data[symbol] = df
+        return data
+
+
+class ReplayProvider(DataProvider):
+    """
+    Replays bars saved on disk as ``<directory>/<SYMBOL>_<interval>.csv`` or
+    ``.parquet``. Pass ``now`` to pin the clock to when the fixtures were
+    recorded so period requests keep returning data offline.
+    """
+
+    def __init__(self, directory: str, rate_limit: float = None, now=None):
+        super().__init__(rate_limit, now=now)
+        self.directory = directory
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def _load(self, symbol: str, interval: str) -> pd.DataFrame:
+        key = (symbol.upper(), interval)
+        with self._lock:
+            if key in self._frames:
+                return self._frames[key]
+        base = os.path.join(self.directory, f"{symbol.upper()}_{interval}")
+        if os.path.exists(base + '.parquet'):
+            df = pd.read_parquet(base + '.parquet')
+        elif os.path.exists(base + '.csv'):
+            df = pd.read_csv(base + '.csv', index_col=0)
+            df.index = pd.to_datetime(df.index, utc=True)
+        else:
+            return None
+        with self._lock:
+            self._frames[key] = df
+        return df
+
+    def fetch_history(self, symbol: str, interval: str = '1d', period: str = None, start=None) -> pd.DataFrame:
+        return _slice_history(self._load(symbol, interval), period, start, self.current_time())
+
+
+class InMemoryProvider(DataProvider):
+    """
+    Fake provider serving prepared frames. ``latency`` seconds are slept per
+    request to stand in for a network round-trip, which makes it usable for
+    benchmarking the fetch layer. The clock defaults to the newest bar held.
+    """
+
+    def __init__(self, frames: dict, latency: float = 0.0, max_batch_size: int = 1,
+                 rate_limit: float = None, now=None):
+        self.frames = {symbol.upper(): df for symbol, df in frames.items()}
+        if now is None:
+            last = [df.index[-1] for df in self.frames.values() if df is not None and len(df)]
+            now = max(_as_utc(ts) for ts in last) if last else None
+        super().__init__(rate_limit, now=now)
+        self.latency = latency
+        self.max_batch_size = max_batch_size
+        self.requests = 0
+
+    def fetch_history(self, symbol: str, interval: str = '1d', period: str = None, start=None) -> pd.DataFrame:
+        return self.fetch_batch([symbol], interval, period=period, start=start)[symbol]
+
+    def fetch_batch(self, symbols: list, interval: str = '1d', period: str = None, start=None) -> dict:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        now = self.current_time()
+        return {symbol: _slice_history(self.frames.get(symbol.upper()), period, start, now)
+                for symbol in symbols}
+
+    async def fetch_history_async(self, symbol: str, interval: str = '1d', period: str = None,
+                                  start=None) -> pd.DataFrame:
+        # The simulated round-trip is awaited, so it holds no thread
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return _slice_history(self.frames.get(symbol.upper()), period, start, self.current_time())
+
+
+def _as_utc(ts) -> pd.Timestamp:
+    ts = pd.Timestamp(ts)
+    return ts.tz_convert('UTC') if ts.tz is not None else ts.tz_localize('UTC')
+
+
+def _slice_history(df: pd.DataFrame, period: str = None, start=None, now=None) -> pd.DataFrame:
+    """Cut a recorded frame down to what a live request at ``now`` would have returned"""
+    if df is None or df.empty:
+        return df
+    if start is None and period is not None:
+        start = period_start(period, now=now)
+    if start is None:
+        return df.copy()
+    start = pd.Timestamp(start)
+    if df.index.tz is None and start.tz is not None:
+        start = start.tz_convert('UTC').tz_localize(None)
+    elif df.index.tz is not None and start.tz is None:
+        start = start.tz_localize('UTC')
+    return df[df.index >= start].copy()
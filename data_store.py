@@ -0,0 +1,311 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# Bar length of every interval yfinance accepts
+INTERVALS = {
+    '1m': pd.Timedelta(minutes=1),
+    '2m': pd.Timedelta(minutes=2),
+    '5m': pd.Timedelta(minutes=5),
+    '15m': pd.Timedelta(minutes=15),
+    '30m': pd.Timedelta(minutes=30),
+    '60m': pd.Timedelta(hours=1),
+    '90m': pd.Timedelta(minutes=90),
+    '1h': pd.Timedelta(hours=1),
+    '1d': pd.Timedelta(days=1),
+    '5d': pd.Timedelta(days=5),
+    '1wk': pd.Timedelta(weeks=1),
+    '1mo': pd.Timedelta(days=30),
+    '3mo': pd.Timedelta(days=90),
+}
+
+
+# Longest stretch without bars on an open exchange: a long weekend
+MARKET_CLOSURE = pd.Timedelta(days=4)
+
+
+def interval_to_timedelta(interval: str) -> pd.Timedelta:
+    """Length of one bar for a yfinance interval string"""
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown interval: {interval}")
+    return INTERVALS[interval]
+
+
+def period_start(period: str, now: pd.Timestamp = None):
+    """
+    Translate a yfinance period string into the first timestamp it covers
+
+    Args:
+        period (str): Data period (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max)
+        now (pd.Timestamp): Reference time, defaults to the current UTC time
+
+    Returns:
+        pd.Timestamp: UTC start of the period, or None for 'max'
+    """
+    now = pd.Timestamp.now(tz='UTC') if now is None else now
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return pd.Timestamp(year=now.year, month=1, day=1, tz='UTC')
+    for suffix, unit in (('mo', 'months'), ('d', 'days'), ('y', 'years')):
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return now - pd.DateOffset(**{unit: int(period[:-len(suffix)])})
+    raise ValueError(f"Unknown period: {period}")
+
+
+class OHLCVStore:
+    """
+    Persistent columnar store for OHLCV bars.
+
+    Each (symbol, interval) partition is a directory holding one ``.npy`` file
+    per column plus the UTC timestamps, so reads are memory-mapped and only the
+    requested date range is paged in from disk:
+
+        <root>/<interval>/<symbol>/index.npy
+        <root>/<interval>/<symbol>/Close.npy
+        <root>/<interval>/<symbol>/meta.json
+    """
+
+    def __init__(self, root: str = 'market_data'):
+        self.root = root
+
+    def path(self, symbol: str, interval: str) -> str:
+        """Directory of the partition for a symbol and interval"""
+        return os.path.join(self.root, interval, symbol.upper())
+
+    def metadata(self, symbol: str, interval: str) -> dict:
+        """Read partition metadata, or None if nothing is stored yet"""
+        try:
+            with open(os.path.join(self.path(symbol, interval), 'meta.json'), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def covers(self, symbol: str, interval: str, start) -> bool:
+        """Check whether stored history reaches back to ``start`` (None means 'max')"""
+        meta = self.metadata(symbol, interval)
+        if meta is None:
+            return False
+        if meta['covered_from'] is None:
+            return True
+        # The first bar of a period can trail its start by a bar plus a
+        # weekend or holiday without any history missing
+        slack = interval_to_timedelta(interval) + MARKET_CLOSURE
+        return start is not None and pd.Timestamp(meta['covered_from']) - slack <= start
+
+    def last_timestamp(self, symbol: str, interval: str):
+        """Timestamp of the newest stored bar, or None"""
+        meta = self.metadata(symbol, interval)
+        if meta is None or meta['rows'] == 0:
+            return None
+        return pd.Timestamp(meta['last'])
+
+    def is_fresh(self, symbol: str, interval: str, max_staleness: pd.Timedelta = None) -> bool:
+        """
+        Check whether the partition was refreshed recently enough to be served
+        without touching the network. Defaults to one bar of the interval.
+        """
+        meta = self.metadata(symbol, interval)
+        if meta is None:
+            return False
+        if max_staleness is None:
+            max_staleness = interval_to_timedelta(interval)
+        age = pd.Timestamp.now(tz='UTC') - pd.Timestamp(meta['fetched_at'])
+        return age < max_staleness
+
+    def read(self, symbol: str, interval: str, start=None, end=None) -> pd.DataFrame:
+        """
+        Read stored bars between ``start`` and ``end`` (inclusive)
+
+        Returns:
+            pd.DataFrame: Bars in the same shape yfinance returns, or None if
+            the partition does not exist
+        """
+        meta = self.metadata(symbol, interval)
+        if meta is None:
+            return None
+        index = np.load(os.path.join(self.path(symbol, interval), 'index.npy'), mmap_mode='r')
+        rows = min(meta['rows'], len(index))
+        lo = 0 if start is None else int(np.searchsorted(index[:rows], _to_utc_ns(start), side='left'))
+        hi = rows if end is None else int(np.searchsorted(index[:rows], _to_utc_ns(end), side='right'))
+        return self._read_rows(symbol, interval, meta, index, lo, hi)
+
+    def rows(self, symbol: str, interval: str) -> int:
+        """Number of stored bars, 0 if the partition does not exist"""
+        meta = self.metadata(symbol, interval)
+        return 0 if meta is None else meta['rows']
+
+    def read_rows(self, symbol: str, interval: str, lo: int, hi: int) -> pd.DataFrame:
+        """
+        Read stored bars ``lo`` to ``hi`` (exclusive) by position. Only those
+        rows are paged in, so a long history can be walked chunk by chunk.
+        """
+        meta = self.metadata(symbol, interval)
+        if meta is None:
+            return None
+        index = np.load(os.path.join(self.path(symbol, interval), 'index.npy'), mmap_mode='r')
+        rows = min(meta['rows'], len(index))
+        return self._read_rows(symbol, interval, meta, index, max(0, lo), min(rows, hi))
+
+    def tail(self, symbol: str, interval: str, bars: int) -> pd.DataFrame:
+        """The newest ``bars`` stored bars, or None if the partition does not exist"""
+        meta = self.metadata(symbol, interval)
+        if meta is None:
+            return None
+        index = np.load(os.path.join(self.path(symbol, interval), 'index.npy'), mmap_mode='r')
+        rows = min(meta['rows'], len(index))
+        return self._read_rows(symbol, interval, meta, index, max(0, rows - bars), rows)
+
+    def tail_arrays(self, symbol: str, interval: str, bars: int, columns: list = None) -> tuple:
+        """
+        The newest ``bars`` stored bars as plain arrays, for reading many
+        partitions at once without building a DataFrame per symbol
+
+        Returns:
+            tuple: (UTC nanosecond timestamps, {column: values}, metadata),
+            or None if the partition does not exist. Only the tail of each
+            file is read.
+        """
+        meta = self.metadata(symbol, interval)
+        if meta is None:
+            return None
+        directory = self.path(symbol, interval)
+        rows = meta['rows']
+        index = _read_tail(os.path.join(directory, 'index.npy'), rows, bars)
+        values = {name: _read_tail(os.path.join(directory, filename), rows, bars)
+                  for name, filename in meta['columns'] if columns is None or name in columns}
+        return index, values, meta
+
+    def symbols(self, interval: str) -> list:
+        """Symbols with a partition at ``interval``"""
+        directory = os.path.join(self.root, interval)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory)
+                      if os.path.exists(os.path.join(directory, name, 'meta.json')))
+
+    def _read_rows(self, symbol: str, interval: str, meta: dict, index: np.ndarray,
+                   lo: int, hi: int) -> pd.DataFrame:
+        directory = self.path(symbol, interval)
+        columns = {}
+        for name, filename in meta['columns']:
+            values = np.load(os.path.join(directory, filename), mmap_mode='r')
+            columns[name] = np.array(values[lo:hi])
+
+        dates = pd.to_datetime(np.array(index[lo:hi]), unit='ns', utc=True)
+        dates = dates.tz_convert(meta['tz']) if meta['tz'] else dates.tz_localize(None)
+        return pd.DataFrame(columns, index=pd.DatetimeIndex(dates, name=meta['index_name']))
+
+    def write(self, symbol: str, interval: str, df: pd.DataFrame, covered_from=None):
+        """
+        Replace the partition with ``df``, which covers history from
+        ``covered_from``. None means all of the symbol's history, as a
+        'max' period download returns.
+        """
+        directory = self.path(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+
+        columns = []
+        for name in df.columns:
+            filename = str(name).replace(' ', '_').replace(os.sep, '_') + '.npy'
+            _atomic_save(os.path.join(directory, filename), df[name].to_numpy())
+            columns.append((str(name), filename))
+        index = _index_to_utc_ns(df.index)
+        _atomic_save(os.path.join(directory, 'index.npy'), index)
+
+        meta = {
+            'symbol': symbol.upper(),
+            'interval': interval,
+            'columns': columns,
+            'rows': len(index),
+            'tz': str(df.index.tz) if getattr(df.index, 'tz', None) is not None else None,
+            'index_name': df.index.name,
+            'covered_from': None if covered_from is None else pd.Timestamp(covered_from).isoformat(),
+            'last': pd.Timestamp(int(index[-1]), tz='UTC').isoformat() if len(index) else None,
+            'fetched_at': pd.Timestamp.now(tz='UTC').isoformat(),
+        }
+        meta_path = os.path.join(directory, 'meta.json')
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f, indent=4)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def append(self, symbol: str, interval: str, df: pd.DataFrame):
+        """
+        Merge newly fetched bars onto the end of the partition. Stored bars at
+        or after the first new timestamp are replaced, since the last stored
+        bar may have been incomplete when it was fetched.
+        """
+        meta = self.metadata(symbol, interval)
+        if df is None or df.empty:
+            self.touch(symbol, interval)
+            return
+        if meta is None:
+            # Nothing older than the new bars is known to be stored
+            self.write(symbol, interval, df, covered_from=first_bar(df))
+            return
+        covered_from = meta['covered_from']
+
+        first = df.index[0]
+        if meta['tz'] is not None and df.index.tz is None:
+            # Naive bars from yfinance are in exchange time
+            df = df.tz_localize(meta['tz'])
+            first = df.index[0]
+        elif meta['tz'] is None and df.index.tz is not None:
+            # A naive partition holds exchange times as if they were UTC
+            first = first.tz_localize(None)
+        stored = self.read(symbol, interval, end=first - pd.Timedelta(1, unit='ns'))
+        if stored.index.tz is None and df.index.tz is not None:
+            stored = stored.tz_localize(df.index.tz)
+        elif df.index.tz is not None:
+            df = df.tz_convert(stored.index.tz)
+        merged = pd.concat([stored, df[stored.columns.intersection(df.columns)]])
+        self.write(symbol, interval, merged, covered_from=covered_from)
+
+    def touch(self, symbol: str, interval: str):
+        """Mark the partition as refreshed without changing its bars"""
+        meta = self.metadata(symbol, interval)
+        if meta is None:
+            return
+        meta['fetched_at'] = pd.Timestamp.now(tz='UTC').isoformat()
+        meta_path = os.path.join(self.path(symbol, interval), 'meta.json')
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f, indent=4)
+        os.replace(meta_path + '.tmp', meta_path)
+
+
+def first_bar(df: pd.DataFrame) -> pd.Timestamp:
+    """UTC timestamp of the first bar, the coverage a non-'max' download can vouch for"""
+    return pd.Timestamp(_to_utc_ns(df.index[0]), tz='UTC')
+
+
+def _to_utc_ns(ts) -> np.int64:
+    ts = pd.Timestamp(ts)
+    ts = ts.tz_localize('UTC') if ts.tz is None else ts.tz_convert('UTC')
+    return np.int64(ts.as_unit('ns').value)
+
+
+def _index_to_utc_ns(index: pd.Index) -> np.ndarray:
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC')
+    return index.as_unit('ns').asi8.astype(np.int64)
+
+
+def _read_tail(path: str, rows: int, bars: int) -> np.ndarray:
+    # Parse the .npy header and seek past the leading rows; cheaper than a
+    # memory map when many small files are read once
+    with open(path, 'rb') as f:
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, _, dtype = read_header(f)
+        rows = min(rows, shape[0])
+        start = max(0, rows - bars)
+        f.seek(start * dtype.itemsize, os.SEEK_CUR)
+        return np.fromfile(f, dtype=dtype, count=rows - start)
+
+
+def _atomic_save(path: str, values: np.ndarray):
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, values, allow_pickle=False)
+    os.replace(path + '.tmp', path)
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+# Screen pixels per candle and per line point when sizing the target
+PIXELS_PER_CANDLE = 4
+PIXELS_PER_POINT = 1
+MIN_POINTS = 100
+
+
+def target_points(width: int, pixels_per_point: int = PIXELS_PER_POINT) -> int:
+    """Number of points worth drawing in a plot ``width`` pixels wide"""
+    return max(MIN_POINTS, int(width) // pixels_per_point)
+
+
+def lttb_indices(y, n_out: int, x=None) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: pick ``n_out`` points that preserve the
+    visual shape of a line. NaN points are skipped.
+
+    Args:
+        y (array-like): Values
+        n_out (int): Points to keep (first and last are always kept)
+        x (array-like): Positions, defaults to 0..n-1
+
+    Returns:
+        np.ndarray: Sorted indices into ``y``
+    """
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.flatnonzero(np.isfinite(y))
+    if len(valid) <= n_out or n_out < 3:
+        return valid
+    x = valid.astype(np.float64) if x is None else np.asarray(x, dtype=np.float64)[valid]
+    y = y[valid]
+
+    # Buckets between the fixed first and last points
+    edges = np.linspace(1, len(y) - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = len(y) - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) closes the triangle
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else len(y)
+        cx = x[nlo:nhi].mean()
+        cy = y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return valid[selected]
+
+
+def bucket_edges(n: int, n_buckets: int, keep=None) -> np.ndarray:
+    """
+    Edges of roughly equal buckets over ``n`` bars. Bars listed in ``keep``
+    get a bucket of their own so they survive aggregation unchanged.
+    """
+    edges = np.linspace(0, n, min(n, n_buckets) + 1).astype(np.int64)
+    if keep is not None and len(keep):
+        keep = np.asarray(keep, dtype=np.int64)
+        edges = np.union1d(edges, np.r_[keep, keep + 1])
+        edges = edges[(edges >= 0) & (edges <= n)]
+    return edges
+
+
+def ohlc_buckets(data: pd.DataFrame, n_buckets: int, keep=None) -> pd.DataFrame:
+    """
+    Aggregate bars into at most ``n_buckets`` candles (plus one per kept bar):
+    first Open, highest High, lowest Low, last Close, summed Volume. Each
+    candle is stamped with the time of its first bar.
+    """
+    n = len(data)
+    if n <= n_buckets:
+        return data
+    starts = bucket_edges(n, n_buckets, keep)[:-1]
+    out = {
+        'Open': data['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(data['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(data['Low'].to_numpy(), starts),
+        'Close': data['Close'].to_numpy()[np.r_[starts[1:], n] - 1],
+    }
+    if 'Volume' in data.columns:
+        out['Volume'] = np.add.reduceat(data['Volume'].to_numpy(), starts)
+    return pd.DataFrame(out, index=data.index[starts])
+
+
+def downsample_line(series: pd.Series, n_out: int, keep=None) -> pd.Series:
+    """LTTB-reduce a series to about ``n_out`` points, always keeping positions in ``keep``"""
+    if len(series) <= n_out:
+        return series
+    indices = lttb_indices(series.to_numpy(), n_out)
+    if keep is not None and len(keep):
+        indices = np.union1d(indices, np.asarray(keep, dtype=np.int64))
+    return series.iloc[indices]
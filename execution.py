@@ -0,0 +1,126 @@
+import numpy as np
+
+BUY = 1
+SELL = -1
+
+
+def empty_ledger() -> dict:
+    """Columnar trade ledger with no rows"""
+    return {
+        'bar': np.empty(0, dtype=np.int64),
+        'side': np.empty(0, dtype=np.int8),
+        'shares': np.empty(0, dtype=np.int64),
+        'price': np.empty(0, dtype=np.float64),
+        'amount': np.empty(0, dtype=np.float64),
+    }
+
+
+def execute_signals(signal, close, capital: float, held: int = 0, position: int = 0,
+                    fraction: float = 0.1) -> tuple:
+    """
+    Execute a Signal/Close series with the same rules as the bar-by-bar loop
+    TradingBot used to run: buy ``fraction`` of capital on a 1 while flat or
+    short, sell the whole holding on a -1 while flat or long.
+
+    Only bars where the signal changes sign can trigger a trade, so the signal
+    array is reduced to runs of equal non-zero values and the state machine
+    steps once per run instead of once per bar. The arithmetic per trade is the
+    same as the loop's, so capital and fills are bit-identical.
+
+    Args:
+        signal (array-like): Signal per bar (1 buy, -1 sell, 0 hold)
+        close (array-like): Close price per bar
+        capital (float): Cash available before the first bar
+        held (int): Shares already held
+        position (int): State carried in from a previous call (1, -1 or 0)
+        fraction (float): Share of capital used per buy
+
+    Returns:
+        tuple: (capital, held, position, ledger) where ledger is a dict of
+        arrays 'bar', 'side', 'shares', 'price' and 'amount' (cost or revenue)
+    """
+    signal = np.asarray(signal)
+    close = np.asarray(close, dtype=np.float64)
+
+    active = np.flatnonzero((signal == BUY) | (signal == SELL))
+    if len(active) == 0:
+        return capital, held, position, empty_ledger()
+
+    sides = signal[active]
+    run_starts = np.flatnonzero(np.r_[True, sides[1:] != sides[:-1]])
+    run_ends = np.r_[run_starts[1:], len(active)]
+
+    bars, trade_sides, trade_shares, prices, amounts = [], [], [], [], []
+    for start, end in zip(run_starts.tolist(), run_ends.tolist()):
+        if sides[start] == BUY:
+            if position > 0:
+                continue
+            bar = active[start]
+            price = close[bar]
+            shares = int(capital * fraction / price)
+            if shares <= 0:
+                # Too expensive for the budget; the loop retried on every
+                # further buy bar of the run, so find the first affordable one
+                budget = capital * fraction
+                affordable = np.flatnonzero(budget / close[active[start + 1:end]] >= 1)
+                if len(affordable) == 0:
+                    continue
+                bar = active[start + 1 + affordable[0]]
+                price = close[bar]
+                shares = int(budget / price)
+            cost = shares * price
+            capital -= cost
+            held += shares
+            position = 1
+            bars.append(bar)
+            trade_sides.append(BUY)
+            trade_shares.append(shares)
+            prices.append(price)
+            amounts.append(cost)
+        else:
+            if position < 0 or held <= 0:
+                continue
+            bar = active[start]
+            price = close[bar]
+            shares = held
+            revenue = shares * price
+            capital += revenue
+            held = 0
+            position = -1
+            bars.append(bar)
+            trade_sides.append(SELL)
+            trade_shares.append(shares)
+            prices.append(price)
+            amounts.append(revenue)
+
+    ledger = {
+        'bar': np.array(bars, dtype=np.int64),
+        'side': np.array(trade_sides, dtype=np.int8),
+        'shares': np.array(trade_shares, dtype=np.int64),
+        'price': np.array(prices, dtype=np.float64),
+        'amount': np.array(amounts, dtype=np.float64),
+    }
+    return capital, held, position, ledger
+
+
+def equity_curve(close, ledger: dict, capital: float, held: int = 0) -> np.ndarray:
+    """
+    Mark a ledger to market: cash plus held shares at the close of every bar
+
+    Args:
+        close (array-like): Close price per bar
+        ledger (dict): Columnar ledger returned by ``execute_signals``
+        capital (float): Cash before the first bar
+        held (int): Shares held before the first bar
+
+    Returns:
+        np.ndarray: Portfolio value per bar
+    """
+    close = np.asarray(close, dtype=np.float64)
+    cash_delta = np.where(ledger['side'] == BUY, -ledger['amount'], ledger['amount'])
+    cash = np.cumsum(np.r_[capital, cash_delta])
+    shares = np.cumsum(np.r_[held, np.where(ledger['side'] == BUY, ledger['shares'], -ledger['shares'])])
+
+    # Ledger row in effect at each bar (+1 because row 0 is the starting state)
+    step = np.searchsorted(ledger['bar'], np.arange(len(close)), side='right')
+    return cash[step] + shares[step] * close
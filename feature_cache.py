@@ -0,0 +1,235 @@
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from instrumentation import metrics
+
+# Per-thread memo of array digests while a fingerprint_scope is open
+_scope = threading.local()
+
+
+class FeatureStore:
+    """
+    Memoizes indicator series keyed by (input fingerprint, indicator, params).
+
+    Strategies request their rolling means, EWMs, extrema and similar series
+    through a shared store, so evaluating several strategies or parameter sets
+    on the same data computes each distinct indicator once. Entries are evicted
+    least-recently-used once either ``max_entries`` or ``max_bytes`` is
+    exceeded. Cached series are shared between callers and must be treated as
+    read-only.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._index_fingerprints = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.computed = {}
+
+    def get(self, name: str, inputs: tuple, params: dict, compute):
+        """
+        Return the cached result of ``compute(*inputs)`` or compute and store it
+
+        Args:
+            name (str): Indicator name
+            inputs (tuple): Series/DataFrames the indicator is computed from
+            params (dict): Parameters that change the result
+            compute (callable): Called with ``*inputs`` on a miss
+        """
+        key = (tuple(self.fingerprint(x) for x in inputs), name, tuple(sorted(params.items())))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute(*inputs)
+
+        with self._lock:
+            self.computed[name] = self.computed.get(name, 0) + 1
+            if key not in self._entries:
+                size = _nbytes(value)
+                self._entries[key] = value
+                self._sizes[key] = size
+                self._bytes += size
+                self._evict()
+        return value
+
+    def fingerprint(self, data) -> str:
+        """Content hash of a Series or DataFrame, including its index and names"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self._index_fingerprint(data.index).encode())
+        if isinstance(data, pd.Series):
+            columns = [(data.name, data.to_numpy())]
+        elif data.shape[1] > 1 and len(set(data.dtypes)) == 1 and data.dtypes.iloc[0] != object:
+            # A wide frame of one dtype (a dates x symbols matrix) is hashed
+            # as one block rather than column by column
+            columns = [(list(data.columns), data.to_numpy())]
+        else:
+            columns = [(column, series.to_numpy()) for column, series in data.items()]
+        for column, values in columns:
+            digest.update(repr((column, values.shape, values.dtype.str)).encode())
+            digest.update(_values_digest(values))
+        return digest.hexdigest()
+
+    def _index_fingerprint(self, index: pd.Index) -> str:
+        # Index objects are immutable, so their hash is memoized per object
+        cached = self._index_fingerprints.get(id(index))
+        if cached is not None and cached[0]() is index:
+            return cached[1]
+        if isinstance(index, pd.DatetimeIndex):
+            # Hashed in its own unit; converting would copy the whole index
+            values, unit = index.asi8, index.unit
+        else:
+            values, unit = np.asarray(index), None
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((str(getattr(index, 'tz', None)), len(index), values.dtype.str, unit)).encode())
+        digest.update(_values_digest(values))
+        fingerprint = digest.hexdigest()
+        try:
+            ref = weakref.ref(index, lambda _, key=id(index): self._index_fingerprints.pop(key, None))
+            self._index_fingerprints[id(index)] = (ref, fingerprint)
+        except TypeError:
+            pass
+        return fingerprint
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            key, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(key)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop all entries and reset the statistics"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.computed = {}
+
+    def stats(self) -> dict:
+        """Hit/miss statistics and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'computed': dict(self.computed),
+            }
+
+    # Indicators shared by the strategies
+
+    def rolling_mean(self, series: pd.Series, window: int, center: bool = False) -> pd.Series:
+        return self.get('rolling_mean', (series,), {'window': window, 'center': center},
+                        lambda s: s.rolling(window=window, center=center).mean())
+
+    def rolling_std(self, series: pd.Series, window: int) -> pd.Series:
+        return self.get('rolling_std', (series,), {'window': window},
+                        lambda s: s.rolling(window=window).std())
+
+    def rolling_sum(self, series: pd.Series, window: int) -> pd.Series:
+        return self.get('rolling_sum', (series,), {'window': window},
+                        lambda s: s.rolling(window=window).sum())
+
+    def rolling_max(self, series: pd.Series, window: int, center: bool = False) -> pd.Series:
+        return self.get('rolling_max', (series,), {'window': window, 'center': center},
+                        lambda s: s.rolling(window=window, center=center).max())
+
+    def rolling_min(self, series: pd.Series, window: int, center: bool = False) -> pd.Series:
+        return self.get('rolling_min', (series,), {'window': window, 'center': center},
+                        lambda s: s.rolling(window=window, center=center).min())
+
+    def ewm_mean(self, series: pd.Series, span: float) -> pd.Series:
+        return self.get('ewm_mean', (series,), {'span': span},
+                        lambda s: s.ewm(span=span, adjust=False).mean())
+
+    def typical_price(self, data: pd.DataFrame) -> pd.Series:
+        return self.get('typical_price', (data['High'], data['Low'], data['Close']), {},
+                        lambda high, low, close: (high + low + close) / 3)
+
+
+def fingerprint_scope():
+    """
+    Context manager: within the block, each input array is hashed once however many
+    lookups (in any FeatureStore, on this thread) fingerprint it. Arrays
+    must not be modified inside the block, which holds for a strategy's
+    ``compute``; a hit in the cache then costs O(1) instead of a pass over
+    the whole history. Scopes nest; the outermost one owns the memo.
+    """
+    return _FingerprintScope()
+
+
+class _FingerprintScope:
+    def __enter__(self):
+        self._owner = getattr(_scope, 'memo', None) is None
+        if self._owner:
+            _scope.memo = {}
+        return self
+
+    def __exit__(self, *exc):
+        if self._owner:
+            _scope.memo = None
+        return False
+
+
+def _values_digest(values: np.ndarray) -> bytes:
+    memo = getattr(_scope, 'memo', None)
+    key = owner = None
+    if memo is not None and values.dtype != object:
+        # Column arrays are fresh views of the frame's blocks on every
+        # access, so they are matched by address and layout, and the
+        # buffer that owns the memory is checked to be the same object
+        owner = _buffer_owner(values)
+        key = (values.__array_interface__['data'][0], values.shape, values.strides, values.dtype.str)
+        hit = memo.get(key)
+        if hit is not None and hit[0]() is owner:
+            return hit[1]
+    if values.dtype == object:
+        digest = hashlib.blake2b(repr(values.tolist()).encode(), digest_size=16).digest()
+    else:
+        digest = hashlib.blake2b(np.ascontiguousarray(values).view(np.uint8), digest_size=16).digest()
+    if key is not None:
+        try:
+            # A weak reference, so temporaries are still freed inside the scope
+            memo[key] = (weakref.ref(owner), digest)
+        except TypeError:
+            pass
+    return digest
+
+
+def _buffer_owner(values: np.ndarray):
+    while isinstance(values.base, np.ndarray):
+        values = values.base
+    return values.base if values.base is not None else values
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=False).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=False))
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    return int(getattr(value, 'nbytes', 0))
+
+
+# Store shared by all strategy instances unless they are given their own
+default_store = FeatureStore()
+metrics.register_stats('feature_cache', default_store.stats)
@@ -1,51 +1,96 @@
-from flask import Flask, render_template_string, request
+from flask import Flask, Response, render_template_string, request, make_response, jsonify, g
 import yfinance as yf
 import pandas as pd
 import plotly.graph_objects as go
 import json
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import numpy as np
+import os
+import time
+from response_cache import TTLCache
+from data_fetcher import StockDataFetcher
+from strategies import STRATEGIES
+from screener import Screener
+from streaming import StreamHub, bar_ids
+from live import ProviderFeed
+from data_providers import YFinanceProvider
+from instrumentation import metrics
+from downsampling import target_points, ohlc_buckets, downsample_line, PIXELS_PER_CANDLE
 
 app = Flask(__name__)
 
+HISTORY_DAYS = 90
+# Dashboard responses are reused until the next one-minute bar starts
+CACHE_TTL_SECONDS = 60
+response_cache = TTLCache(ttl=CACHE_TTL_SECONDS)
+data_fetcher = StockDataFetcher()
+metrics.register_stats('response_cache', response_cache.stats)
+MAX_API_SYMBOLS = 50
+# The screener scans every symbol in the local bar store
+screener = Screener(data_fetcher.store) if data_fetcher.store is not None else Screener()
+MAX_SCREEN_PAGE_SIZE = 500
+# Live chart updates pushed to open dashboards; bars match the page's daily history
+STREAM_INTERVAL = '1d'
+stream_hub = StreamHub(ProviderFeed(YFinanceProvider(), history_period='6mo'), interval=STREAM_INTERVAL)
+metrics.register_stats('stream', stream_hub.stats)
+DEFAULT_CHART_WIDTH = 1200
+
+SIGNAL_NAMES = {1: 'BUY', -1: 'SELL', 0: 'HOLD'}
+
 def calculate_signals(data):
-    # Calculate technical indicators
-    data['SMA20'] = data['Close'].rolling(window=20).mean()
-    data['SMA50'] = data['Close'].rolling(window=50).mean()
-    
-    # Generate trading signals
-    signals = []
-    for i in range(1, len(data)):
-        if data['SMA20'].iloc[i] > data['SMA50'].iloc[i] and data['SMA20'].iloc[i-1] <= data['SMA50'].iloc[i-1]:
-            signals.append('BUY')
-        elif data['SMA20'].iloc[i] < data['SMA50'].iloc[i] and data['SMA20'].iloc[i-1] >= data['SMA50'].iloc[i-1]:
-            signals.append('SELL')
-        else:
-            signals.append('HOLD')
-    
-    signals.insert(0, 'HOLD')  # Add HOLD for the first day
-    return signals
+    """
+    Detect SMA20/SMA50 crossovers without modifying ``data``
+
+    Returns:
+        pd.DataFrame: SMA20, SMA50 and an int8 Signal column
+        (1 on a bullish cross, -1 on a bearish cross, 0 otherwise)
+    """
+    sma20 = data['Close'].rolling(window=20).mean()
+    sma50 = data['Close'].rolling(window=50).mean()
+
+    # A cross happens on the bar where the ordering flips from the previous bar
+    crossed_up = (sma20 > sma50) & (sma20 <= sma50).shift(1, fill_value=False)
+    crossed_down = (sma20 < sma50) & (sma20 >= sma50).shift(1, fill_value=False)
+    signal = np.zeros(len(data), dtype=np.int8)
+    signal[crossed_up.to_numpy()] = 1
+    signal[crossed_down.to_numpy()] = -1
+
+    return pd.DataFrame({'SMA20': sma20, 'SMA50': sma50, 'Signal': signal}, index=data.index)
+
+def chart_width(value):
+    """Viewport width requested by the browser, rounded so similar screens share cache entries"""
+    try:
+        width = int(float(value))
+    except (TypeError, ValueError):
+        return DEFAULT_CHART_WIDTH
+    return min(4000, max(300, round(width / 100) * 100))
+
+def create_chart(data, symbol, width=DEFAULT_CHART_WIDTH, x_range=None):
+    # Reduce the series to what the viewport can show; signal bars are always kept
+    markers = np.flatnonzero(data['Signal'].to_numpy() != 0)
+    candles = ohlc_buckets(data, target_points(width, PIXELS_PER_CANDLE), keep=markers)
+    sma20 = downsample_line(data['SMA20'], target_points(width), keep=markers)
+    sma50 = downsample_line(data['SMA50'], target_points(width), keep=markers)
 
-def create_chart(data, symbol):
     # Create candlestick chart
-    fig = go.Figure(data=[go.Candlestick(x=data.index,
-                open=data['Open'],
-                high=data['High'],
-                low=data['Low'],
-                close=data['Close'],
+    fig = go.Figure(data=[go.Candlestick(x=candles.index,
+                open=candles['Open'],
+                high=candles['High'],
+                low=candles['Low'],
+                close=candles['Close'],
                 name='Price')])
     
     # Add moving averages
-    fig.add_trace(go.Scatter(x=data.index, y=data['SMA20'],
+    fig.add_trace(go.Scatter(x=sma20.index, y=sma20,
                             line=dict(color='blue', width=1),
                             name='20-day MA'))
-    fig.add_trace(go.Scatter(x=data.index, y=data['SMA50'],
+    fig.add_trace(go.Scatter(x=sma50.index, y=sma50,
                             line=dict(color='orange', width=1),
                             name='50-day MA'))
     
     # Add buy/sell markers
-    buy_signals = data[data['Signal'] == 'BUY'].index
-    sell_signals = data[data['Signal'] == 'SELL'].index
+    buy_signals = data[data['Signal'] == 1].index
+    sell_signals = data[data['Signal'] == -1].index
     
     fig.add_trace(go.Scatter(x=buy_signals, y=data.loc[buy_signals, 'Low'] * 0.99,
                             mode='markers',
@@ -63,8 +108,10 @@ def create_chart(data, symbol):
         xaxis_title='Date',
         template='plotly_white'
     )
+    if x_range is not None:
+        fig.update_xaxes(range=[str(x) for x in x_range])
     
-    return json.dumps(fig.to_dict())
+    return fig.to_json()
 
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
@@ -155,6 +202,7 @@ HTML_TEMPLATE = '''
                    placeholder="Enter stock symbol" 
                    value="{{ symbol if symbol else '' }}"
                    required>
+            <input type="hidden" name="width" id="chart-width">
             <button type="submit" class="analyze-btn">Analyze</button>
         </form>
 
@@ -197,11 +245,47 @@ HTML_TEMPLATE = '''
         <script>
             var chartData = {{ chart_data | safe }};
             Plotly.newPlot('chart', chartData.data, chartData.layout);
+
+            // Append bars, SMA points and crossover markers as they close
+            if (window.EventSource) {
+                var stream = new EventSource('/stream?symbol=' + encodeURIComponent({{ symbol|tojson }}) +
+                                             '&after={{ stock_data.last_bar }}');
+                stream.addEventListener('bars', function(event) {
+                    var delta = JSON.parse(event.data);
+                    Plotly.extendTraces('chart', {x: [delta.t], open: [delta.open], high: [delta.high],
+                                                  low: [delta.low], close: [delta.close]}, [0]);
+                    Plotly.extendTraces('chart', {x: [delta.t, delta.t],
+                                                  y: [delta.sma_short, delta.sma_long]}, [1, 2]);
+                    if (delta.buy.t.length) {
+                        Plotly.extendTraces('chart', {x: [delta.buy.t], y: [delta.buy.y]}, [3]);
+                    }
+                    if (delta.sell.t.length) {
+                        Plotly.extendTraces('chart', {x: [delta.sell.t], y: [delta.sell.y]}, [4]);
+                    }
+                });
+            }
+
+            // Fetch higher-resolution data for the visible range after zooming
+            var chart = document.getElementById('chart');
+            chart.on('plotly_relayout', function(event) {
+                var url = '/api/chart?symbol=' + encodeURIComponent({{ symbol|tojson }}) +
+                          '&width=' + chart.offsetWidth;
+                if (event['xaxis.range[0]'] !== undefined) {
+                    url += '&start=' + encodeURIComponent(event['xaxis.range[0]']) +
+                           '&end=' + encodeURIComponent(event['xaxis.range[1]']);
+                } else if (!event['xaxis.autorange']) {
+                    return;
+                }
+                fetch(url).then(function(response) { return response.json(); })
+                          .then(function(fig) { Plotly.react('chart', fig.data, fig.layout); });
+            });
         </script>
         {% endif %}
     </div>
 
     <script>
+        document.getElementById('chart-width').value =
+            document.querySelector('.container').clientWidth;
         document.querySelector('input[name="symbol"]').addEventListener('input', function(e) {
             this.value = this.value.toUpperCase();
         });
@@ -210,49 +294,116 @@ HTML_TEMPLATE = '''
 </html>
 '''
 
-def get_stock_data(symbol):
-    try:
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=90)  # Get 90 days of data for better analysis
-        
+def download_chart_data(symbol):
+    """Download the dashboard history for a symbol and attach SMA/crossover signals"""
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=HISTORY_DAYS)  # Get 90 days of data for better analysis
+    
+    with metrics.timer('dashboard_stage_seconds', stage='download'):
         data = yf.download(symbol, start=start_date, end=end_date, progress=False)
+    if data.empty:
+        return None
+    if metrics.enabled:
+        metrics.inc('fetch_bytes_total', int(data.memory_usage(index=True).sum()), provider='dashboard')
+    
+    # Calculate trading signals
+    with metrics.timer('dashboard_stage_seconds', stage='signals'):
+        return with_signals(data)
+
+def with_signals(data):
+    """Bars with the SMA/crossover columns the dashboard charts"""
+    return data.join(calculate_signals(data))
+
+def load_chart_data(symbol):
+    """Cached ``download_chart_data``, shared by the page and the zoom endpoint"""
+    entry = response_cache.get_or_compute(('data', symbol, HISTORY_DAYS),
+                                          lambda: download_chart_data(symbol),
+                                          cacheable=lambda data: data is not None)
+    return entry.value
+
+def get_stock_data(symbol, width=DEFAULT_CHART_WIDTH):
+    try:
+        data = load_chart_data(symbol)
         
-        if data.empty:
+        if data is None:
             return None, None, None, "Invalid stock symbol. Please check and try again."
         
-        # Calculate trading signals
-        signals = calculate_signals(data)
-        data['Signal'] = signals
-        latest_signal = signals[-1]
-        
-        stock_data = {
-            'current_price': data['Close'].iloc[-1],
-            'price_change': data['Close'].iloc[-1] - data['Close'].iloc[0],
-            'returns': ((data['Close'].iloc[-1] / data['Close'].iloc[0]) - 1) * 100,
-            'volume': int(data['Volume'].iloc[-1])
-        }
-        
-        # Create interactive chart
-        chart_data = create_chart(data, symbol)
-        
+        stock_data, chart_data, latest_signal = dashboard_payload(data, symbol, width)
         return stock_data, chart_data, latest_signal, None
             
     except Exception as e:
         print(f"Error fetching {symbol}: {str(e)}")
         return None, None, None, "Error fetching data. Please try again."
 
+def dashboard_payload(data, symbol, width=DEFAULT_CHART_WIDTH):
+    """Summary metrics, chart JSON and latest signal the dashboard page shows"""
+    latest_signal = SIGNAL_NAMES[int(data['Signal'].iloc[-1])]
+    
+    stock_data = {
+        'current_price': data['Close'].iloc[-1],
+        'price_change': data['Close'].iloc[-1] - data['Close'].iloc[0],
+        'returns': ((data['Close'].iloc[-1] / data['Close'].iloc[0]) - 1) * 100,
+        'volume': int(data['Volume'].iloc[-1]),
+        # Bars the live stream must not send again
+        'last_bar': int(bar_ids(data.index[-1:])[0])
+    }
+    
+    # Create interactive chart
+    with metrics.timer('dashboard_stage_seconds', stage='chart'):
+        chart_data = create_chart(data, symbol, width)
+    
+    return stock_data, chart_data, latest_signal
+
+def enable_metrics():
+    """
+    Record request timings and cache statistics unless METRICS_ENABLED=0.
+    Called when a server starts rather than on import, so importing the
+    dashboard's helpers leaves the process-wide registry alone.
+    """
+    if os.environ.get('METRICS_ENABLED', '1') != '0':
+        metrics.enable()
+
+@app.before_request
+def start_timer():
+    if metrics.enabled:
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    if metrics.enabled and 'request_start' in g:
+        endpoint = request.endpoint or 'unknown'
+        metrics.observe('http_request_seconds', time.perf_counter() - g.request_start, endpoint=endpoint)
+        metrics.inc('http_requests_total', endpoint=endpoint, status=response.status_code)
+        # Streamed bodies are counted by their producer; measuring one here would buffer it
+        if not response.is_streamed:
+            metrics.inc('http_response_bytes_total', response.calculate_content_length() or 0, endpoint=endpoint)
+    return response
+
 @app.route('/')
 def index():
     symbol = request.args.get('symbol', '').upper().strip()
+    width = chart_width(request.args.get('width'))
     
     if symbol:
-        stock_data, chart_data, latest_signal, error = get_stock_data(symbol)
-        return render_template_string(HTML_TEMPLATE,
-                                   symbol=symbol,
-                                   stock_data=stock_data,
-                                   chart_data=chart_data,
-                                   latest_signal=latest_signal,
-                                   error=error)
+        # Identical requests within a bar share one download and chart build
+        entry = response_cache.get_or_compute((symbol, HISTORY_DAYS, width),
+                                              lambda: get_stock_data(symbol, width),
+                                              cacheable=lambda result: result[3] is None)
+        if request.if_none_match.contains(entry.etag):
+            response = make_response('', 304)
+        else:
+            stock_data, chart_data, latest_signal, error = entry.value
+            response = make_response(render_template_string(HTML_TEMPLATE,
+                                                             symbol=symbol,
+                                                             stock_data=stock_data,
+                                                             chart_data=chart_data,
+                                                             latest_signal=latest_signal,
+                                                             error=error))
+        response.set_etag(entry.etag)
+        response.last_modified = datetime.fromtimestamp(entry.created, tz=timezone.utc)
+        response.cache_control.max_age = entry.max_age()
+        response.cache_control.must_revalidate = True
+        return response
     
     return render_template_string(HTML_TEMPLATE,
                                 symbol='',
@@ -261,7 +412,227 @@ def index():
                                 latest_signal=None,
                                 error=None)
 
+def compute_signal_arrays(symbols, strategy_name, params, period, interval):
+    """
+    Run a strategy over several symbols and return compact signal arrays
+
+    Returns:
+        dict: symbol -> {'t': epoch seconds, 's': signal codes, 'last': latest code},
+        or {'error': message} for symbols that could not be loaded
+    """
+    strategy = STRATEGIES[strategy_name](**params)
+    results = {}
+    for symbol, data in data_fetcher.iter_stock_data(symbols, period, interval):
+        if data is None or data.empty:
+            results[symbol] = {'error': 'No data'}
+            continue
+        codes = strategy.compute(data).signal
+        index = pd.DatetimeIndex(data.index)
+        epochs = (index.tz_convert('UTC') if index.tz is not None else index).as_unit('s').asi8
+        results[symbol] = {'t': epochs.tolist(), 's': codes.tolist(), 'last': int(codes[-1])}
+    return {symbol: results[symbol] for symbol in symbols}
+
+def signal_request(args):
+    """
+    Validated /api/signals query: (symbols, strategy name, params, period, interval)
+
+    Raises:
+        ValueError: With the message returned to the client
+    """
+    symbols = [s.strip().upper() for s in args.get('symbols', '').split(',') if s.strip()]
+    symbols = list(dict.fromkeys(symbols))
+    strategy_name = args.get('strategy', 'MA').upper()
+    period = args.get('period', '3mo')
+    interval = args.get('interval', '1d')
+
+    if not symbols:
+        raise ValueError('No symbols given')
+    if len(symbols) > MAX_API_SYMBOLS:
+        raise ValueError(f'At most {MAX_API_SYMBOLS} symbols per request')
+    if strategy_name not in STRATEGIES:
+        raise ValueError(f'Unknown strategy: {strategy_name}')
+    try:
+        params = json.loads(args.get('params', '{}'))
+        STRATEGIES[strategy_name](**params)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Invalid params: {e}')
+    return symbols, strategy_name, params, period, interval
+
+@app.route('/api/signals')
+def api_signals():
+    """
+    Signals for several symbols as compact arrays, e.g.
+    /api/signals?symbols=AAPL,MSFT&strategy=RSI&params={"period":14}&period=6mo&interval=1d
+    """
+    try:
+        symbols, strategy_name, params, period, interval = signal_request(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    key = ('signals', tuple(symbols), strategy_name, json.dumps(params, sort_keys=True), period, interval)
+    entry = response_cache.get_or_compute(
+        key, lambda: compute_signal_arrays(symbols, strategy_name, params, period, interval))
+    if request.if_none_match.contains(entry.etag):
+        response = make_response('', 304)
+    else:
+        response = jsonify({'strategy': strategy_name, 'params': params, 'period': period,
+                            'interval': interval, 'symbols': entry.value})
+    response.set_etag(entry.etag)
+    response.cache_control.max_age = entry.max_age()
+    return response
+
+def screen_records(strategy_name, params, interval, signal):
+    """Ranked scan of the stored universe as JSON-ready rows"""
+    ranked = screener.scan(STRATEGIES[strategy_name](**params), signal=signal, interval=interval)
+    ranked['date'] = [date.isoformat() for date in ranked['date']]
+    ranked = ranked.astype(object).where(ranked.notna(), None)
+    return ranked.to_dict('records')
+
+def screen_request(args):
+    """
+    Validated /screen query: (strategy name, params, interval, signal, page, per_page)
+
+    Raises:
+        ValueError: With the message returned to the client
+    """
+    strategy_name = args.get('strategy', 'MA').upper()
+    interval = args.get('interval', screener.interval)
+    signal = args.get('signal', '').upper() or None
+    if strategy_name not in STRATEGIES:
+        raise ValueError(f'Unknown strategy: {strategy_name}')
+    if signal is not None and signal not in SIGNAL_NAMES.values():
+        raise ValueError(f'Unknown signal: {signal}')
+    try:
+        page = max(1, int(args.get('page', 1)))
+        per_page = min(MAX_SCREEN_PAGE_SIZE, max(1, int(args.get('per_page', 50))))
+    except ValueError:
+        raise ValueError('page and per_page must be integers')
+    try:
+        params = json.loads(args.get('params', '{}'))
+        if strategy_name == 'SR':
+            # A centered window has no signal at the latest bar
+            params.setdefault('causal', True)
+        if STRATEGIES[strategy_name](**params).lookahead:
+            raise ValueError('the screener needs causal=True')
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Invalid params: {e}')
+    return strategy_name, params, interval, signal, page, per_page
+
+def screen_page(rows, strategy_name, params, interval, signal, page, per_page, elapsed):
+    """One page of ranked screener rows as the /screen response body"""
+    offset = (page - 1) * per_page
+    return {'strategy': strategy_name, 'params': params, 'interval': interval,
+            'signal': signal, 'page': page, 'per_page': per_page, 'total': len(rows),
+            'results': rows[offset:offset + per_page], 'elapsed': round(elapsed, 4)}
+
+@app.route('/screen')
+def screen():
+    """
+    Every stored symbol ranked by the strength of its latest signal, e.g.
+    /screen?strategy=RSI&params={"period":14}&signal=BUY&page=1&per_page=50
+    """
+    try:
+        strategy_name, params, interval, signal, page, per_page = screen_request(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    start = time.perf_counter()
+    key = ('screen', strategy_name, json.dumps(params, sort_keys=True), interval, signal)
+    entry = response_cache.get_or_compute(
+        key, lambda: screen_records(strategy_name, params, interval, signal))
+    return jsonify(screen_page(entry.value, strategy_name, params, interval, signal, page, per_page,
+                               time.perf_counter() - start))
+
+def chart_range(data, start, end):
+    """
+    Bars of a zoomed view and its x range (None for the whole history)
+
+    Raises:
+        ValueError: If ``start`` or ``end`` is not a timestamp
+    """
+    if not (start and end):
+        return data, None
+    x_range = [pd.Timestamp(start), pd.Timestamp(end)]
+    tz = getattr(data.index, 'tz', None)
+    bounds = [ts.tz_localize(tz) if tz is not None and ts.tz is None else ts for ts in x_range]
+    # One bar of margin on each side so the edges of the view stay filled
+    lo = max(0, data.index.searchsorted(bounds[0]) - 1)
+    hi = data.index.searchsorted(bounds[1], side='right') + 1
+    return data.iloc[lo:hi], x_range
+
+@app.route('/api/chart')
+def api_chart():
+    """
+    Chart JSON for a zoomed range at the resolution of the viewport, e.g.
+    /api/chart?symbol=AAPL&start=2024-01-02&end=2024-02-01&width=1200
+    """
+    symbol = request.args.get('symbol', '').upper().strip()
+    width = chart_width(request.args.get('width'))
+    if not symbol:
+        return jsonify({'error': 'No symbol given'}), 400
+    try:
+        data = load_chart_data(symbol)
+    except Exception as e:
+        print(f"Error fetching {symbol}: {str(e)}")
+        data = None
+    if data is None:
+        return jsonify({'error': 'Error fetching data. Please try again.'}), 404
+
+    try:
+        data, x_range = chart_range(data, request.args.get('start'), request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'Invalid range'}), 400
+
+    response = make_response(create_chart(data, symbol, width, x_range))
+    response.mimetype = 'application/json'
+    return response
+
+def stream_after(last_event_id, after):
+    """
+    Id of the newest bar a stream client has: Last-Event-ID when the
+    browser reconnects, else the page's ``after``
+
+    Raises:
+        ValueError: If the id is not an integer
+    """
+    value = last_event_id or after
+    return int(value) if value else None
+
+@app.route('/stream')
+def stream():
+    """
+    Server-sent chart updates for a symbol: each closed bar's OHLC, SMA
+    points and crossover markers as a small delta, e.g.
+    /stream?symbol=AAPL&after=1717372800
+    """
+    symbol = request.args.get('symbol', '').upper().strip()
+    if not symbol:
+        return jsonify({'error': 'No symbol given'}), 400
+    try:
+        after = stream_after(request.headers.get('Last-Event-ID'), request.args.get('after'))
+    except ValueError:
+        return jsonify({'error': 'Invalid event id'}), 400
+    subscription = stream_hub.subscribe(symbol, after)
+    response = Response(subscription.frames(), mimetype='text/event-stream')
+    # Also covers a client that leaves before the first frame
+    response.call_on_close(subscription.close)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(response_cache.stats())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Request timings, fetch counters and cache hit rates in Prometheus text format"""
+    response = make_response(metrics.render_prometheus())
+    response.mimetype = 'text/plain; version=0.0.4'
+    return response
+
 if __name__ == '__main__':
+    enable_metrics()
     print("Starting AI Trading Bot...")
     print("Access the dashboard at http://localhost:5000")
     app.run(host='127.0.0.1', port=5000, debug=True)
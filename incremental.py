@@ -0,0 +1,483 @@
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+# Exact sums are recomputed from the window buffer once per this many window
+# lengths, bounding floating-point drift of the running sums
+RESYNC_WINDOWS = 64
+
+
+def _as_row(values, n: int) -> np.ndarray:
+    row = np.asarray(values, dtype=np.float64).reshape(-1)
+    if row.shape[0] == 1 and n > 1:
+        row = np.full(n, row[0])
+    if row.shape[0] != n:
+        raise ValueError(f"Expected {n} values per update, got {row.shape[0]}")
+    return row
+
+
+def _result(values: np.ndarray, scalar: bool):
+    return values[0] if scalar else values
+
+
+class IncrementalIndicator:
+    """
+    Base class for indicators updated one bar at a time.
+
+    Every indicator keeps state for ``n`` independent series (one per symbol),
+    so a single ``update`` call with an array of ``n`` new values advances all
+    of them in O(1) vectorized work. Scalars are accepted when ``n == 1`` and a
+    scalar is returned. Values are NaN until enough bars have been seen, as in
+    the pandas batch versions.
+    """
+
+    def __init__(self, n: int = 1):
+        self.n = n
+        self.count = 0
+
+    def update(self, value):
+        raise NotImplementedError
+
+    def update_batch(self, values) -> np.ndarray:
+        """Feed several bars (shape ``(bars,)`` or ``(bars, n)``) and return every output"""
+        values = np.asarray(values, dtype=np.float64)
+        return np.array([self.update(row) for row in values])
+
+
+class RollingSum(IncrementalIndicator):
+    """Sum of the last ``window`` values kept as a running total"""
+
+    def __init__(self, window: int, n: int = 1):
+        super().__init__(n)
+        self.window = window
+        self.buffer = np.zeros((window, n))
+        self.total = np.zeros(n)
+        self._pos = 0
+
+    def push(self, row: np.ndarray) -> np.ndarray:
+        """Add one row and return the rolling sum (NaN until the window is full)"""
+        self.total += row - self.buffer[self._pos]
+        self.buffer[self._pos] = row
+        self._pos = (self._pos + 1) % self.window
+        self.count += 1
+        if self.count % (self.window * RESYNC_WINDOWS) == 0:
+            self.total = self.buffer.sum(axis=0)
+        if self.count < self.window:
+            return np.full(self.n, np.nan)
+        return self.total.copy()
+
+    def update(self, value):
+        return _result(self.push(_as_row(value, self.n)), np.ndim(value) == 0)
+
+
+class RollingMean(RollingSum):
+    """Simple moving average (running-sum SMA), matching ``rolling(window).mean()``"""
+
+    def push(self, row: np.ndarray) -> np.ndarray:
+        return super().push(row) / self.window
+
+
+class RollingStd(IncrementalIndicator):
+    """
+    Rolling sample standard deviation via Welford's update for a sliding
+    window, matching ``rolling(window).std()``
+    """
+
+    def __init__(self, window: int, n: int = 1):
+        super().__init__(n)
+        self.window = window
+        self.buffer = np.zeros((window, n))
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros(n)
+        self._pos = 0
+
+    def push(self, row: np.ndarray) -> np.ndarray:
+        if self.count < self.window:
+            # Window still filling: plain Welford accumulation
+            self.count += 1
+            delta = row - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (row - self.mean)
+        else:
+            # Replace the oldest value
+            old = self.buffer[self._pos]
+            new_mean = self.mean + (row - old) / self.window
+            self.m2 += (row - old) * (row - new_mean + old - self.mean)
+            self.mean = new_mean
+            self.count += 1
+        self.buffer[self._pos] = row
+        self._pos = (self._pos + 1) % self.window
+        if self.count % (self.window * RESYNC_WINDOWS) == 0:
+            self.mean = self.buffer.mean(axis=0)
+            self.m2 = ((self.buffer - self.mean) ** 2).sum(axis=0)
+        if self.count < self.window or self.window < 2:
+            return np.full(self.n, np.nan)
+        return np.sqrt(np.maximum(self.m2, 0.0) / (self.window - 1))
+
+    def update(self, value):
+        return _result(self.push(_as_row(value, self.n)), np.ndim(value) == 0)
+
+
+class ExponentialMean(IncrementalIndicator):
+    """Recursive EMA matching ``ewm(span=span, adjust=False).mean()``"""
+
+    def __init__(self, span: float, n: int = 1):
+        super().__init__(n)
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = np.full(n, np.nan)
+
+    def push(self, row: np.ndarray) -> np.ndarray:
+        if self.count == 0:
+            self.value = row.copy()
+        else:
+            self.value = self.value + self.alpha * (row - self.value)
+        self.count += 1
+        return self.value.copy()
+
+    def update(self, value):
+        return _result(self.push(_as_row(value, self.n)), np.ndim(value) == 0)
+
+
+class RollingRSI(IncrementalIndicator):
+    """
+    RSI from rolling means of gains and losses, matching
+    ``RSIStrategy.calculate_rsi``. With ``wilder=True`` the averages use
+    Wilder's smoothing (seeded with the first full-window mean) instead.
+    """
+
+    def __init__(self, period: int, n: int = 1, wilder: bool = False):
+        super().__init__(n)
+        self.period = period
+        self.wilder = wilder
+        self.gains = RollingMean(period, n)
+        self.losses = RollingMean(period, n)
+        self.avg_gain = np.full(n, np.nan)
+        self.avg_loss = np.full(n, np.nan)
+        self.previous = None
+
+    def push(self, row: np.ndarray) -> np.ndarray:
+        # The batch version turns the undefined first change into 0
+        delta = np.zeros(self.n) if self.previous is None else row - self.previous
+        self.previous = row.copy()
+        self.count += 1
+        gain = np.maximum(delta, 0.0)
+        loss = np.maximum(-delta, 0.0)
+
+        if self.wilder and self.count > self.period:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        else:
+            self.avg_gain = self.gains.push(gain)
+            self.avg_loss = self.losses.push(loss)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = self.avg_gain / self.avg_loss
+            return 100 - (100 / (1 + rs))
+
+    def update(self, value):
+        return _result(self.push(_as_row(value, self.n)), np.ndim(value) == 0)
+
+
+class RollingVWAP(IncrementalIndicator):
+    """Rolling VWAP from running price-volume and volume sums, matching ``VWAPStrategy``"""
+
+    def __init__(self, window: int, n: int = 1):
+        super().__init__(n)
+        self.pv = RollingSum(window, n)
+        self.volume = RollingSum(window, n)
+
+    def update(self, high, low, close, volume):
+        scalar = np.ndim(close) == 0
+        high, low, close, volume = (_as_row(v, self.n) for v in (high, low, close, volume))
+        typical_price = (high + low + close) / 3
+        self.count += 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = self.pv.push(typical_price * volume) / self.volume.push(volume)
+        return _result(vwap, scalar)
+
+
+class RollingMax(IncrementalIndicator):
+    """
+    Trailing-window maximum matching ``rolling(window).max()``, amortized
+    O(1) per bar.
+
+    This is the block form of the monotonic-deque algorithm (van Herk /
+    Gil-Werman): the window is the tail of the previous block of ``window``
+    bars plus the head of the current one, so it is the larger of a stored
+    suffix maximum and a running prefix maximum. Suffix maxima are rebuilt
+    once per block. Unlike a deque, every step is the same array operation
+    for all ``n`` symbols. A window holding a NaN is NaN, as in pandas.
+    """
+
+    def __init__(self, window: int, n: int = 1):
+        super().__init__(n)
+        self.window = window
+        self.block = np.full((window, n), -np.inf)
+        self.suffix = np.full((window + 1, n), -np.inf)
+        self.prefix = np.full(n, -np.inf)
+        self.last_nan = np.full(n, -window)
+        self._pos = 0
+
+    def push(self, row: np.ndarray) -> np.ndarray:
+        missing = np.isnan(row)
+        self.last_nan = np.where(missing, self.count, self.last_nan)
+        value = np.where(missing, -np.inf, row)
+        self.block[self._pos] = value
+        self.prefix = np.maximum(self.prefix, value)
+        out = np.maximum(self.suffix[self._pos + 1], self.prefix)
+        self._pos += 1
+        self.count += 1
+        if self._pos == self.window:
+            self.suffix[:-1] = np.maximum.accumulate(self.block[::-1], axis=0)[::-1]
+            self.prefix = np.full(self.n, -np.inf)
+            self._pos = 0
+        if self.count < self.window:
+            return np.full(self.n, np.nan)
+        return np.where(self.count - self.last_nan > self.window, out, np.nan)
+
+    def update(self, value):
+        return _result(self.push(_as_row(value, self.n)), np.ndim(value) == 0)
+
+
+class RollingMin(RollingMax):
+    """Trailing-window minimum matching ``rolling(window).min()``"""
+
+    def push(self, row: np.ndarray) -> np.ndarray:
+        return -super().push(-row)
+
+
+class ActiveLevels:
+    """
+    Sorted set of support/resistance price levels for one symbol.
+
+    A new level within ``tolerance`` (relative) of an existing one refreshes
+    it instead of adding a duplicate, levels not seen for ``max_age`` bars
+    are dropped, and at most ``max_levels`` of the most recently seen are
+    kept, so the set stays small. Lookups are binary searches.
+    """
+
+    def __init__(self, tolerance: float = 0.01, max_levels: int = 32, max_age: int = None):
+        self.tolerance = tolerance
+        self.max_levels = max_levels
+        self.max_age = max_age
+        self.prices = []
+        self.last_seen = []
+        self.touches = []
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def add(self, price: float, bar: int):
+        """Record a level confirmed at bar number ``bar``"""
+        i = bisect_left(self.prices, price)
+        for j in (i - 1, i):
+            if 0 <= j < len(self.prices) and abs(self.prices[j] - price) <= self.tolerance * price:
+                self.touches[j] += 1
+                self.last_seen[j] = bar
+                break
+        else:
+            self.prices.insert(i, price)
+            self.last_seen.insert(i, bar)
+            self.touches.insert(i, 1)
+        self._prune(bar)
+
+    def _prune(self, bar: int):
+        stale = [j for j, seen in enumerate(self.last_seen)
+                 if self.max_age is not None and bar - seen > self.max_age]
+        excess = len(self.prices) - len(stale) - self.max_levels
+        if excess > 0:
+            keep = sorted((j for j in range(len(self.prices)) if j not in stale),
+                          key=lambda j: self.last_seen[j])
+            stale += keep[:excess]
+        for j in sorted(stale, reverse=True):
+            del self.prices[j], self.last_seen[j], self.touches[j]
+
+    def nearest(self, price: float) -> tuple:
+        """(highest level at or below ``price``, lowest level at or above it), None where absent"""
+        below = bisect_right(self.prices, price)
+        above = bisect_left(self.prices, price)
+        return (self.prices[below - 1] if below else None,
+                self.prices[above] if above < len(self.prices) else None)
+
+
+class IncrementalStrategy:
+    """
+    Streaming counterpart of a strategy in strategies.py. ``update`` takes one
+    bar per symbol as keyword arrays (Open, High, Low, Close, Volume) and
+    returns a dict of the indicator columns plus an int8 'Signal', with the
+    same values ``generate_signals`` would produce for that bar.
+    """
+
+    def __init__(self, n: int = 1):
+        self.n = n
+
+    def update(self, **bar) -> dict:
+        raise NotImplementedError
+
+    def update_frame(self, data) -> dict:
+        """Feed a DataFrame of bars for a single symbol, returning the columns as arrays"""
+        columns = {}
+        for row in data.itertuples(index=False):
+            out = self.update(**row._asdict())
+            for name, value in out.items():
+                columns.setdefault(name, []).append(value)
+        return {name: np.array(values) for name, values in columns.items()}
+
+    @staticmethod
+    def _signal(buy: np.ndarray, sell: np.ndarray, scalar: bool):
+        signal = np.zeros(len(buy), dtype=np.int8)
+        signal[buy] = 1
+        signal[sell] = -1
+        return _result(signal, scalar)
+
+
+class IncrementalMovingAverageCrossover(IncrementalStrategy):
+    def __init__(self, short_window: int = 20, long_window: int = 50, n: int = 1):
+        super().__init__(n)
+        self.short = RollingMean(short_window, n)
+        self.long = RollingMean(long_window, n)
+
+    def update(self, Close, **bar) -> dict:
+        scalar = np.ndim(Close) == 0
+        close = _as_row(Close, self.n)
+        short = self.short.push(close)
+        long = self.long.push(close)
+        return {
+            'SMA_short': _result(short, scalar),
+            'SMA_long': _result(long, scalar),
+            'Signal': self._signal(short > long, short < long, scalar),
+        }
+
+
+class IncrementalRSIStrategy(IncrementalStrategy):
+    def __init__(self, period: int = 10, overbought: int = 65, oversold: int = 35, n: int = 1):
+        super().__init__(n)
+        self.rsi = RollingRSI(period, n)
+        self.overbought = overbought
+        self.oversold = oversold
+
+    def update(self, Close, **bar) -> dict:
+        scalar = np.ndim(Close) == 0
+        rsi = self.rsi.push(_as_row(Close, self.n))
+        return {
+            'RSI': _result(rsi, scalar),
+            'Signal': self._signal(rsi < self.oversold, rsi > self.overbought, scalar),
+        }
+
+
+class IncrementalMACDStrategy(IncrementalStrategy):
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9, n: int = 1):
+        super().__init__(n)
+        self.fast = ExponentialMean(fast_period, n)
+        self.slow = ExponentialMean(slow_period, n)
+        self.signal_line = ExponentialMean(signal_period, n)
+
+    def update(self, Close, **bar) -> dict:
+        scalar = np.ndim(Close) == 0
+        close = _as_row(Close, self.n)
+        macd = self.fast.push(close) - self.slow.push(close)
+        signal_line = self.signal_line.push(macd)
+        hist = macd - signal_line
+        return {
+            'MACD': _result(macd, scalar),
+            'Signal_Line': _result(signal_line, scalar),
+            'MACD_Hist': _result(hist, scalar),
+            'Signal': self._signal(hist > 0, hist < 0, scalar),
+        }
+
+
+class IncrementalBollingerBandsStrategy(IncrementalStrategy):
+    def __init__(self, window: int = 20, num_std: float = 2.0, n: int = 1):
+        super().__init__(n)
+        self.mean = RollingMean(window, n)
+        self.std = RollingStd(window, n)
+        self.num_std = num_std
+
+    def update(self, Close, **bar) -> dict:
+        scalar = np.ndim(Close) == 0
+        close = _as_row(Close, self.n)
+        middle = self.mean.push(close)
+        std = self.std.push(close)
+        upper = middle + std * self.num_std
+        lower = middle - std * self.num_std
+        return {
+            'Upper_Band': _result(upper, scalar),
+            'Middle_Band': _result(middle, scalar),
+            'Lower_Band': _result(lower, scalar),
+            'Signal': self._signal(close < lower, close > upper, scalar),
+        }
+
+
+class IncrementalVWAPStrategy(IncrementalStrategy):
+    def __init__(self, window: int = 14, n: int = 1):
+        super().__init__(n)
+        self.vwap = RollingVWAP(window, n)
+
+    def update(self, High, Low, Close, Volume, **bar) -> dict:
+        scalar = np.ndim(Close) == 0
+        vwap = np.atleast_1d(self.vwap.update(High, Low, Close, Volume))
+        close = _as_row(Close, self.n)
+        return {
+            'VWAP': _result(vwap, scalar),
+            'Signal': self._signal(close > vwap, close < vwap, scalar),
+        }
+
+
+class IncrementalSupportResistanceStrategy(IncrementalStrategy):
+    """
+    Causal support/resistance: ``SupportResistanceStrategy(causal=True)``
+    one bar at a time. Trailing highs and lows come from RollingMax and
+    RollingMin, touches are counted with running sums, and with
+    ``track_levels`` every confirmed level is kept in a per-symbol
+    ActiveLevels set whose nearest levels around the close are returned
+    as well. Level tracking loops over symbols in Python, so turn it off
+    for very wide universes.
+    """
+
+    def __init__(self, window: int = 20, num_touches: int = 2, n: int = 1,
+                 track_levels: bool = True, max_levels: int = 32):
+        super().__init__(n)
+        self.num_touches = num_touches
+        self.highs = RollingMax(window, n)
+        self.lows = RollingMin(window, n)
+        self.resistance_touches = RollingSum(window, n)
+        self.support_touches = RollingSum(window, n)
+        self.levels = [ActiveLevels(max_levels=max_levels) for _ in range(n)] if track_levels else None
+        self.count = 0
+
+    def update(self, High, Low, Close, **bar) -> dict:
+        scalar = np.ndim(Close) == 0
+        high, low, close = (_as_row(v, self.n) for v in (High, Low, Close))
+        highs = self.highs.push(high)
+        lows = self.lows.push(low)
+        with np.errstate(invalid='ignore'):
+            resistance_touch = np.abs(high - highs) < highs * 0.01
+            support_touch = np.abs(low - lows) < lows * 0.01
+        resistance_count = self.resistance_touches.push(resistance_touch.astype(np.float64))
+        support_count = self.support_touches.push(support_touch.astype(np.float64))
+        with np.errstate(invalid='ignore'):
+            resistance = np.where(resistance_count >= self.num_touches, highs, np.nan)
+            support = np.where(support_count >= self.num_touches, lows, np.nan)
+            buy = close < support * 1.02
+            sell = close > resistance * 0.98
+        self.count += 1
+
+        out = {
+            'Resistance': _result(resistance, scalar),
+            'Support': _result(support, scalar),
+        }
+        if self.levels is not None:
+            nearest_support = np.full(self.n, np.nan)
+            nearest_resistance = np.full(self.n, np.nan)
+            for i in np.flatnonzero(~np.isnan(resistance)):
+                self.levels[i].add(float(resistance[i]), self.count)
+            for i in np.flatnonzero(~np.isnan(support)):
+                self.levels[i].add(float(support[i]), self.count)
+            for i, levels in enumerate(self.levels):
+                if len(levels):
+                    below, above = levels.nearest(float(close[i]))
+                    nearest_support[i] = np.nan if below is None else below
+                    nearest_resistance[i] = np.nan if above is None else above
+            out['Nearest_Support'] = _result(nearest_support, scalar)
+            out['Nearest_Resistance'] = _result(nearest_resistance, scalar)
+        out['Signal'] = self._signal(buy, sell, scalar)
+        return out
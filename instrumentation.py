@@ -0,0 +1,263 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds in seconds, as in the Prometheus client defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+class _NullTimer:
+    """Shared no-op context manager handed out while metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, registry, name: str, labels: tuple):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry._observe(self.name, self.labels, time.perf_counter() - self.start)
+        return False
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values"""
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.worst = max(self.worst, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket that holds it"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.worst)
+        return self.worst
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and timing histograms keyed by name and labels.
+
+    Every recording call returns immediately while the registry is disabled
+    and ``timer`` hands back a shared no-op context manager, so instrumented
+    code costs one attribute check when metrics are off. Collectors are
+    callables returning ``{name: value}`` that are sampled as gauges when
+    the registry is rendered, e.g. cache statistics.
+    """
+
+    def __init__(self, enabled: bool = False, buckets: tuple = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """Forget everything recorded so far (collectors are kept)"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add ``value`` to a counter"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one value in a histogram"""
+        if not self.enabled:
+            return
+        self._observe(name, tuple(sorted(labels.items())), value)
+
+    def timer(self, name: str, **labels):
+        """Context manager recording its elapsed seconds in a histogram"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, tuple(sorted(labels.items())))
+
+    def _observe(self, name: str, labels: tuple, value: float):
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def register_collector(self, collect):
+        """Sample ``collect()`` -> {name: value} as gauges on every render"""
+        self._collectors.append(collect)
+
+    def register_stats(self, prefix: str, stats):
+        """Expose the numeric entries of a ``stats()`` dict as ``<prefix>_<key>`` gauges"""
+        self.register_collector(lambda: {f'{prefix}_{key}': value for key, value in stats().items()
+                                         if isinstance(value, (int, float))})
+
+    def _collected(self) -> dict:
+        gauges = dict(self._gauges)
+        for collect in self._collectors:
+            try:
+                for name, value in collect().items():
+                    gauges[(name, ())] = value
+            except Exception as e:
+                print(f"Error collecting metrics: {str(e)}")
+        return gauges
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(h.counts), h.count, h.total)
+                          for key, h in self._histograms.items()}
+        gauges = self._collected()
+
+        lines = []
+        for kind, series in (('counter', counters), ('gauge', gauges)):
+            for name in sorted({name for name, _ in series}):
+                lines.append(f'# TYPE {name} {kind}')
+                for (metric, labels), value in sorted(series.items(), key=_sort_key):
+                    if metric == name:
+                        lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f'# TYPE {name} histogram')
+            for (metric, labels), (counts, count, total) in sorted(histograms.items(), key=_sort_key):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+                lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> str:
+        """Human-readable table of timings and counters"""
+        with self._lock:
+            histograms = sorted(self._histograms.items(), key=_sort_key)
+            counters = sorted(self._counters.items(), key=_sort_key)
+            rows = [(f'{name}{_format_labels(labels)}', h.count, h.total, h.total / h.count,
+                     h.quantile(0.95), h.worst) for (name, labels), h in histograms]
+        gauges = sorted(self._collected().items(), key=_sort_key)
+
+        out = []
+        if rows:
+            width = max(len(row[0]) for row in rows)
+            out.append(f"{'timer':{width}s} {'count':>7s} {'total s':>9s} {'mean ms':>9s} "
+                       f"{'p95 ms':>9s} {'max ms':>9s}")
+            for label, count, total, mean, p95, worst in rows:
+                out.append(f'{label:{width}s} {count:7d} {total:9.3f} {mean * 1000:9.2f} '
+                           f'{p95 * 1000:9.2f} {worst * 1000:9.2f}')
+        values = [(f'{name}{_format_labels(labels)}', value) for (name, labels), value in counters + gauges]
+        if values:
+            width = max(len(label) for label, _ in values)
+            out.append('')
+            for label, value in values:
+                out.append(f'{label:{width}s} {_format_value(value)}')
+        return '\n'.join(out)
+
+
+def _sort_key(item):
+    (name, labels), _ = item
+    return name, labels
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return str(value)
+
+
+class profiled:
+    """
+    Profile a block with cProfile when ``enabled``; a no-op otherwise.
+
+    The top functions by cumulative time are printed on exit, and the raw
+    stats are dumped to ``path`` when given (open with ``python -m pstats``
+    or snakeviz).
+    """
+
+    def __init__(self, enabled: bool = True, path: str = None, limit: int = 25):
+        self.enabled = enabled
+        self.path = path
+        self.limit = limit
+        self.profiler = None
+
+    def __enter__(self):
+        if self.enabled:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler is None:
+            return False
+        self.profiler.disable()
+        if self.path:
+            self.profiler.dump_stats(self.path)
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats('cumulative').print_stats(self.limit)
+        print(stream.getvalue())
+        return False
+
+
+# Process-wide registry, off unless METRICS_ENABLED=1 or enabled explicitly
+metrics = MetricsRegistry(enabled=os.environ.get('METRICS_ENABLED', '0') == '1')
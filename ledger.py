@@ -0,0 +1,240 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from execution import BUY, SELL
+
+# One fixed-width record per trade; the segment file is a plain run of these
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<i8'),   # ns since the epoch, UTC (wall clock when the ledger is naive)
+    ('symbol', '<i4'),      # code into TradeLedger.symbols
+    ('side', 'i1'),         # BUY / SELL
+    ('shares', '<f8'),
+    ('price', '<f8'),
+    ('amount', '<f8'),      # cost of a buy, revenue of a sell
+])
+
+_SIDES = {'BUY': BUY, 'SELL': SELL}
+
+
+class TradeLedger:
+    """
+    Append-only trade log stored as typed columns.
+
+    Trades live in one growable structured array (int64 timestamps,
+    categorical symbol codes, int8 side, float64 shares/price/amount), so a
+    million trades take ~37 MB instead of a million dicts. Iterating yields
+    the same dicts TradingBot has always produced, so code written against
+    the old list keeps working.
+
+    With a ``path``, records are streamed to a binary segment file as they
+    are appended, and the symbol table and timezone go to ``<path>.meta.json``.
+    ``TradeLedger.load`` memory-maps the segment, so opening a large log
+    reads nothing until it is used.
+    """
+
+    def __init__(self, path: str = None, capacity: int = 1024, flush_every: int = 4096):
+        """
+        Args:
+            path (str): Segment file to stream appends to, or None to stay in
+                memory. An existing file is replaced; use ``load`` to continue it.
+            capacity (int): Initial number of records to allocate
+            flush_every (int): Buffered single appends before they are written out
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self.symbols = []
+        self.tz = None
+        self._codes = {}
+        self._records = np.empty(max(1, capacity), dtype=RECORD_DTYPE)
+        self._size = 0
+        self._written = 0
+        self._meta_written = None
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'TradeLedger':
+        """
+        Open a ledger written with ``path=`` or ``save``. The records are
+        memory-mapped read-only until the first append copies them.
+        """
+        ledger = cls(path)
+        meta_path = path + '.meta.json'
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            ledger.symbols = meta['symbols']
+            ledger.tz = meta['tz']
+            ledger._codes = {symbol: code for code, symbol in enumerate(ledger.symbols)}
+            ledger._meta_written = (len(ledger.symbols), ledger.tz)
+        if os.path.exists(path) and os.path.getsize(path) >= RECORD_DTYPE.itemsize:
+            if mmap:
+                records = np.memmap(path, dtype=RECORD_DTYPE, mode='r')
+            else:
+                records = np.fromfile(path, dtype=RECORD_DTYPE)
+            ledger._records = records
+            ledger._size = ledger._written = len(records)
+        return ledger
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self[i]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._size))]
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError('trade index out of range')
+        record = self._records[i]
+        side = int(record['side'])
+        trade = {
+            'date': self._timestamp(int(record['timestamp'])),
+            'symbol': self.symbols[record['symbol']],
+            'type': 'BUY' if side == BUY else 'SELL',
+            'shares': int(record['shares']),
+            'price': float(record['price']),
+        }
+        trade['cost' if side == BUY else 'revenue'] = float(record['amount'])
+        return trade
+
+    @property
+    def records(self) -> np.ndarray:
+        """Structured array of every trade (a view, do not modify)"""
+        return self._records[:self._size]
+
+    def append(self, trade: dict):
+        """Append one trade in TradingBot's dict format"""
+        side = _SIDES[trade['type']]
+        amount = trade.get('cost', 0) if side == BUY else trade.get('revenue', 0)
+        self._append(self._code(trade['symbol']), self._to_ns([trade['date']]), side,
+                     trade['shares'], trade['price'], amount)
+        if self.path and self._size - self._written >= self.flush_every:
+            self.flush()
+
+    def extend(self, trades):
+        """Append several trades in TradingBot's dict format"""
+        for trade in trades:
+            self.append(trade)
+
+    def append_arrays(self, symbol: str, dates, side, shares, price, amount):
+        """
+        Append a batch of trades for one symbol from arrays, e.g. the ledger
+        returned by ``execution.execute_signals``. Written out immediately
+        when the ledger has a path.
+        """
+        side = np.asarray(side)
+        if len(side) == 0:
+            return
+        self._append(self._code(symbol), self._to_ns(dates), side, shares, price, amount)
+        if self.path:
+            self.flush()
+
+    def _append(self, code: int, timestamps, side, shares, price, amount):
+        n = len(timestamps)
+        self._reserve(self._size + n)
+        block = self._records[self._size:self._size + n]
+        block['timestamp'] = timestamps
+        block['symbol'] = code
+        block['side'] = side
+        block['shares'] = shares
+        block['price'] = price
+        block['amount'] = amount
+        self._size += n
+
+    def _reserve(self, size: int):
+        # Memory-mapped records are read-only, so the first append copies them
+        if size <= len(self._records) and not isinstance(self._records, np.memmap):
+            return
+        grown = np.empty(max(size, 2 * len(self._records), 1024), dtype=RECORD_DTYPE)
+        grown[:self._size] = self._records[:self._size]
+        self._records = grown
+
+    def _code(self, symbol: str) -> int:
+        code = self._codes.get(symbol)
+        if code is None:
+            code = self._codes[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return code
+
+    def _to_ns(self, dates) -> np.ndarray:
+        index = pd.DatetimeIndex(dates)
+        if len(index) == 0:
+            return np.empty(0, dtype=np.int64)
+        if self._size == 0:
+            self.tz = str(index.tz) if index.tz is not None else None
+        if index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        return index.as_unit('ns').asi8
+
+    def _timestamp(self, ns: int) -> pd.Timestamp:
+        ts = pd.Timestamp(ns, unit='ns')
+        return ts.tz_localize('UTC').tz_convert(self.tz) if self.tz else ts
+
+    def flush(self):
+        """Write records appended since the last flush to the segment file"""
+        if not self.path:
+            return
+        meta = (len(self.symbols), self.tz)
+        if meta != self._meta_written:
+            _write_meta(self.path, self.symbols, self.tz)
+            self._meta_written = meta
+        if self._size > self._written:
+            # A fresh ledger starts a new segment; a loaded one continues its own
+            with open(self.path, 'ab' if self._written else 'wb') as f:
+                self._records[self._written:self._size].tofile(f)
+            self._written = self._size
+
+    def save(self, path: str):
+        """Write the whole ledger to a new segment file"""
+        tmp = f'{path}.tmp'
+        self.records.tofile(tmp)
+        os.replace(tmp, path)
+        _write_meta(path, self.symbols, self.tz)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Trades as a DataFrame with a categorical symbol column"""
+        records = self.records
+        dates = pd.to_datetime(records['timestamp'], unit='ns')
+        if self.tz:
+            dates = dates.tz_localize('UTC').tz_convert(self.tz)
+        return pd.DataFrame({
+            'date': dates,
+            'symbol': pd.Categorical.from_codes(records['symbol'], categories=self.symbols),
+            'type': np.where(records['side'] == BUY, 'BUY', 'SELL'),
+            'shares': records['shares'],
+            'price': records['price'],
+            'amount': records['amount'],
+        })
+
+    def metrics(self) -> dict:
+        """``utils.calculate_trade_metrics`` over the columns, without building dicts"""
+        if self._size == 0:
+            return {}
+        records = self.records
+        sells = records['side'] == SELL
+        # A sell's profit is its revenue (it carries no cost), as in the dict version
+        revenue = records['amount'][sells]
+        total_trades = self._size
+        profitable_trades = int(np.count_nonzero(revenue > 0))
+        total_profit = float(revenue.sum())
+        return {
+            'total_trades': total_trades,
+            'profitable_trades': profitable_trades,
+            'total_profit': total_profit,
+            'avg_profit_per_trade': total_profit / total_trades,
+            'win_rate': profitable_trades / total_trades,
+        }
+
+
+def _write_meta(path: str, symbols: list, tz: str):
+    tmp = f'{path}.meta.json.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'version': 1, 'symbols': symbols, 'tz': tz}, f)
+    os.replace(tmp, path + '.meta.json')
@@ -0,0 +1,302 @@
+import asyncio
+import time
+import numpy as np
+import pandas as pd
+from data_store import interval_to_timedelta
+from execution import execute_signals
+from instrumentation import metrics
+
+BAR_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+def _utc(ts) -> pd.Timestamp:
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize('UTC') if ts.tz is None else ts.tz_convert('UTC')
+
+
+class WallClock:
+    """Real time"""
+
+    def now(self) -> pd.Timestamp:
+        return pd.Timestamp.now(tz='UTC')
+
+    async def sleep_until(self, ts: pd.Timestamp):
+        await asyncio.sleep(max(0.0, (ts - self.now()).total_seconds()))
+
+
+class ReplayClock:
+    """
+    Simulated time for replays. ``sleep_until`` jumps straight to the target,
+    or takes ``(target - now) / speed`` real seconds when a speed is given.
+    """
+
+    def __init__(self, start, speed: float = None):
+        self._now = _utc(start)
+        self.speed = speed
+
+    def now(self) -> pd.Timestamp:
+        return self._now
+
+    async def sleep_until(self, ts: pd.Timestamp):
+        delay = (ts - self._now).total_seconds() / self.speed if self.speed else 0.0
+        await asyncio.sleep(max(0.0, delay))
+        self._now = max(self._now, ts)
+
+
+class BarFeed:
+    """
+    Source of completed bars. ``latest_bars`` returns the bars of one symbol
+    that closed after ``after`` and no later than ``as_of``, as a DataFrame.
+    """
+
+    async def latest_bars(self, symbol: str, interval: str, after, as_of) -> pd.DataFrame:
+        raise NotImplementedError
+
+    async def history(self, symbol: str, interval: str, as_of) -> pd.DataFrame:
+        """Bars closed by ``as_of``, used to warm up indicator state"""
+        return await self.latest_bars(symbol, interval, None, as_of)
+
+
+class ReplayFeed(BarFeed):
+    """
+    Replays stored bars as if they were arriving live. A bar stamped ``t``
+    becomes available once the clock passes ``t + interval``. ``latency``
+    maps symbols to seconds each request for them takes, to simulate slow
+    symbols.
+    """
+
+    def __init__(self, frames: dict, latency: dict = None, default_latency: float = 0.0):
+        self.frames = {}
+        self.stamps = {}
+        for symbol, df in frames.items():
+            index = pd.DatetimeIndex(df.index)
+            stamps = (index.tz_convert('UTC') if index.tz is not None else index.tz_localize('UTC'))
+            self.frames[symbol] = df
+            self.stamps[symbol] = stamps.as_unit('ns').asi8
+        self.latency = latency or {}
+        self.default_latency = default_latency
+        self.requests = 0
+
+    def start(self, interval: str, warmup: int = 0) -> pd.Timestamp:
+        """Clock time at which ``warmup`` bars of the earliest symbol have closed"""
+        first = min(stamps[min(warmup, len(stamps) - 1)] for stamps in self.stamps.values() if len(stamps))
+        return pd.Timestamp(first, tz='UTC') + interval_to_timedelta(interval)
+
+    async def latest_bars(self, symbol: str, interval: str, after, as_of) -> pd.DataFrame:
+        self.requests += 1
+        delay = self.latency.get(symbol, self.default_latency)
+        if delay:
+            await asyncio.sleep(delay)
+        stamps = self.stamps.get(symbol)
+        if stamps is None:
+            return None
+        closed_by = (_utc(as_of) - interval_to_timedelta(interval)).value
+        lo = 0 if after is None else np.searchsorted(stamps, _utc(after).value, side='right')
+        hi = np.searchsorted(stamps, closed_by, side='right')
+        return self.frames[symbol].iloc[lo:hi]
+
+
+class ProviderFeed(BarFeed):
+    """Newest bars from a DataProvider (e.g. YFinanceProvider), fetched off the event loop"""
+
+    def __init__(self, provider, history_period: str = '5d'):
+        self.provider = provider
+        self.history_period = history_period
+
+    async def latest_bars(self, symbol: str, interval: str, after, as_of) -> pd.DataFrame:
+        df = await asyncio.to_thread(self._fetch, symbol, interval, after)
+        if df is None or df.empty:
+            return df
+        index = pd.DatetimeIndex(df.index)
+        index = index.tz_convert('UTC') if index.tz is not None else index.tz_localize('UTC')
+        # Only bars that have closed, and none already seen
+        keep = index + interval_to_timedelta(interval) <= _utc(as_of)
+        if after is not None:
+            keep &= index > _utc(after)
+        return df[keep]
+
+    def _fetch(self, symbol: str, interval: str, after) -> pd.DataFrame:
+        # The provider's limiter blocks, so it is waited on in the worker thread
+        self.provider.limiter.acquire()
+        if after is None:
+            return self.provider.fetch_history(symbol, interval, period=self.history_period)
+        return self.provider.fetch_history(symbol, interval, start=after)
+
+
+class LiveTrader:
+    """
+    Long-running bar loop that trades a TradingBot's symbols as bars close.
+
+    A scheduler wakes at every bar boundary of ``interval`` and starts a
+    fetch of the newest bars for each symbol. Each symbol has its own
+    bounded queue and consumer task that pushes bars through the strategy's
+    incremental state and executes the signal against the bot's shared
+    capital, positions and trade ledger, with the same rules as a backtest.
+
+    Symbols never wait on each other. A symbol whose previous fetch is still
+    running, or whose queue is full, is skipped for that tick and catches up
+    on the next one, because a fetch returns every bar since the last one
+    seen. Throughput and tick-to-signal latency are recorded in ``stats``
+    and in the metrics registry.
+    """
+
+    def __init__(self, bot, feed: BarFeed, interval: str = '1m', clock=None,
+                 queue_size: int = 4, max_concurrency: int = 64, warmup: bool = True):
+        """
+        Args:
+            bot (TradingBot): Symbols, strategy, capital, positions and ledger to trade
+            feed (BarFeed): Source of new bars
+            interval (str): Bar interval
+            clock: WallClock (default) or ReplayClock
+            queue_size (int): Bar batches buffered per symbol before it is skipped
+            max_concurrency (int): Feed requests in flight at once
+            warmup (bool): Prime indicator state with history before the first tick
+        """
+        self.bot = bot
+        self.feed = feed
+        self.interval = interval
+        self.step = interval_to_timedelta(interval)
+        self.clock = clock if clock is not None else WallClock()
+        self.queue_size = queue_size
+        self.max_concurrency = max_concurrency
+        self.warmup = warmup
+        self.state = {symbol: bot.strategy.incremental() for symbol in bot.symbols}
+        self.last_bar = {symbol: None for symbol in bot.symbols}
+        self.position = {symbol: 0 for symbol in bot.symbols}
+        self.latest = {}
+        self.ticks = 0
+        self.bars = 0
+        self.skipped = 0
+        self.latencies = []
+        # tick start -> [symbols processed, when the last one finished]
+        self.tick_progress = {}
+        self._queues = {}
+        self._fetching = set()
+        self._semaphore = None
+        self._started = None
+
+    async def run(self, ticks: int = None, until=None):
+        """
+        Trade until ``ticks`` bar boundaries have passed or the clock reaches
+        ``until`` (forever if neither is given)
+        """
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._queues = {symbol: asyncio.Queue(self.queue_size) for symbol in self.bot.symbols}
+        consumers = [asyncio.ensure_future(self._consume(symbol)) for symbol in self.bot.symbols]
+        fetches = set()
+        until = _utc(until) if until is not None else None
+        try:
+            if self.warmup:
+                await asyncio.gather(*(self._prime(symbol) for symbol in self.bot.symbols))
+            self._started = time.perf_counter()
+            while ticks is None or self.ticks < ticks:
+                boundary = self._next_boundary(self.clock.now())
+                if until is not None and boundary > until:
+                    break
+                await self.clock.sleep_until(boundary)
+                tick_start = time.perf_counter()
+                self.ticks += 1
+                metrics.inc('live_ticks_total', interval=self.interval)
+                for symbol in self.bot.symbols:
+                    if symbol in self._fetching or self._queues[symbol].full():
+                        self.skipped += 1
+                        metrics.inc('live_skipped_total', symbol=symbol)
+                        continue
+                    self._fetching.add(symbol)
+                    task = asyncio.ensure_future(self._fetch(symbol, boundary, tick_start))
+                    fetches.add(task)
+                    task.add_done_callback(fetches.discard)
+                # Let this tick's fetches start before the clock moves on
+                await asyncio.sleep(0)
+            await asyncio.gather(*fetches)
+            for queue in self._queues.values():
+                await queue.join()
+        finally:
+            for task in consumers + list(fetches):
+                task.cancel()
+            await asyncio.gather(*consumers, *fetches, return_exceptions=True)
+            self.bot.trades.flush()
+        return self.stats()
+
+    def _next_boundary(self, now: pd.Timestamp) -> pd.Timestamp:
+        return now.floor(self.step) + self.step
+
+    async def _prime(self, symbol: str):
+        async with self._semaphore:
+            history = await self.feed.history(symbol, self.interval, self.clock.now())
+        if history is None or history.empty:
+            return
+        self.state[symbol].update_frame(history[[c for c in BAR_COLUMNS if c in history.columns]])
+        self.last_bar[symbol] = history.index[-1]
+
+    async def _fetch(self, symbol: str, boundary: pd.Timestamp, tick_start: float):
+        try:
+            async with self._semaphore:
+                bars = await self.feed.latest_bars(symbol, self.interval, self.last_bar[symbol], boundary)
+            if bars is not None and not bars.empty:
+                self.last_bar[symbol] = bars.index[-1]
+                await self._queues[symbol].put((bars, tick_start))
+        except Exception as e:
+            print(f"Error fetching live bars for {symbol}: {str(e)}")
+        finally:
+            self._fetching.discard(symbol)
+
+    async def _consume(self, symbol: str):
+        queue = self._queues[symbol]
+        state = self.state[symbol]
+        while True:
+            bars, tick_start = await queue.get()
+            try:
+                columns = [c for c in BAR_COLUMNS if c in bars.columns]
+                close = columns.index('Close')
+                values = np.column_stack([bars[c].to_numpy(dtype=np.float64) for c in columns])
+                for date, row in zip(bars.index, values):
+                    out = state.update(**dict(zip(columns, row)))
+                    self._execute(symbol, date, int(out['Signal']), row[close])
+                    self.latest[symbol] = out
+                self.bars += len(values)
+                done = time.perf_counter()
+                progress = self.tick_progress.setdefault(tick_start, [0, done])
+                progress[0] += 1
+                progress[1] = done
+                latency = done - tick_start
+                self.latencies.append(latency)
+                metrics.observe('live_tick_to_signal_seconds', latency, interval=self.interval)
+                metrics.inc('live_bars_total', len(bars), symbol=symbol)
+            except Exception as e:
+                print(f"Error processing live bar for {symbol}: {str(e)}")
+            finally:
+                queue.task_done()
+
+    def _execute(self, symbol: str, date, signal: int, close: float):
+        if signal == 0:
+            return
+        bot = self.bot
+        bot.capital, bot.positions[symbol], self.position[symbol], ledger = execute_signals(
+            [signal], [close], bot.capital, bot.positions[symbol], self.position[symbol])
+        if len(ledger['bar']):
+            bot.trades.append_arrays(symbol, [date], ledger['side'], ledger['shares'],
+                                     ledger['price'], ledger['amount'])
+
+    def stats(self) -> dict:
+        """
+        Ticks, bars processed, throughput and tick-to-signal latency
+        percentiles (ms). ``symbols_per_sec`` is the median over ticks of
+        the symbols processed in a tick divided by the time from its
+        boundary to its last signal; ``bars_per_sec`` is over the whole run.
+        """
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        latencies = np.array(self.latencies) * 1000
+        rates = [symbols / (done - start) for start, (symbols, done) in self.tick_progress.items()
+                 if done > start]
+        return {
+            'ticks': self.ticks,
+            'bars': self.bars,
+            'skipped': self.skipped,
+            'elapsed_s': elapsed,
+            'bars_per_sec': self.bars / elapsed if elapsed else 0.0,
+            'symbols_per_sec': float(np.median(rates)) if rates else 0.0,
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            'latency_p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            'latency_max_ms': float(latencies.max()) if len(latencies) else 0.0,
+        }
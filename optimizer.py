@@ -0,0 +1,199 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from execution import execute_signals, equity_curve
+from strategies import STRATEGIES
+from utils import calculate_returns, calculate_sharpe_ratio, calculate_max_drawdown
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Frames attached from shared memory, per worker process
+_shared_frames = {}
+_shared_blocks = []
+
+
+def param_grid(grid: dict) -> list:
+    """Expand {'param': [values, ...]} into a list of parameter dicts"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+class SharedPriceArrays:
+    """
+    Price arrays for several symbols copied once into shared memory so worker
+    processes can map them without pickling or re-copying DataFrames.
+
+    Use as a context manager; the blocks are released on exit.
+    """
+
+    def __init__(self, data: dict):
+        self.specs = {}
+        self._blocks = []
+        for symbol, df in data.items():
+            if df is None or df.empty:
+                continue
+            columns = [c for c in PRICE_COLUMNS if c in df.columns]
+            values = self._share(df[columns].to_numpy(dtype=np.float64).T)
+            index = self._share(_index_values(df.index))
+            self.specs[symbol] = {
+                'columns': columns,
+                'values': values,
+                'index': index,
+                'tz': str(df.index.tz) if getattr(df.index, 'tz', None) is not None else None,
+            }
+
+    def _share(self, array: np.ndarray) -> tuple:
+        block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        self._blocks.append(block)
+        return block.name, array.shape, array.dtype.str
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_shared_frames(specs: dict) -> dict:
+    """
+    Rebuild DataFrames over the shared blocks described by ``specs`` without
+    copying them. Used as the worker-process initializer.
+    """
+    frames = {}
+    for symbol, spec in specs.items():
+        values = _attach(*spec['values'])
+        index = pd.to_datetime(_attach(*spec['index']), unit='ns', utc=spec['tz'] is not None)
+        if spec['tz'] is not None:
+            index = index.tz_convert(spec['tz'])
+        frames[symbol] = pd.DataFrame(values.T, columns=spec['columns'], index=index, copy=False)
+    _shared_frames.clear()
+    _shared_frames.update(frames)
+    return frames
+
+
+def evaluate(data: pd.DataFrame, strategy_cls, params: dict, initial_capital: float = 10000) -> dict:
+    """
+    Backtest one parameter set on one symbol
+
+    Returns:
+        dict: total_return, sharpe_ratio and max_drawdown of the equity curve
+        (from utils.py), plus the trade count and final value
+    """
+    signal = strategy_cls(**params).compute(data).signal
+    metrics, _ = score_signals(signal, data['Close'].to_numpy(), data.index, initial_capital)
+    return metrics
+
+
+def score_signals(signal, close, index, initial_capital: float = 10000) -> tuple:
+    """
+    Execute a Signal/Close series from a flat start and score its equity curve
+
+    Returns:
+        tuple: (metrics dict as returned by ``evaluate``, equity pd.Series)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    _, _, _, ledger = execute_signals(signal, close, initial_capital)
+    equity = pd.Series(equity_curve(close, ledger, initial_capital), index=index)
+    metrics = {
+        'total_return': calculate_returns(equity),
+        'sharpe_ratio': calculate_sharpe_ratio(equity.pct_change().dropna()),
+        'max_drawdown': calculate_max_drawdown(equity),
+        'trades': len(ledger['bar']),
+        'final_value': equity.iloc[-1],
+    }
+    return metrics, equity
+
+
+def _evaluate_task(task: tuple) -> dict:
+    symbol, strategy_cls, params, initial_capital = task
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metrics = evaluate(_shared_frames[symbol], strategy_cls, params, initial_capital)
+    return {'symbol': symbol, **params, **metrics}
+
+
+class ParameterSweep:
+    """
+    Grid search over a strategy's parameters on several symbols in parallel.
+
+    Price arrays are placed in shared memory once; each worker process maps
+    them at start-up and evaluates its share of (symbol, parameters) tasks.
+    """
+
+    def __init__(self, strategy, grid: dict, initial_capital: float = 10000,
+                 processes: int = None, rank_by: str = 'sharpe_ratio', chunksize: int = None):
+        """
+        Args:
+            strategy: Strategy class or its short name ('MA', 'RSI', ...)
+            grid (dict): Parameter name -> list of values to try
+            initial_capital (float): Starting capital of every backtest
+            processes (int): Worker processes, defaults to all cores; 1 runs in-process
+            rank_by (str): Metric to rank by, highest first
+            chunksize (int): Tasks handed to a worker at a time
+        """
+        self.strategy_cls = STRATEGIES[strategy.upper()] if isinstance(strategy, str) else strategy
+        self.combinations = param_grid(grid)
+        self.initial_capital = initial_capital
+        self.processes = processes or os.cpu_count()
+        self.rank_by = rank_by
+        self.chunksize = chunksize
+
+    def run(self, data: dict) -> pd.DataFrame:
+        """
+        Evaluate every parameter combination on every symbol
+
+        Args:
+            data (dict): Symbol -> OHLCV DataFrame
+
+        Returns:
+            pd.DataFrame: One row per (symbol, parameters), ranked within each
+            symbol by ``rank_by``
+        """
+        with SharedPriceArrays(data) as shared:
+            tasks = [(symbol, self.strategy_cls, params, self.initial_capital)
+                     for symbol in shared.specs for params in self.combinations]
+            if not tasks:
+                return pd.DataFrame()
+
+            if self.processes == 1:
+                _shared_frames.update({symbol: data[symbol] for symbol in shared.specs})
+                rows = [_evaluate_task(task) for task in tasks]
+                _shared_frames.clear()
+            else:
+                chunksize = self.chunksize or max(1, len(tasks) // (self.processes * 4))
+                with ProcessPoolExecutor(max_workers=self.processes,
+                                         initializer=_init_worker,
+                                         initargs=(shared.specs,)) as pool:
+                    rows = list(pool.map(_evaluate_task, tasks, chunksize=chunksize))
+
+        results = pd.DataFrame(rows)
+        results = results.sort_values(['symbol', self.rank_by], ascending=[True, False],
+                                      na_position='last')
+        results['rank'] = results.groupby('symbol').cumcount() + 1
+        return results.reset_index(drop=True)
+
+
+def _init_worker(specs: dict):
+    attach_shared_frames(specs)
+
+
+def _attach(name: str, shape: tuple, dtype: str) -> np.ndarray:
+    block = shared_memory.SharedMemory(name=name)
+    _shared_blocks.append(block)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _index_values(index: pd.Index) -> np.ndarray:
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC')
+    return index.as_unit('ns').asi8
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+from compact import compact_frame
+from execution import execute_signals, equity_curve
+from feature_cache import FeatureStore
+from ledger import TradeLedger
+
+# Bytes per bar while a chunk is processed: the compact bars plus the
+# strategy's float64 indicator and temporary arrays (support/resistance, the
+# heaviest strategy, peaks at ~80 bytes per bar on top of its input)
+_BYTES_PER_BAR = 256
+
+
+class ChunkedPipeline:
+    """
+    Signals and execution over histories too long to hold in memory.
+
+    A symbol's bars are read a chunk at a time, from a DataFrame or
+    memory-mapped from an OHLCVStore partition, in compact dtypes. Each
+    chunk is extended by the strategy's ``warmup`` bars before it and
+    ``lookahead`` bars after it, so its signals equal those of a run over
+    the whole history (for MACD, to float64 rounding of the EWMs). Capital,
+    holdings and position are carried from chunk to chunk through
+    ``execute_signals``, trades stream into a TradeLedger and only the
+    equity curve is kept per bar.
+
+    Chunks are sized so the working set stays within ``memory_budget``
+    bytes. Call ``run`` once per symbol; capital is shared between calls as
+    in TradingBot.run.
+    """
+
+    def __init__(self, strategy, memory_budget: int = 256 * 1024 * 1024,
+                 initial_capital: float = 10000, fraction: float = 0.1, compact: bool = True,
+                 trade_log: str = None, keep_equity: bool = True):
+        """
+        Args:
+            strategy (TradingStrategy): Strategy to run
+            memory_budget (int): Bytes the chunk being processed may use
+            initial_capital (float): Starting capital
+            fraction (float): Share of capital used per buy
+            compact (bool): Convert each chunk with compact.compact_frame
+            trade_log (str): Segment file the ledger streams to, None to keep trades in memory
+            keep_equity (bool): Keep the per-bar equity curve (8 bytes per bar)
+        """
+        self.strategy = strategy
+        self.memory_budget = memory_budget
+        self.capital = initial_capital
+        self.fraction = fraction
+        self.compact = compact
+        self.keep_equity = keep_equity
+        self.positions = {}
+        self.trades = TradeLedger(trade_log)
+        self.chunks = 0
+
+    @property
+    def context(self) -> int:
+        """Extra bars read around every chunk"""
+        return self.strategy.warmup + self.strategy.lookahead
+
+    def chunk_bars(self) -> int:
+        """Bars of history handled per chunk within the memory budget"""
+        bars = self.memory_budget // _BYTES_PER_BAR - self.context
+        if bars < 1:
+            raise ValueError(f"memory_budget of {self.memory_budget} bytes cannot hold "
+                             f"the {self.context} bars of context the strategy needs")
+        return bars
+
+    def run(self, source, symbol: str, interval: str = None) -> dict:
+        """
+        Trade one symbol's history chunk by chunk
+
+        Args:
+            source: DataFrame of bars, or an OHLCVStore to read ``symbol`` at ``interval`` from
+            symbol (str): Symbol to trade
+            interval (str): Partition interval when reading from a store
+
+        Returns:
+            dict: 'equity' (pd.Series, or None without keep_equity), 'capital',
+            'shares' held at the end, 'bars' and 'chunks' processed
+        """
+        if isinstance(source, pd.DataFrame):
+            n_bars = len(source)
+            read = lambda lo, hi: source.iloc[lo:hi]
+        else:
+            n_bars = source.rows(symbol, interval)
+            read = lambda lo, hi: source.read_rows(symbol, interval, lo, hi)
+
+        # Chunk indicators are never reused, so they are not cached
+        features, self.strategy.features = self.strategy.features, FeatureStore(max_entries=0)
+        warmup, lookahead = self.strategy.warmup, self.strategy.lookahead
+        size = self.chunk_bars()
+        held = self.positions.get(symbol, 0)
+        position = 0
+        equity, index = [], []
+        chunks = 0
+        try:
+            for start in range(0, n_bars, size):
+                end = min(start + size, n_bars)
+                lo = max(0, start - warmup)
+                window = read(lo, min(n_bars, end + lookahead))
+                if self.compact:
+                    window = compact_frame(window)
+                keep = slice(start - lo, end - lo)
+                signal = self.strategy.compute(window).signal[keep]
+                close = window['Close'].to_numpy(dtype=np.float64)[keep]
+                dates = window.index[keep]
+                del window
+
+                capital, held_before = self.capital, held
+                self.capital, held, position, ledger = execute_signals(
+                    signal, close, capital, held, position, self.fraction)
+                if len(ledger['bar']):
+                    self.trades.append_arrays(symbol, dates[ledger['bar']], ledger['side'],
+                                              ledger['shares'], ledger['price'], ledger['amount'])
+                if self.keep_equity:
+                    equity.append(equity_curve(close, ledger, capital, held_before))
+                    index.append(dates)
+                chunks += 1
+        finally:
+            self.strategy.features = features
+        self.positions[symbol] = held
+        self.chunks += chunks
+        self.trades.flush()
+
+        curve = None
+        if self.keep_equity:
+            curve = pd.Series(np.concatenate(equity) if equity else np.empty(0),
+                              index=index[0].append(index[1:]) if index else None, name='equity')
+        return {'equity': curve, 'capital': self.capital, 'shares': held,
+                'bars': n_bars, 'chunks': chunks}
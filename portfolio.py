@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+from execution import BUY, SELL
+
+# Bytes of working arrays per (bar, symbol) cell while a chunk is processed
+_BYTES_PER_CELL = 64
+
+
+class PortfolioBacktester:
+    """
+    Backtest a strategy over many symbols that share one pool of capital.
+
+    All symbols are aligned on the union of their timestamps as a
+    dates x symbols grid, and time is stepped through once. At every bar,
+    sells are filled before buys so released cash is available, and buys are
+    sized from the cash left at that moment in symbol order. The per-symbol
+    rules match TradingBot: buy ``fraction`` of cash on a 1 while flat or
+    short, sell the whole holding on a -1 while flat or long.
+
+    The grid is never materialized in full. Time is processed in chunks
+    sized to ``memory_budget`` bytes, and only bars where some symbol can
+    trade are visited one at a time. Mark-to-market runs vectorized over
+    each chunk.
+    """
+
+    def __init__(self, strategy, initial_capital: float = 10000, fraction: float = 0.1,
+                 memory_budget: int = 256 * 1024 * 1024):
+        self.strategy = strategy
+        self.initial_capital = initial_capital
+        self.fraction = fraction
+        self.memory_budget = memory_budget
+
+    def run(self, data: dict, holdings: dict = None) -> dict:
+        """
+        Args:
+            data (dict): Symbol -> OHLCV DataFrame
+            holdings (dict): Symbol -> shares already held before the first
+                bar, sold on the first sell signal as TradingBot would
+
+        Returns:
+            dict: 'equity' (pd.Series of portfolio value on the common index),
+            'cash', 'positions' (symbol -> shares) and 'trades' (list of
+            dicts in TradingBot's format)
+        """
+        symbols, signals, closes, stamps, tz = self._prepare(data)
+        n = len(symbols)
+        if n == 0:
+            return {'equity': pd.Series(dtype=float), 'cash': self.initial_capital,
+                    'positions': {}, 'trades': []}
+
+        timeline = stamps[0]
+        for s in stamps[1:]:
+            timeline = np.union1d(timeline, s)
+        positions = [np.searchsorted(timeline, s) for s in stamps]
+
+        cash = self.initial_capital
+        held = np.array([(holdings or {}).get(symbol, 0) for symbol in symbols], dtype=np.int64)
+        state = np.zeros(n, dtype=np.int8)
+        last_signal = np.zeros(n, dtype=np.int8)
+        last_close = np.full(n, np.nan)
+        pending = set()
+        equity = np.empty(len(timeline))
+        trades = []
+
+        chunk = max(1, self.memory_budget // (_BYTES_PER_CELL * n))
+        for a in range(0, len(timeline), chunk):
+            b = min(a + chunk, len(timeline))
+            rows = b - a
+            sig = np.zeros((rows, n), dtype=np.int8)
+            close = np.full((rows, n), np.nan)
+            for j in range(n):
+                lo, hi = np.searchsorted(positions[j], [a, b])
+                sig[positions[j][lo:hi] - a, j] = signals[j][lo:hi]
+                close[positions[j][lo:hi] - a, j] = closes[j][lo:hi]
+
+            starts, last_signal = _run_starts(sig, last_signal)
+            start_rows = np.flatnonzero(starts.any(axis=1))
+
+            held_start = held.copy()
+            cash_start = cash
+            held_delta = np.zeros((rows, n), dtype=np.int64)
+            cash_rows = np.full(rows, np.nan)
+
+            def fill(r):
+                nonlocal cash
+                row_sig = sig[r]
+                for j in np.flatnonzero(row_sig == SELL):
+                    pending.discard(j)
+                    if state[j] >= 0 and held[j] > 0:
+                        price = close[r, j]
+                        shares = int(held[j])
+                        revenue = shares * price
+                        cash += revenue
+                        held[j] = 0
+                        held_delta[r, j] -= shares
+                        state[j] = -1
+                        trades.append((a + r, j, SELL, shares, price, revenue))
+                for j in np.flatnonzero((row_sig == BUY) & (state <= 0)):
+                    price = close[r, j]
+                    shares = int(cash * self.fraction / price)
+                    if shares <= 0:
+                        # Retried on later buy bars of the same run, as in the loop
+                        pending.add(j)
+                        continue
+                    pending.discard(j)
+                    cost = shares * price
+                    cash -= cost
+                    held[j] += shares
+                    held_delta[r, j] += shares
+                    state[j] = 1
+                    trades.append((a + r, j, BUY, shares, price, cost))
+                cash_rows[r] = cash
+
+            r = -1
+            i = 0
+            while True:
+                next_start = start_rows[i] if i < len(start_rows) else rows
+                if pending:
+                    cols = sorted(pending)
+                    retry = np.flatnonzero((sig[r + 1:next_start][:, cols] == BUY).any(axis=1))
+                    if len(retry):
+                        r = r + 1 + retry[0]
+                        fill(r)
+                        continue
+                if i >= len(start_rows):
+                    break
+                r = next_start
+                i += 1
+                fill(r)
+
+            # Vectorized mark-to-market of the chunk
+            shares = held_start + np.cumsum(held_delta, axis=0)
+            prices, last_close = _forward_fill(close, last_close)
+            value = np.where(shares != 0, shares * prices, 0.0).sum(axis=1)
+            cash_filled = pd.Series(cash_rows).ffill().fillna(cash_start).to_numpy()
+            equity[a:b] = cash_filled + value
+
+        index = pd.to_datetime(timeline, unit='ns', utc=True)
+        index = index.tz_convert(tz) if tz is not None else index.tz_localize(None)
+        return {
+            'equity': pd.Series(equity, index=index, name='equity'),
+            'cash': cash,
+            'positions': {symbol: int(h) for symbol, h in zip(symbols, held)},
+            'trades': [{
+                'date': index[row],
+                'symbol': symbols[j],
+                'type': 'BUY' if side == BUY else 'SELL',
+                'shares': shares,
+                'price': price,
+                'cost' if side == BUY else 'revenue': amount,
+            } for row, j, side, shares, price, amount in trades],
+        }
+
+    def _prepare(self, data: dict) -> tuple:
+        """Generate each symbol's signals once and keep only the arrays the grid needs"""
+        symbols, signals, closes, stamps = [], [], [], []
+        tz = None
+        for symbol, df in data.items():
+            if df is None or df.empty:
+                continue
+            result = self.strategy.compute(df)
+            index = pd.DatetimeIndex(df.index)
+            if index.tz is not None:
+                tz = tz or index.tz
+                index = index.tz_convert('UTC')
+            symbols.append(symbol)
+            signals.append(result.signal)
+            closes.append(df['Close'].to_numpy(dtype=np.float64))
+            stamps.append(index.as_unit('ns').asi8)
+        return symbols, signals, closes, stamps, tz
+
+
+def _run_starts(sig: np.ndarray, last_signal: np.ndarray) -> tuple:
+    """
+    Mark bars where a column's non-zero signal differs from its previous
+    non-zero signal (carried in from the previous chunk as ``last_signal``)
+    """
+    rows, n = sig.shape
+    cols = np.arange(n)
+    latest = np.maximum.accumulate(np.where(sig != 0, np.arange(rows)[:, None], -1), axis=0)
+    previous = np.vstack([np.full((1, n), -1), latest[:-1]])
+    previous_signal = np.where(previous >= 0, sig[np.maximum(previous, 0), cols], last_signal)
+    starts = (sig != 0) & (sig != previous_signal)
+    carried = np.where(latest[-1] >= 0, sig[np.maximum(latest[-1], 0), cols], last_signal)
+    return starts, carried.astype(np.int8)
+
+
+def _forward_fill(values: np.ndarray, carry: np.ndarray) -> tuple:
+    """Forward-fill NaNs down each column, seeding with ``carry`` from the previous chunk"""
+    rows, n = values.shape
+    latest = np.maximum.accumulate(np.where(~np.isnan(values), np.arange(rows)[:, None], -1), axis=0)
+    filled = np.where(latest >= 0, values[np.maximum(latest, 0), np.arange(n)], carry)
+    return filled, filled[-1].copy()
@@ -0,0 +1,364 @@
+import asyncio
+import json
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import yfinance as yf
+
+
+class AsyncRateLimiter:
+    """Token bucket allowing ``rate`` requests per second, for use on one event loop"""
+
+    def __init__(self, rate: float = None, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+
+    async def acquire(self):
+        """Wait until a request may be made"""
+        if not self.rate:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class QuoteSource:
+    """
+    Source of latest prices. Subclasses implement ``fetch_quotes`` for a
+    batch of up to ``max_batch_size`` symbols and leave out symbols they
+    have no price for.
+    """
+    max_batch_size = 1
+    rate_limit = None  # requests per second, None for unlimited
+
+    async def fetch_quotes(self, symbols: list) -> dict:
+        raise NotImplementedError
+
+
+class YFinanceQuoteSource(QuoteSource):
+    """Last one-minute close for a batch of symbols from a single ``yf.download`` call"""
+    max_batch_size = 100
+    rate_limit = 2.0
+
+    async def fetch_quotes(self, symbols: list) -> dict:
+        return await asyncio.to_thread(self._download, symbols)
+
+    @staticmethod
+    def _download(symbols: list) -> dict:
+        data = yf.download(symbols, period='1d', interval='1m', progress=False, auto_adjust=False)
+        if data is None or data.empty:
+            return {}
+        close = data['Close']
+        if getattr(close, 'ndim', 1) == 1:
+            close = close.to_frame(symbols[0])
+        quotes = {}
+        for symbol in close.columns:
+            values = close[symbol].dropna()
+            if len(values):
+                quotes[symbol] = float(values.iloc[-1])
+        return quotes
+
+
+class HTTPQuoteSource(QuoteSource):
+    """
+    Quotes from an HTTP endpoint answering ``GET <url>?symbols=A,B`` with
+    ``{"quotes": {"A": 1.0, ...}}``, e.g. FakeQuoteServer
+    """
+
+    def __init__(self, url: str, max_batch_size: int = 100, rate_limit: float = None,
+                 timeout: float = 2.0):
+        """
+        Args:
+            url (str): Quote endpoint
+            max_batch_size (int): Symbols per request
+            rate_limit (float): Requests per second, None for no limit
+            timeout (float): Seconds before a request is abandoned. A caller
+                gives up after QuoteService's timeout, but the request's
+                thread stays blocked until this one expires.
+        """
+        self.url = url
+        self.max_batch_size = max_batch_size
+        self.rate_limit = rate_limit
+        self.timeout = timeout
+
+    async def fetch_quotes(self, symbols: list) -> dict:
+        return await asyncio.to_thread(self._get, symbols)
+
+    def _get(self, symbols: list) -> dict:
+        query = urllib.parse.urlencode({'symbols': ','.join(symbols)})
+        with urllib.request.urlopen(f'{self.url}?{query}', timeout=self.timeout) as response:
+            return json.loads(response.read())['quotes']
+
+
+class QuoteService:
+    """
+    Cached, batched, rate-limited access to live prices.
+
+    Lookups from every caller that arrive within ``batch_window`` seconds
+    are merged into as few source requests as the batch size allows, and a
+    symbol already being fetched is waited for rather than requested again.
+    Prices are reused for ``ttl`` seconds. A caller never waits longer than
+    ``timeout``: symbols that have not arrived by then get their last known
+    price (or None). A batch that times out is split in half and retried,
+    so a single stuck symbol ends up delaying only itself on later lookups.
+
+    ``get_quotes`` is a coroutine; ``get_prices`` and ``get_price`` are
+    blocking wrappers that run it on the service's own event loop thread,
+    so synchronous code (the bot, Flask) shares one cache.
+    """
+
+    def __init__(self, source: QuoteSource = None, ttl: float = 2.0, timeout: float = 1.0,
+                 rate_limit: float = None, burst: int = 1, max_concurrency: int = 8,
+                 batch_window: float = 0.002):
+        """
+        Args:
+            source (QuoteSource): Where prices come from, defaults to Yahoo Finance
+            ttl (float): Seconds a price is served from the cache
+            timeout (float): Longest a caller waits before falling back to the last price
+            rate_limit (float): Source requests per second, defaults to the source's limit
+            burst (int): Requests allowed back to back before the rate limit applies
+            max_concurrency (int): Source requests in flight at once
+            batch_window (float): Seconds to gather lookups into one batch
+        """
+        self.source = source if source is not None else YFinanceQuoteSource()
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.batch_window = batch_window
+        self.limiter = AsyncRateLimiter(rate_limit if rate_limit is not None else self.source.rate_limit,
+                                        burst)
+        self._quotes = {}      # symbol -> (price, monotonic time fetched)
+        self._inflight = {}    # symbol -> Future resolved by the batch fetching it
+        self._pending = []     # symbols waiting for the next batch
+        self._flush_handle = None
+        self._semaphore = None
+        self._tasks = set()
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.fallbacks = 0
+
+    async def get_quotes(self, symbols: list) -> dict:
+        """
+        Latest price per symbol, None where no price has ever been seen
+
+        Returns:
+            dict: symbol -> price, in the order given
+        """
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        now = time.monotonic()
+        prices = {}
+        waiting = {}
+        for symbol in dict.fromkeys(symbols):
+            cached = self._quotes.get(symbol)
+            if cached is not None and now - cached[1] < self.ttl:
+                self.hits += 1
+                prices[symbol] = cached[0]
+                continue
+            future = self._inflight.get(symbol)
+            if future is None:
+                future = self._inflight[symbol] = loop.create_future()
+                self._pending.append(symbol)
+                self.misses += 1
+            else:
+                self.coalesced += 1
+            waiting[symbol] = future
+
+        if self._pending and self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+
+        if waiting:
+            await asyncio.wait(list(waiting.values()), timeout=self.timeout)
+            for symbol, future in waiting.items():
+                price = future.result() if future.done() else None
+                if price is None:
+                    self.fallbacks += 1
+                    price = self.last_price(symbol)
+                prices[symbol] = price
+        return {symbol: prices[symbol] for symbol in symbols}
+
+    def last_price(self, symbol: str) -> float:
+        """Most recent price seen for ``symbol``, however old, or None"""
+        cached = self._quotes.get(symbol)
+        return cached[0] if cached is not None else None
+
+    def _flush(self):
+        """Split the pending symbols into source-sized batches and fetch them"""
+        self._flush_handle = None
+        pending, self._pending = self._pending, []
+        size = max(1, self.source.max_batch_size)
+        for i in range(0, len(pending), size):
+            task = asyncio.ensure_future(self._fetch(pending[i:i + size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, batch: list):
+        quotes = {}
+        timed_out = False
+        async with self._semaphore:
+            await self.limiter.acquire()
+            self.batches += 1
+            try:
+                quotes = await asyncio.wait_for(self.source.fetch_quotes(batch), self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                timed_out = True
+            except Exception as e:
+                self.errors += 1
+                print(f"Error fetching quotes for {', '.join(batch)}: {str(e)}")
+        if timed_out and len(batch) > 1:
+            # Split the batch so one stuck symbol only holds back itself. The
+            # halves are retried after the permit is released; holding it
+            # while they wait for theirs would deadlock the split.
+            half = len(batch) // 2
+            await asyncio.gather(self._fetch(batch[:half]), self._fetch(batch[half:]))
+            return
+        now = time.monotonic()
+        for symbol in batch:
+            price = quotes.get(symbol)
+            if price is not None:
+                self._quotes[symbol] = (float(price), now)
+            future = self._inflight.pop(symbol, None)
+            if future is not None and not future.done():
+                future.set_result(None if price is None else float(price))
+
+    def get_prices(self, symbols: list) -> dict:
+        """Blocking ``get_quotes`` for synchronous callers"""
+        future = asyncio.run_coroutine_threadsafe(self.get_quotes(symbols), self._event_loop())
+        return future.result()
+
+    def get_price(self, symbol: str) -> float:
+        return self.get_prices([symbol])[symbol]
+
+    def _event_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, daemon=True,
+                                                name='quote-service')
+                self._thread.start()
+            return self._loop
+
+    def close(self):
+        """Stop the background event loop, if one was started"""
+        with self._lock:
+            if self._loop is not None:
+                asyncio.run_coroutine_threadsafe(self._cancel_tasks(), self._loop).result()
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+                self._loop = None
+                self._thread = None
+
+    async def _cancel_tasks(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            'batches': self.batches,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'fallbacks': self.fallbacks,
+        }
+
+
+class FakeQuoteServer:
+    """
+    Local HTTP quote server for tests and benchmarks. Prices random-walk on
+    every request; ``latency`` delays each response and symbols in ``slow``
+    take ``slow_latency`` instead, to exercise timeouts.
+
+        with FakeQuoteServer(latency=0.05) as server:
+            service = QuoteService(HTTPQuoteSource(server.url))
+    """
+
+    def __init__(self, latency: float = 0.0, slow: set = None, slow_latency: float = 5.0,
+                 seed: int = 0):
+        self.latency = latency
+        self.slow = set(slow or ())
+        self.slow_latency = slow_latency
+        self.requests = 0
+        self._prices = {}
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/quotes'
+
+    def quotes(self, symbols: list) -> dict:
+        with self._lock:
+            self.requests += 1
+            for symbol in symbols:
+                price = self._prices.get(symbol, float(self._rng.uniform(10, 500)))
+                self._prices[symbol] = price * float(np.exp(self._rng.normal(0, 0.001)))
+            return {symbol: self._prices[symbol] for symbol in symbols}
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+                symbols = [s for s in query.get('symbols', [''])[0].split(',') if s]
+                time.sleep(fake.slow_latency if fake.slow.intersection(symbols) else fake.latency)
+                body = json.dumps({'quotes': fake.quotes(symbols)}).encode()
+                try:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client timed out on a slow symbol and hung up
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
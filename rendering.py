@@ -0,0 +1,227 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+MODES = ('sync', 'parallel', 'deferred', 'none')
+
+# Columns each chart kind draws; only these are hashed and sent to workers
+PLOT_COLUMNS = {
+    'MA': ['Close', 'Signal', 'SMA_short', 'SMA_long'],
+    'RSI': ['Close', 'Signal', 'RSI'],
+    'MACD': ['Close', 'Signal', 'MACD', 'Signal_Line', 'MACD_Hist'],
+    'BB': ['Close', 'Signal', 'Upper_Band', 'Middle_Band', 'Lower_Band'],
+    'VWAP': ['Close', 'Signal', 'VWAP'],
+    'SR': ['Close', 'Signal', 'Support', 'Resistance'],
+}
+
+
+def chart_kind(strategy) -> str:
+    """STRATEGIES key of the strategy's class (or a base class), 'MA' for anything else"""
+    from strategies import STRATEGIES
+    for name, cls in STRATEGIES.items():
+        if name != 'MA' and isinstance(strategy, cls):
+            return name
+    return 'MA'
+
+
+def strategy_params(strategy) -> dict:
+    """Public constructor parameters of a strategy instance"""
+    return {key: value for key, value in sorted(vars(strategy).items())
+            if not key.startswith('_') and key != 'features'}
+
+
+def content_hash(symbol: str, kind: str, params: dict, signals: pd.DataFrame) -> str:
+    """Fingerprint of everything that ends up in the image"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((symbol, kind, sorted(params.items()), list(signals.columns))).encode())
+    digest.update(pd.util.hash_pandas_object(signals, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _plot_price(ax, symbol: str, signals: pd.DataFrame, title: str = None):
+    # Plot buy/sell signals
+    buy_signals = signals[signals['Signal'] == 1]
+    sell_signals = signals[signals['Signal'] == -1]
+    ax.scatter(buy_signals.index, buy_signals['Close'], marker='^', color='g', label='Buy')
+    ax.scatter(sell_signals.index, sell_signals['Close'], marker='v', color='r', label='Sell')
+    ax.set_title(title or f'{symbol} Price and Signals')
+    ax.legend()
+
+
+def render_chart(path: str, symbol: str, kind: str, signals: pd.DataFrame) -> str:
+    """
+    Draw one strategy chart on an Agg canvas and save it to ``path``.
+    pyplot is not involved, so this is safe off the main thread and leaves
+    the caller's backend alone; in worker processes it only needs the
+    plotted columns.
+
+    Returns:
+        str: ``path``
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 8))
+    FigureCanvasAgg(fig)
+    if kind == 'MA':
+        ax = fig.add_subplot(1, 1, 1)
+        ax.plot(signals.index, signals['Close'], label='Price')
+        if 'SMA_short' in signals.columns:
+            ax.plot(signals.index, signals['SMA_short'], label='Short MA')
+            ax.plot(signals.index, signals['SMA_long'], label='Long MA')
+        _plot_price(ax, symbol, signals, f'{symbol} Trading Signals')
+    else:
+        ax1 = fig.add_subplot(2, 1, 1)
+        ax2 = fig.add_subplot(2, 1, 2)
+        ax1.plot(signals.index, signals['Close'], label='Price')
+
+        if kind == 'RSI':
+            ax2.plot(signals.index, signals['RSI'], label='RSI')
+            ax2.axhline(y=70, color='r', linestyle='--')
+            ax2.axhline(y=30, color='g', linestyle='--')
+            ax2.set_title('RSI Indicator')
+        elif kind == 'MACD':
+            ax2.plot(signals.index, signals['MACD'], label='MACD')
+            ax2.plot(signals.index, signals['Signal_Line'], label='Signal Line')
+            ax2.bar(signals.index, signals['MACD_Hist'], label='MACD Histogram')
+            ax2.set_title('MACD Indicator')
+        elif kind == 'BB':
+            ax1.plot(signals.index, signals['Middle_Band'], label='Middle Band')
+            ax1.plot(signals.index, signals['Upper_Band'], label='Upper Band')
+            ax1.plot(signals.index, signals['Lower_Band'], label='Lower Band')
+            width = (signals['Upper_Band'] - signals['Lower_Band']) / signals['Middle_Band']
+            ax2.plot(signals.index, width, label='Band Width')
+            ax2.set_title('Bollinger Bands Indicator')
+        elif kind == 'VWAP':
+            ax1.plot(signals.index, signals['VWAP'], label='VWAP')
+            ax2.plot(signals.index, signals['VWAP'], label='VWAP')
+            ax2.set_title('VWAP Indicator')
+        elif kind == 'SR':
+            ax2.plot(signals.index, signals['Support'], label='Support')
+            ax2.plot(signals.index, signals['Resistance'], label='Resistance')
+            ax2.set_title('Support/Resistance Indicator')
+        _plot_price(ax1, symbol, signals)
+        ax2.legend()
+
+    fig.tight_layout()
+    fig.savefig(path)
+    return path
+
+
+def _render_and_stamp(path: str, symbol: str, kind: str, signals: pd.DataFrame, digest: str) -> str:
+    render_chart(path, symbol, kind, signals)
+    # The sidecar is written after the image so a crash never leaves a stale match
+    with open(path + '.hash', 'w') as f:
+        f.write(digest)
+    return path
+
+
+class ChartRenderer:
+    """
+    Renders TradingBot charts without holding up the backtest.
+
+    Modes:
+        sync: draw immediately on the calling thread
+        parallel: draw in a process pool while the caller carries on
+        deferred: queue charts and draw them all (in the pool) at ``flush``
+        none: never draw
+
+    A chart is skipped when its ``.png.hash`` sidecar matches the hash of the
+    plotted columns, symbol and strategy parameters, so re-running over
+    unchanged data costs one hash per symbol.
+    """
+
+    def __init__(self, mode: str = 'sync', directory: str = '.', processes: int = None,
+                 skip_unchanged: bool = True):
+        if mode not in MODES:
+            raise ValueError(f"Unknown plot mode: {mode}")
+        self.mode = mode
+        self.directory = directory
+        self.processes = processes
+        self.skip_unchanged = skip_unchanged
+        self.rendered = 0
+        self.skipped = 0
+        self._pool = None
+        self._pending = []
+        self._deferred = []
+
+    def path(self, symbol: str) -> str:
+        return os.path.join(self.directory, f'{symbol}_trading_signals.png')
+
+    def submit(self, symbol: str, strategy, signals: pd.DataFrame):
+        """
+        Render (or schedule) the chart for one symbol
+
+        Returns:
+            str: Path of the chart, or None if nothing will be drawn
+        """
+        if self.mode == 'none':
+            return None
+        kind = chart_kind(strategy)
+        signals = signals[[c for c in PLOT_COLUMNS[kind] if c in signals.columns]]
+        path = self.path(symbol)
+        digest = content_hash(symbol, kind, strategy_params(strategy), signals)
+        if self.skip_unchanged and self._unchanged(path, digest):
+            self.skipped += 1
+            return path
+
+        task = (path, symbol, kind, signals, digest)
+        if self.mode == 'sync':
+            _render_and_stamp(*task)
+            self.rendered += 1
+        elif self.mode == 'parallel':
+            self._pending.append(self._get_pool().submit(_render_and_stamp, *task))
+        else:
+            self._deferred.append(task)
+        return path
+
+    def flush(self) -> list:
+        """Wait for every outstanding chart; returns the paths rendered since the last flush"""
+        if self._deferred:
+            if self.processes == 1:
+                paths = [_render_and_stamp(*task) for task in self._deferred]
+                self.rendered += len(paths)
+                self._deferred = []
+                return paths + self._wait()
+            pool = self._get_pool()
+            self._pending.extend(pool.submit(_render_and_stamp, *task) for task in self._deferred)
+            self._deferred = []
+        return self._wait()
+
+    def close(self):
+        self.flush()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _wait(self) -> list:
+        paths = []
+        for future in self._pending:
+            try:
+                paths.append(future.result())
+                self.rendered += 1
+            except Exception as e:
+                print(f"Error rendering chart: {str(e)}")
+        self._pending = []
+        return paths
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes)
+        return self._pool
+
+    @staticmethod
+    def _unchanged(path: str, digest: str) -> bool:
+        try:
+            with open(path + '.hash', 'r') as f:
+                return f.read() == digest and os.path.exists(path)
+        except OSError:
+            return False
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def next_boundary(now: float, ttl: float) -> float:
+    """Next epoch-aligned multiple of ``ttl`` seconds after ``now``"""
+    return (now // ttl + 1) * ttl
+
+
+class CacheEntry:
+    """A cached value with the validators needed for HTTP revalidation"""
+
+    def __init__(self, value, created: float, expires: float):
+        self.value = value
+        self.created = created
+        self.expires = expires
+        self.etag = hashlib.blake2b(repr(value).encode(), digest_size=16).hexdigest()
+
+    def max_age(self, now: float = None) -> int:
+        """Seconds until the entry expires"""
+        now = time.time() if now is None else now
+        return max(0, int(self.expires - now))
+
+
+class TTLCache:
+    """
+    Thread-safe cache whose entries expire at bar boundaries.
+
+    Expiry times are aligned to multiples of ``ttl`` seconds since the epoch,
+    so every entry rolls over when a new bar of that length starts rather
+    than ``ttl`` seconds after it happened to be computed. Concurrent misses
+    for the same key are coalesced: one caller computes, the others wait for
+    its result (single-flight).
+    """
+
+    def __init__(self, ttl: float = 60, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        # count, total seconds, worst seconds
+        self._latency = {kind: [0, 0.0, 0.0] for kind in ('hit', 'miss', 'coalesced')}
+
+    def get_or_compute(self, key, compute, cacheable=None) -> CacheEntry:
+        """
+        Return the live entry for ``key``, computing it with ``compute()`` on a miss
+
+        Args:
+            key: Hashable cache key
+            compute (callable): Produces the value on a miss
+            cacheable (callable): Optional predicate; values it rejects are
+                returned to every waiting caller but not stored
+        """
+        start = time.perf_counter()
+        entry, future, leader = self._lookup(key, start)
+        if entry is not None:
+            return entry
+
+        if not leader:
+            entry = future.result()
+            with self._lock:
+                self._record('coalesced', start)
+            return entry
+
+        try:
+            value = compute()
+        except BaseException as e:
+            self._fail(key, future, e)
+            raise
+        return self._finish(key, future, value, cacheable, start)
+
+    async def get_or_compute_async(self, key, compute, cacheable=None) -> CacheEntry:
+        """
+        ``get_or_compute`` for asyncio callers, with ``compute`` a coroutine
+        function. Misses coalesce with those of threaded callers. The
+        computation runs as a task of its own, so a caller that is cancelled
+        (by a request timeout, say) stops waiting without abandoning it and
+        the value is still cached for the next request.
+        """
+        start = time.perf_counter()
+        entry, future, leader = self._lookup(key, start)
+        if entry is not None:
+            return entry
+
+        if leader:
+            task = asyncio.ensure_future(self._compute_async(key, future, compute, cacheable, start))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        entry = await asyncio.shield(asyncio.wrap_future(future))
+        if not leader:
+            with self._lock:
+                self._record('coalesced', start)
+        return entry
+
+    async def _compute_async(self, key, future, compute, cacheable, start):
+        try:
+            value = await compute()
+        except BaseException as e:
+            # Raised to the callers through the future
+            self._fail(key, future, e)
+            return
+        self._finish(key, future, value, cacheable, start)
+
+    def _lookup(self, key, start: float) -> tuple:
+        # (live entry or None, future of the computation, whether this caller computes)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._record('hit', start)
+                return entry, None, False
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        return None, future, leader
+
+    def _finish(self, key, future: Future, value, cacheable, start: float) -> CacheEntry:
+        now = time.time()
+        entry = CacheEntry(value, now, next_boundary(now, self.ttl))
+        with self._lock:
+            if cacheable is None or cacheable(value):
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            del self._inflight[key]
+            self._record('miss', start)
+        future.set_result(entry)
+        return entry
+
+    def _fail(self, key, future: Future, error: BaseException):
+        with self._lock:
+            del self._inflight[key]
+        future.set_exception(error)
+
+    def _record(self, kind: str, start: float):
+        elapsed = time.perf_counter() - start
+        latency = self._latency[kind]
+        latency[0] += 1
+        latency[1] += elapsed
+        latency[2] = max(latency[2], elapsed)
+
+    def invalidate(self, key=None):
+        """Drop one entry, or all of them"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        """Hit rate, coalesced requests and lookup latency in milliseconds"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            stats = {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
+            for kind, (count, total, worst) in self._latency.items():
+                stats[f'{kind}_count'] = count
+                stats[f'{kind}_latency_avg_ms'] = total / count * 1000 if count else 0.0
+                stats[f'{kind}_latency_max_ms'] = worst * 1000
+            return stats
@@ -0,0 +1,210 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from data_store import OHLCVStore
+from feature_cache import FeatureStore
+from instrumentation import metrics
+from rendering import chart_kind
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+SIGNAL_NAMES = {1: 'BUY', -1: 'SELL', 0: 'HOLD'}
+
+
+def load_matrix(store: OHLCVStore, symbols: list, interval: str = '1d', bars: int = 250,
+                max_workers: int = 8) -> pd.DataFrame:
+    """
+    The newest ``bars`` bars of every symbol as one dates x symbols matrix
+
+    Returns:
+        pd.DataFrame: Columns are a (field, symbol) MultiIndex, so
+        ``matrix['Close']`` is a dates x symbols frame; NaN where a symbol
+        has no bar at a date. Symbols without a partition are left out, and
+        the frame has no columns if none has one.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        parts = list(pool.map(lambda symbol: store.tail_arrays(symbol, interval, bars, FIELDS), symbols))
+    loaded = [(symbol, part) for symbol, part in zip(symbols, parts) if part is not None and len(part[0])]
+    if not loaded:
+        return pd.DataFrame(columns=pd.MultiIndex.from_product([FIELDS, []]))
+
+    tz = next((meta['tz'] for _, (_, _, meta) in loaded if meta['tz']), None)
+    timeline = np.unique(np.concatenate([ns for _, (ns, _, _) in loaded]))
+    if len(timeline) > bars:
+        timeline = timeline[-bars:]
+
+    names = [symbol for symbol, _ in loaded]
+    values = np.full((len(timeline), len(FIELDS) * len(names)), np.nan)
+    for j, (_, (ns, columns, _)) in enumerate(loaded):
+        keep = ns >= timeline[0]
+        rows = np.searchsorted(timeline, ns[keep])
+        for f, field in enumerate(FIELDS):
+            if field in columns:
+                values[rows, f * len(names) + j] = columns[field][keep]
+
+    index = pd.to_datetime(timeline, unit='ns', utc=True)
+    index = index.tz_convert(tz) if tz is not None else index.tz_localize(None)
+    return pd.DataFrame(values, index=index, columns=pd.MultiIndex.from_product([FIELDS, names]))
+
+
+def signal_strength(strategy, result, close: np.ndarray) -> np.ndarray:
+    """
+    How strongly each bar leans bullish (positive) or bearish (negative),
+    in units that compare across symbols:
+
+        MA: short/long SMA spread, % of the long SMA
+        RSI: points past the oversold or overbought threshold
+        MACD: histogram, % of the close
+        BB: breach of the lower or upper band, in band widths
+        VWAP: distance of the close from VWAP, %
+        SR: distance past the buy/sell zones around support/resistance, % of the close
+        Ensemble: the members' weighted score
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if 'Score' in result:
+            return result['Score']
+        kind = chart_kind(strategy)
+        if kind == 'RSI':
+            rsi = result['RSI']
+            return _lean(strategy.oversold - rsi, rsi - strategy.overbought)
+        if kind == 'MACD':
+            return result['MACD_Hist'] / close * 100
+        if kind == 'BB':
+            width = result['Upper_Band'] - result['Lower_Band']
+            return _lean((result['Lower_Band'] - close) / width, (close - result['Upper_Band']) / width)
+        if kind == 'VWAP':
+            return (close - result['VWAP']) / result['VWAP'] * 100
+        if kind == 'SR':
+            return _lean((result['Support'] * 1.02 - close) / close * 100,
+                         (close - result['Resistance'] * 0.98) / close * 100)
+        return (result['SMA_short'] - result['SMA_long']) / result['SMA_long'] * 100
+
+
+def _lean(bullish: np.ndarray, bearish: np.ndarray) -> np.ndarray:
+    # The larger of the two pulls, signed; a missing side never wins
+    bullish = np.where(np.isnan(bullish), -np.inf, bullish)
+    bearish = np.where(np.isnan(bearish), -np.inf, bearish)
+    strength = np.where(bullish >= bearish, bullish, -bearish)
+    return np.where(np.isinf(strength), np.nan, strength)
+
+
+class Screener:
+    """
+    Cross-sectional scan of a universe stored in an OHLCVStore.
+
+    The newest bars of every symbol are loaded into one dates x symbols
+    matrix, and the strategy's ``compute`` runs on it once: the indicators
+    in strategies.py are column-wise pandas and NumPy operations, so every
+    symbol is evaluated in the same vectorized pass. Each symbol's latest
+    signal is then ranked by ``signal_strength``.
+
+    Loaded matrices are kept for ``ttl`` seconds, so scans with different
+    strategies over the same universe share one load.
+    """
+
+    def __init__(self, store: OHLCVStore = None, interval: str = '1d', bars: int = 250,
+                 ttl: float = 60, max_workers: int = 8):
+        """
+        Args:
+            store (OHLCVStore): Where bars are read from
+            interval (str): Bar interval to scan
+            bars (int): Newest bars loaded per symbol; must cover the strategy's warmup
+            ttl (float): Seconds a loaded matrix is reused
+            max_workers (int): Threads reading partitions
+        """
+        self.store = store if store is not None else OHLCVStore()
+        self.interval = interval
+        self.bars = bars
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def matrix(self, symbols: list = None, interval: str = None) -> pd.DataFrame:
+        """Dates x symbols matrix of ``symbols`` (every stored symbol by default)"""
+        interval = interval or self.interval
+        symbols = tuple(symbols) if symbols else tuple(self.store.symbols(interval))
+        key = (symbols, interval)
+        with self._lock:
+            cached = self._matrix
+            if cached is not None and cached[0] == key and time.monotonic() - cached[1] < self.ttl:
+                return cached[2]
+        with metrics.timer('screener_stage_seconds', stage='load'):
+            matrix = load_matrix(self.store, list(symbols), interval, self.bars, self.max_workers)
+        with self._lock:
+            self._matrix = (key, time.monotonic(), matrix)
+        return matrix
+
+    def scan(self, strategy, symbols: list = None, signal: str = None,
+             interval: str = None) -> pd.DataFrame:
+        """
+        Latest signal of every symbol, strongest first
+
+        Args:
+            strategy (TradingStrategy): Strategy to evaluate
+            symbols (list): Symbols to scan, defaults to every stored symbol
+            signal (str): Keep only 'BUY', 'SELL' or 'HOLD'
+            interval (str): Bar interval, defaults to the screener's
+
+        Returns:
+            pd.DataFrame: symbol, date, close, signal, strength and the
+            strategy's indicator values at each symbol's latest bar; BUY and
+            SELL before HOLD, then by absolute strength
+        """
+        if strategy.lookahead:
+            raise ValueError(f"{type(strategy).__name__} looks {strategy.lookahead} bars ahead "
+                             f"and has no signal at the latest bar; run it with causal=True")
+        matrix = self.matrix(symbols, interval)
+        # An empty store (or no stored symbol requested) loads no columns at all
+        if matrix.shape[1] == 0:
+            return pd.DataFrame(columns=['symbol', 'date', 'close', 'signal', 'strength'])
+        names = list(matrix['Close'].columns)
+
+        close = matrix['Close'].to_numpy()
+        valid = ~np.isnan(close)
+        # Each symbol's latest bar, which is earlier than the matrix's for stale symbols
+        last = len(close) - 1 - np.argmax(valid[::-1], axis=0)
+        first = np.argmax(valid, axis=0)
+        # A symbol missing dates inside its history (a halt, another exchange's
+        # calendar) has NaN rows there that would blank its indicators for a
+        # whole window, so it is computed on its own bars instead
+        gapped = np.flatnonzero(valid.any(axis=0) & (valid.sum(axis=0) < last - first + 1))
+        cols = np.arange(len(names))
+
+        # Indicators of one scan are never reused by the next, so skip the cache
+        features, strategy.features = strategy.features, FeatureStore(max_entries=0)
+        try:
+            with metrics.timer('screener_stage_seconds', stage='signals'):
+                result = strategy.compute(matrix)
+                latest = {name: values[last, cols] for name, values in result.columns.items()
+                          if np.ndim(values) == 2}
+                latest['Signal'] = np.asarray(result.signal)[last, cols]
+                latest['Strength'] = np.asarray(signal_strength(strategy, result, close))[last, cols]
+                for j in gapped:
+                    own = matrix.xs(names[j], axis=1, level=1)[valid[:, j]]
+                    own_result = strategy.compute(own)
+                    for name in latest:
+                        if name in own_result:
+                            latest[name][j] = own_result[name][-1]
+                    latest['Strength'][j] = signal_strength(strategy, own_result,
+                                                            own['Close'].to_numpy())[-1]
+        finally:
+            strategy.features = features
+
+        ranked = pd.DataFrame({
+            'symbol': names,
+            'date': matrix.index[last],
+            'close': close[last, cols],
+            'signal': [SIGNAL_NAMES[int(code)] for code in latest.pop('Signal')],
+            'strength': latest.pop('Strength'),
+        })
+        for name, values in latest.items():
+            ranked[name] = values
+        ranked = ranked[valid.any(axis=0)]
+        if signal is not None:
+            ranked = ranked[ranked['signal'] == signal.upper()]
+        order = np.lexsort((-ranked['strength'].abs().fillna(-1).to_numpy(),
+                            (ranked['signal'] == 'HOLD').to_numpy()))
+        metrics.inc('screener_scans_total', kind=chart_kind(strategy))
+        return ranked.iloc[order].reset_index(drop=True)
@@ -0,0 +1,231 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from execution import BUY, SELL, execute_signals, equity_curve
+
+METHODS = ('block', 'resample', 'shuffle')
+
+# Bytes of working arrays per (path, step) cell: indices, returns, running peak, drawdown
+_BYTES_PER_CELL = 32
+
+# Returns shared with worker processes
+_worker_returns = None
+
+
+def strategy_returns(signals: pd.DataFrame, initial_capital: float = 10000) -> pd.Series:
+    """
+    Per-bar returns of the equity curve a Signal/Close frame produces under
+    the backtest's execution rules
+    """
+    close = signals['Close'].to_numpy(dtype=np.float64)
+    _, _, _, ledger = execute_signals(signals['Signal'].to_numpy(), close, initial_capital)
+    equity = pd.Series(equity_curve(close, ledger, initial_capital), index=signals.index)
+    return equity.pct_change().dropna()
+
+
+def trade_returns(trades, fraction: float = 0.1) -> pd.Series:
+    """
+    Portfolio return of each closed round trip in a trade log
+
+    A buy commits ``fraction`` of capital and the matching sell closes it,
+    so a round trip moves the portfolio by ``fraction * (revenue / cost - 1)``.
+    Round trips are ordered by the date of the sell.
+
+    Args:
+        trades: TradeLedger or list of trade dicts in TradingBot's format
+        fraction (float): Share of capital each buy commits, as in execution.py
+    """
+    if hasattr(trades, 'records'):
+        frame = trades.to_frame()
+        frame['side'] = np.where(frame['type'] == 'BUY', BUY, SELL)
+    else:
+        frame = pd.DataFrame(list(trades))
+        if frame.empty:
+            return pd.Series(dtype=float)
+        frame['side'] = np.where(frame['type'] == 'BUY', BUY, SELL)
+        frame['amount'] = np.where(frame['side'] == BUY, frame.get('cost', 0), frame.get('revenue', 0))
+    if frame.empty:
+        return pd.Series(dtype=float)
+
+    dates, returns = [], []
+    for _, group in frame.groupby('symbol', sort=False, observed=True):
+        cost = None
+        for date, side, amount in zip(group['date'], group['side'], group['amount']):
+            if side == BUY:
+                cost = amount
+            elif cost:
+                dates.append(date)
+                returns.append(fraction * (amount / cost - 1))
+                cost = None
+    return pd.Series(returns, index=pd.Index(dates, name='date'), dtype=float).sort_index()
+
+
+def bootstrap_indices(rng, n_paths: int, n_steps: int, block_size: int) -> np.ndarray:
+    """
+    Circular block bootstrap: each path is built from blocks of
+    ``block_size`` consecutive steps starting at random positions, which
+    keeps short-range autocorrelation (volatility clustering) intact
+
+    Returns:
+        np.ndarray: (n_paths, n_steps) indices into the original series
+    """
+    block_size = max(1, min(block_size, n_steps))
+    n_blocks = -(-n_steps // block_size)
+    starts = rng.integers(0, n_steps, size=(n_paths, n_blocks, 1))
+    indices = (starts + np.arange(block_size)) % n_steps
+    return indices.reshape(n_paths, n_blocks * block_size)[:, :n_steps]
+
+
+def path_metrics(returns: np.ndarray, initial_capital: float = 10000, risk_free_rate: float = 0.01,
+                 periods_per_year: int = 252) -> dict:
+    """
+    Final value, max drawdown (%) and Sharpe ratio of every row of a
+    (paths, steps) return matrix, with the definitions used in utils.py.
+    ``returns`` is overwritten with the growth of each path.
+    """
+    excess = returns - risk_free_rate
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.sqrt(periods_per_year) * excess.mean(axis=1) / excess.std(axis=1, ddof=1)
+    del excess
+
+    growth = np.cumprod(np.add(returns, 1.0, out=returns), axis=1, out=returns)
+    # The path starts at 1, so the first peak is the starting capital
+    peak = np.maximum.accumulate(growth, axis=1)
+    np.maximum(peak, 1.0, out=peak)
+    drawdown = np.divide(growth, peak, out=peak)
+    max_drawdown = (np.minimum(drawdown.min(axis=1), 1.0) - 1.0) * 100
+    return {
+        'final_value': initial_capital * growth[:, -1],
+        'max_drawdown': max_drawdown,
+        'sharpe_ratio': sharpe,
+    }
+
+
+def _simulate_chunk(task: tuple) -> dict:
+    seed, n_paths, method, block_size, initial_capital, risk_free_rate, periods_per_year = task
+    returns = _worker_returns
+    rng = np.random.default_rng(seed)
+    n = len(returns)
+    if method == 'shuffle':
+        paths = np.tile(returns, (n_paths, 1))
+        rng.permuted(paths, axis=1, out=paths)
+    else:
+        indices = bootstrap_indices(rng, n_paths, n, block_size if method == 'block' else 1)
+        paths = returns[indices]
+        del indices
+    return path_metrics(paths, initial_capital, risk_free_rate, periods_per_year)
+
+
+def _init_worker(returns: np.ndarray):
+    global _worker_returns
+    _worker_returns = returns
+
+
+class MonteCarlo:
+    """
+    Distribution of outcomes from resampled return sequences.
+
+    Methods:
+        block: circular block bootstrap of per-bar returns (``block_size`` bars)
+        resample: bootstrap of single returns with replacement
+        shuffle: the same returns in random order, e.g. trade-order
+            shuffling of ``trade_returns``. The final value of a shuffled
+            path never changes, only its drawdown and Sharpe ratio do.
+
+    Paths are generated and scored as 2D arrays, in chunks of paths sized so
+    the working arrays stay within ``memory_budget`` bytes, so run time is
+    linear in ``n_paths``. Every chunk has its own seed derived from
+    ``seed``, so results are the same whatever the number of processes.
+    """
+
+    def __init__(self, n_paths: int = 10000, method: str = 'block', block_size: int = 20,
+                 initial_capital: float = 10000, seed: int = 0, risk_free_rate: float = 0.01,
+                 periods_per_year: int = 252, memory_budget: int = 256 * 1024 * 1024,
+                 processes: int = 1):
+        """
+        Args:
+            n_paths (int): Paths to simulate
+            method (str): 'block', 'resample' or 'shuffle'
+            block_size (int): Steps per block for the block bootstrap
+            initial_capital (float): Starting value of every path
+            seed (int): Random seed
+            risk_free_rate (float): Per-step rate subtracted for the Sharpe ratio, as in utils.py
+            periods_per_year (int): Steps per year for annualizing the Sharpe ratio
+            memory_budget (int): Bytes of working arrays per chunk
+            processes (int): Worker processes; None for all cores
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown simulation method: {method}")
+        self.n_paths = n_paths
+        self.method = method
+        self.block_size = block_size
+        self.initial_capital = initial_capital
+        self.seed = seed
+        self.risk_free_rate = risk_free_rate
+        self.periods_per_year = periods_per_year
+        self.memory_budget = memory_budget
+        self.processes = processes or os.cpu_count()
+        self.results = pd.DataFrame()
+        self.realized = {}
+
+    def run(self, returns) -> pd.DataFrame:
+        """
+        Simulate ``n_paths`` paths
+
+        Args:
+            returns (array-like): Per-bar returns (``strategy_returns``) or
+                per-trade returns (``trade_returns``); NaNs are dropped
+
+        Returns:
+            pd.DataFrame: final_value, max_drawdown and sharpe_ratio per path.
+            The metrics of the returns in their actual order are kept in
+            ``self.realized``.
+        """
+        returns = np.asarray(returns, dtype=np.float64)
+        returns = returns[~np.isnan(returns)]
+        if len(returns) < 2:
+            self.results, self.realized = pd.DataFrame(), {}
+            return self.results
+
+        realized = path_metrics(returns[None, :].copy(), self.initial_capital,
+                                self.risk_free_rate, self.periods_per_year)
+        self.realized = {key: float(value[0]) for key, value in realized.items()}
+
+        chunk = max(1, self.memory_budget // (len(returns) * _BYTES_PER_CELL))
+        sizes = [min(chunk, self.n_paths - start) for start in range(0, self.n_paths, chunk)]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(sizes))
+        tasks = [(seed, size, self.method, self.block_size, self.initial_capital,
+                  self.risk_free_rate, self.periods_per_year) for seed, size in zip(seeds, sizes)]
+
+        if self.processes == 1 or len(tasks) == 1:
+            _init_worker(returns)
+            chunks = [_simulate_chunk(task) for task in tasks]
+            _init_worker(None)
+        else:
+            with ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker,
+                                     initargs=(returns,)) as pool:
+                chunks = list(pool.map(_simulate_chunk, tasks))
+
+        self.results = pd.DataFrame({key: np.concatenate([c[key] for c in chunks])
+                                     for key in ('final_value', 'max_drawdown', 'sharpe_ratio')})
+        return self.results
+
+    def bands(self, levels: tuple = (0.05, 0.25, 0.5, 0.75, 0.95)) -> pd.DataFrame:
+        """
+        Confidence bands of the simulated metrics
+
+        Returns:
+            pd.DataFrame: One row per metric, one column per quantile level,
+            plus the realized value and the share of paths that did worse
+        """
+        if self.results.empty:
+            return pd.DataFrame()
+        bands = self.results.quantile(list(levels)).T
+        bands.columns = [f'p{level * 100:g}' for level in levels]
+        bands['realized'] = pd.Series(self.realized)
+        # Ties within rounding (a shuffled path's final value) do not count as worse
+        bands['rank'] = [float(np.mean((self.results[metric] < self.realized[metric]) &
+                                       ~np.isclose(self.results[metric], self.realized[metric])))
+                         for metric in bands.index]
+        return bands
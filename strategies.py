@@ -1,21 +1,130 @@
+import functools
 import pandas as pd
 import numpy as np
+from incremental import (IncrementalMovingAverageCrossover, IncrementalRSIStrategy,
+                         IncrementalMACDStrategy, IncrementalBollingerBandsStrategy,
+                         IncrementalVWAPStrategy, IncrementalSupportResistanceStrategy,
+                         ActiveLevels)
+import feature_cache
+
+class StrategyResult:
+    """
+    Columns a strategy adds to its input, as NumPy arrays aligned with
+    ``index``, and its Signal as int8. Nothing from the input is copied;
+    indicator arrays may be views of cached series and are read-only.
+    """
+
+    def __init__(self, index: pd.Index, columns: dict, signal: np.ndarray):
+        self.index = index
+        self.columns = columns
+        self.signal = signal
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.signal if name == 'Signal' else self.columns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name == 'Signal' or name in self.columns
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def nbytes(self) -> int:
+        return self.signal.nbytes + sum(values.nbytes for values in self.columns.values())
+
+    def to_frame(self, data: pd.DataFrame = None) -> pd.DataFrame:
+        """
+        The new columns as a DataFrame, added to a copy of ``data`` when
+        given (the frame ``generate_signals`` returns)
+        """
+        frame = data.copy() if data is not None else pd.DataFrame(index=self.index)
+        for name, values in self.columns.items():
+            frame[name] = values
+        frame['Signal'] = self.signal
+        return frame
+
+
+def _signal(buy, sell) -> np.ndarray:
+    """1 where ``buy``, -1 where ``sell`` (which wins where both hold), else 0"""
+    return np.where(sell, -1, np.where(buy, 1, 0)).astype(np.int8)
+
+
+def _fingerprinted(compute):
+    """Hash each input column once per ``compute`` call rather than once per indicator lookup"""
+    @functools.wraps(compute)
+    def wrapper(self, data):
+        with feature_cache.fingerprint_scope():
+            return compute(self, data)
+    return wrapper
+
+
+def _values(series) -> np.ndarray:
+    return series.to_numpy(dtype=np.float64)
+
+
+def _ewm_warmup(span: float) -> int:
+    """Bars after which an adjust=False EWM no longer depends on where it started (to float64 precision)"""
+    return int(np.ceil(np.log(1e-17) / np.log(1 - 2 / (span + 1))))
+
 
 class TradingStrategy:
-    def __init__(self):
+    # Bars before (warmup) and after (lookahead) a bar that its signal
+    # depends on, so long histories can be processed in chunks (pipeline.py)
+    warmup = 0
+    lookahead = 0
+
+    def __init__(self, features: feature_cache.FeatureStore = None):
         self.position = 0  # 1 for long, -1 for short, 0 for neutral
+        # Indicator cache shared with other strategies run on the same data
+        self.features = features if features is not None else feature_cache.default_store
         
+    def compute(self, data: pd.DataFrame) -> StrategyResult:
+        """Indicators and signals only, without copying ``data``. To be implemented by specific strategies."""
+        if type(self).generate_signals is TradingStrategy.generate_signals:
+            raise NotImplementedError
+        # Strategies that only implement generate_signals
+        signals = self.generate_signals(data)
+        added = [c for c in signals.columns if c not in data.columns and c != 'Signal']
+        return StrategyResult(signals.index, {c: signals[c].to_numpy() for c in added},
+                              signals['Signal'].to_numpy().astype(np.int8))
+
     def generate_signals(self, data: pd.DataFrame) -> pd.DataFrame:
-        """Generate trading signals. To be implemented by specific strategies."""
-        raise NotImplementedError
+        """
+        Generate trading signals
+        
+        Args:
+            data (pd.DataFrame): OHLCV data
+            
+        Returns:
+            pd.DataFrame: Copy of ``data`` with the strategy's indicator
+            columns and a 'Signal' column (1 buy, -1 sell, 0 hold)
+        """
+        return self.compute(data).to_frame(data)
+
+    def incremental(self, n: int = 1):
+        """Streaming version of the strategy, updating ``n`` symbols one bar at a time"""
+        raise NotImplementedError(f"{type(self).__name__} has no incremental version")
+
+    def __repr__(self) -> str:
+        params = (f'{key}={value!r}' for key, value in sorted(vars(self).items())
+                  if not key.startswith('_') and key not in ('features', 'position'))
+        return f"{type(self).__name__}({', '.join(params)})"
 
 class MovingAverageCrossover(TradingStrategy):
     def __init__(self, short_window: int = 20, long_window: int = 50):
         super().__init__()
         self.short_window = short_window
         self.long_window = long_window
+
+    @property
+    def warmup(self) -> int:
+        return max(self.short_window, self.long_window)
     
-    def generate_signals(self, data: pd.DataFrame) -> pd.DataFrame:
+    def incremental(self, n: int = 1):
+        return IncrementalMovingAverageCrossover(self.short_window, self.long_window, n)
+
+    @_fingerprinted
+    def compute(self, data: pd.DataFrame) -> StrategyResult:
         """
         Generate trading signals based on Moving Average Crossover strategy
         
@@ -23,18 +132,13 @@ class MovingAverageCrossover(TradingStrategy):
             data (pd.DataFrame): DataFrame with 'Close' prices
             
         Returns:
-            pd.DataFrame: DataFrame with signals
+            StrategyResult: SMA_short, SMA_long and Signal
         """
-        signals = data.copy()
-        signals['SMA_short'] = signals['Close'].rolling(window=self.short_window).mean()
-        signals['SMA_long'] = signals['Close'].rolling(window=self.long_window).mean()
-        
-        # Generate signals
-        signals['Signal'] = 0
-        signals.loc[signals['SMA_short'] > signals['SMA_long'], 'Signal'] = 1
-        signals.loc[signals['SMA_short'] < signals['SMA_long'], 'Signal'] = -1
-        
-        return signals
+        sma_short = _values(self.features.rolling_mean(data['Close'], self.short_window))
+        sma_long = _values(self.features.rolling_mean(data['Close'], self.long_window))
+        signal = _signal(sma_short > sma_long, sma_short < sma_long)
+        return StrategyResult(data.index, {'SMA_short': sma_short, 'SMA_long': sma_long}, signal)
+
 
 class RSIStrategy(TradingStrategy):
     def __init__(self, period: int = 10, overbought: int = 65, oversold: int = 35):
@@ -42,9 +146,19 @@ class RSIStrategy(TradingStrategy):
         self.period = period
         self.overbought = overbought
         self.oversold = oversold
+
+    @property
+    def warmup(self) -> int:
+        return self.period + 1
     
+    def incremental(self, n: int = 1):
+        return IncrementalRSIStrategy(self.period, self.overbought, self.oversold, n)
+
     def calculate_rsi(self, data: pd.Series) -> pd.Series:
         """Calculate RSI indicator"""
+        return self.features.get('rsi', (data,), {'period': self.period}, self._compute_rsi)
+
+    def _compute_rsi(self, data: pd.Series) -> pd.Series:
         delta = data.diff()
         gain = (delta.where(delta > 0, 0)).rolling(window=self.period).mean()
         loss = (-delta.where(delta < 0, 0)).rolling(window=self.period).mean()
@@ -53,17 +167,14 @@ class RSIStrategy(TradingStrategy):
         rsi = 100 - (100 / (1 + rs))
         return rsi
     
-    def generate_signals(self, data: pd.DataFrame) -> pd.DataFrame:
+    @_fingerprinted
+    def compute(self, data: pd.DataFrame) -> StrategyResult:
         """Generate trading signals based on RSI strategy"""
-        signals = data.copy()
-        signals['RSI'] = self.calculate_rsi(signals['Close'])
-        
-        # Generate signals
-        signals['Signal'] = 0
-        signals.loc[signals['RSI'] < self.oversold, 'Signal'] = 1  # Oversold - Buy
-        signals.loc[signals['RSI'] > self.overbought, 'Signal'] = -1  # Overbought - Sell
-        
-        return signals
+        rsi = _values(self.calculate_rsi(data['Close']))
+        # Oversold - Buy, overbought - Sell
+        signal = _signal(rsi < self.oversold, rsi > self.overbought)
+        return StrategyResult(data.index, {'RSI': rsi}, signal)
+
 
 class MACDStrategy(TradingStrategy):
     def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
@@ -71,101 +182,130 @@ class MACDStrategy(TradingStrategy):
         self.fast_period = fast_period
         self.slow_period = slow_period
         self.signal_period = signal_period
+
+    @property
+    def warmup(self) -> int:
+        # EWMs never forget entirely; this is where the start stops mattering
+        return _ewm_warmup(max(self.fast_period, self.slow_period)) + _ewm_warmup(self.signal_period)
     
+    def incremental(self, n: int = 1):
+        return IncrementalMACDStrategy(self.fast_period, self.slow_period, self.signal_period, n)
+
     def calculate_macd(self, data: pd.Series) -> tuple:
         """Calculate MACD line and signal line"""
-        exp1 = data.ewm(span=self.fast_period, adjust=False).mean()
-        exp2 = data.ewm(span=self.slow_period, adjust=False).mean()
+        exp1 = self.features.ewm_mean(data, self.fast_period)
+        exp2 = self.features.ewm_mean(data, self.slow_period)
         macd = exp1 - exp2
-        signal = macd.ewm(span=self.signal_period, adjust=False).mean()
+        signal = self.features.ewm_mean(macd, self.signal_period)
         return macd, signal
     
-    def generate_signals(self, data: pd.DataFrame) -> pd.DataFrame:
+    @_fingerprinted
+    def compute(self, data: pd.DataFrame) -> StrategyResult:
         """Generate trading signals based on MACD crossovers"""
-        signals = data.copy()
-        
-        # Calculate MACD and signal line
-        signals['MACD'], signals['Signal_Line'] = self.calculate_macd(signals['Close'])
-        signals['MACD_Hist'] = signals['MACD'] - signals['Signal_Line']
-        
-        # Generate signals
-        signals['Signal'] = 0
-        # Buy when MACD crosses above signal line
-        signals.loc[signals['MACD_Hist'] > 0, 'Signal'] = 1
-        # Sell when MACD crosses below signal line
-        signals.loc[signals['MACD_Hist'] < 0, 'Signal'] = -1
-        
-        return signals
+        macd, signal_line = self.calculate_macd(data['Close'])
+        macd, signal_line = _values(macd), _values(signal_line)
+        hist = macd - signal_line
+        # Buy when MACD is above the signal line, sell when below
+        signal = _signal(hist > 0, hist < 0)
+        return StrategyResult(data.index, {'MACD': macd, 'Signal_Line': signal_line, 'MACD_Hist': hist},
+                              signal)
+
 
 class BollingerBandsStrategy(TradingStrategy):
     def __init__(self, window: int = 20, num_std: float = 2.0):
         super().__init__()
         self.window = window
         self.num_std = num_std
+
+    @property
+    def warmup(self) -> int:
+        return self.window
     
+    def incremental(self, n: int = 1):
+        return IncrementalBollingerBandsStrategy(self.window, self.num_std, n)
+
     def calculate_bollinger_bands(self, data: pd.Series) -> tuple:
         """Calculate Bollinger Bands"""
-        middle_band = data.rolling(window=self.window).mean()
-        std = data.rolling(window=self.window).std()
+        middle_band = self.features.rolling_mean(data, self.window)
+        std = self.features.rolling_std(data, self.window)
         upper_band = middle_band + (std * self.num_std)
         lower_band = middle_band - (std * self.num_std)
         return upper_band, middle_band, lower_band
     
-    def generate_signals(self, data: pd.DataFrame) -> pd.DataFrame:
+    @_fingerprinted
+    def compute(self, data: pd.DataFrame) -> StrategyResult:
         """Generate trading signals based on Bollinger Bands"""
-        signals = data.copy()
-        
-        # Calculate Bollinger Bands
-        signals['Upper_Band'], signals['Middle_Band'], signals['Lower_Band'] = \
-            self.calculate_bollinger_bands(signals['Close'])
-        
-        # Generate signals
-        signals['Signal'] = 0
-        # Buy when price crosses below lower band
-        signals.loc[signals['Close'] < signals['Lower_Band'], 'Signal'] = 1
-        # Sell when price crosses above upper band
-        signals.loc[signals['Close'] > signals['Upper_Band'], 'Signal'] = -1
-        
-        return signals
+        upper, middle, lower = (_values(band) for band in self.calculate_bollinger_bands(data['Close']))
+        close = _values(data['Close'])
+        # Buy below the lower band, sell above the upper band
+        signal = _signal(close < lower, close > upper)
+        return StrategyResult(data.index, {'Upper_Band': upper, 'Middle_Band': middle, 'Lower_Band': lower},
+                              signal)
+
 
 class VWAPStrategy(TradingStrategy):
     def __init__(self, window: int = 14):
         super().__init__()
         self.window = window
+
+    @property
+    def warmup(self) -> int:
+        return self.window
     
+    def incremental(self, n: int = 1):
+        return IncrementalVWAPStrategy(self.window, n)
+
     def calculate_vwap(self, data: pd.DataFrame) -> pd.Series:
         """Calculate VWAP"""
-        typical_price = (data['High'] + data['Low'] + data['Close']) / 3
-        vwap = (typical_price * data['Volume']).rolling(window=self.window).sum() / \
-               data['Volume'].rolling(window=self.window).sum()
+        typical_price = self.features.typical_price(data)
+        vwap = self.features.rolling_sum(typical_price * data['Volume'], self.window) / \
+               self.features.rolling_sum(data['Volume'], self.window)
         return vwap
     
-    def generate_signals(self, data: pd.DataFrame) -> pd.DataFrame:
+    @_fingerprinted
+    def compute(self, data: pd.DataFrame) -> StrategyResult:
         """Generate trading signals based on VWAP"""
-        signals = data.copy()
-        
-        # Calculate VWAP
-        signals['VWAP'] = self.calculate_vwap(signals)
-        
-        # Generate signals
-        signals['Signal'] = 0
-        # Buy when price crosses above VWAP
-        signals.loc[signals['Close'] > signals['VWAP'], 'Signal'] = 1
-        # Sell when price crosses below VWAP
-        signals.loc[signals['Close'] < signals['VWAP'], 'Signal'] = -1
-        
-        return signals
+        vwap = _values(self.calculate_vwap(data))
+        close = _values(data['Close'])
+        # Buy above VWAP, sell below
+        signal = _signal(close > vwap, close < vwap)
+        return StrategyResult(data.index, {'VWAP': vwap}, signal)
+
 
 class SupportResistanceStrategy(TradingStrategy):
-    def __init__(self, window: int = 20, num_touches: int = 2):
+    def __init__(self, window: int = 20, num_touches: int = 2, causal: bool = False):
+        """
+        Args:
+            window (int): Bars in the high/low and touch-count windows
+            num_touches (int): Touches within the window that confirm a level
+            causal (bool): Use trailing windows, so each bar only depends on
+                bars up to it (as in live trading). The default centered
+                windows look ``window // 2`` bars ahead.
+        """
         super().__init__()
         self.window = window
         self.num_touches = num_touches
+        self.causal = causal
+
+    @property
+    def warmup(self) -> int:
+        # Extremes over one window, touches counted over the next
+        return 2 * self.window
+
+    @property
+    def lookahead(self) -> int:
+        return 0 if self.causal else self.window
+    
+    def incremental(self, n: int = 1, track_levels: bool = True):
+        """Streaming version; always causal, matching ``causal=True``"""
+        return IncrementalSupportResistanceStrategy(self.window, self.num_touches, n,
+                                                    track_levels=track_levels)
     
     def find_support_resistance(self, data: pd.DataFrame) -> tuple:
         """Find support and resistance levels"""
-        highs = data['High'].rolling(window=self.window, center=True).max()
-        lows = data['Low'].rolling(window=self.window, center=True).min()
+        center = not self.causal
+        highs = self.features.rolling_max(data['High'], self.window, center=center)
+        lows = self.features.rolling_min(data['Low'], self.window, center=center)
         
         # Count touches of price to levels
         resistance_touches = (abs(data['High'] - highs) < (highs * 0.01)).rolling(window=self.window).sum()
@@ -173,20 +313,131 @@ class SupportResistanceStrategy(TradingStrategy):
         
         return highs[resistance_touches >= self.num_touches], lows[support_touches >= self.num_touches]
     
-    def generate_signals(self, data: pd.DataFrame) -> pd.DataFrame:
+    def active_levels(self, data: pd.DataFrame, max_levels: int = 32) -> ActiveLevels:
+        """Levels confirmed over ``data``, merged and capped as in streaming mode"""
+        resistance, support = self.find_support_resistance(data)
+        resistance = resistance.reindex(data.index).to_numpy()
+        support = support.reindex(data.index).to_numpy()
+        levels = ActiveLevels(max_levels=max_levels)
+        for bar in np.flatnonzero(~np.isnan(resistance) | ~np.isnan(support)):
+            for price in (resistance[bar], support[bar]):
+                if not np.isnan(price):
+                    levels.add(float(price), int(bar) + 1)
+        return levels
+    
+    @_fingerprinted
+    def compute(self, data: pd.DataFrame) -> StrategyResult:
         """Generate trading signals based on Support/Resistance levels"""
-        signals = data.copy()
-        
-        # Find support and resistance levels
-        resistance, support = self.find_support_resistance(signals)
-        signals['Resistance'] = resistance
-        signals['Support'] = support
-        
-        # Generate signals
-        signals['Signal'] = 0
-        # Buy near support
-        signals.loc[signals['Close'] < signals['Support'] * 1.02, 'Signal'] = 1
-        # Sell near resistance
-        signals.loc[signals['Close'] > signals['Resistance'] * 0.98, 'Signal'] = -1
-        
-        return signals
+        resistance, support = self.find_support_resistance(data)
+        resistance = _values(resistance.reindex(data.index))
+        support = _values(support.reindex(data.index))
+        close = _values(data['Close'])
+        # Buy near support, sell near resistance
+        signal = _signal(close < support * 1.02, close > resistance * 0.98)
+        return StrategyResult(data.index, {'Resistance': resistance, 'Support': support}, signal)
+
+
+class EnsembleStrategy(TradingStrategy):
+    """
+    Several strategies run over one shared input, with their signals
+    combined into one.
+
+    Each member's signal is weighted (equally for ``method='vote'``) and
+    the weighted mean is the ensemble's Score, between -1 and 1. The
+    ensemble buys where Score > ``threshold`` and sells where it is below
+    ``-threshold``; a vote with threshold 0 follows the side with more
+    members behind it.
+
+    Members are evaluated one at a time with ``compute``, so no copy of the
+    input is made and only their int8 signals are kept. Without a
+    ``features`` store, members share a store for the duration of one pass
+    that holds at most as many bytes as the input. Memory beyond the input
+    is then bounded by that store plus the largest member's working arrays,
+    and does not grow with the number of strategies.
+    """
+
+    def __init__(self, strategies: list, weights: list = None, method: str = 'vote',
+                 threshold: float = 0.0, features: feature_cache.FeatureStore = None):
+        """
+        Args:
+            strategies (list): Strategy instances or short names ('MA', 'RSI', ...)
+            weights (list): Weight per strategy for ``method='weighted'``
+            method (str): 'vote' or 'weighted'
+            threshold (float): Score a signal has to exceed
+            features (FeatureStore): Store shared by the members across calls
+        """
+        if method not in ('vote', 'weighted'):
+            raise ValueError(f"Unknown ensemble method: {method}")
+        super().__init__(features)
+        self._scoped = features is None
+        self.strategies = [STRATEGIES[s.upper()]() if isinstance(s, str) else s for s in strategies]
+        self.method = method
+        self.weights = list(weights) if weights is not None else [1.0] * len(self.strategies)
+        if len(self.weights) != len(self.strategies):
+            raise ValueError("Need one weight per strategy")
+        self.threshold = threshold
+
+    @property
+    def warmup(self) -> int:
+        return max((strategy.warmup for strategy in self.strategies), default=0)
+
+    @property
+    def lookahead(self) -> int:
+        return max((strategy.lookahead for strategy in self.strategies), default=0)
+
+    def names(self) -> list:
+        """Column suffix per member, e.g. 'RSI' or 'RSI_2' for a second RSI"""
+        names = []
+        for strategy in self.strategies:
+            name = next((key for key, cls in STRATEGIES.items() if type(strategy) is cls),
+                        type(strategy).__name__)
+            count = sum(1 for n in names if n == name or n.startswith(f'{name}_'))
+            names.append(f'{name}_{count + 1}' if count else name)
+        return names
+
+    @_fingerprinted
+    def compute(self, data: pd.DataFrame) -> StrategyResult:
+        """
+        Combined signal of every member
+
+        Returns:
+            StrategyResult: Score, Signal_<member> per member and Signal
+        """
+        if self._scoped:
+            features = feature_cache.FeatureStore(max_bytes=int(data.memory_usage(index=False).sum()))
+        else:
+            features = self.features
+        weights = np.ones(len(self.strategies)) if self.method == 'vote' else np.asarray(self.weights, dtype=np.float64)
+        total = np.abs(weights).sum()
+        score = None
+        columns = {}
+        saved = [strategy.features for strategy in self.strategies]
+        try:
+            for name, strategy, weight in zip(self.names(), self.strategies, weights):
+                strategy.features = features
+                signal = strategy.compute(data).signal
+                columns[f'Signal_{name}'] = signal
+                # Shaped like the signals, so a dates x symbols matrix works too
+                score = weight * signal if score is None else score + weight * signal
+        finally:
+            # Members get their own stores back, so a pass's store and its
+            # indicators are released when the pass ends
+            for strategy, store in zip(self.strategies, saved):
+                strategy.features = store
+        if score is None:
+            score = np.zeros(len(data))
+        elif total:
+            score /= total
+        return StrategyResult(data.index, {**columns, 'Score': score},
+                              _signal(score > self.threshold, score < -self.threshold))
+
+
+# Strategy classes by the short names TradingBot accepts
+STRATEGIES = {
+    'MA': MovingAverageCrossover,
+    'RSI': RSIStrategy,
+    'MACD': MACDStrategy,
+    'BB': BollingerBandsStrategy,
+    'VWAP': VWAPStrategy,
+    'SR': SupportResistanceStrategy,
+}
@@ -0,0 +1,336 @@
+import asyncio
+import json
+import queue
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+from data_store import interval_to_timedelta
+from incremental import RollingMean
+from instrumentation import metrics
+from live import WallClock
+
+
+def bar_ids(index: pd.Index) -> np.ndarray:
+    """
+    Event ids of bars: epoch seconds of their wall-clock timestamps, so a
+    bar has the same id whichever time zone its source stamps it in
+    """
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.as_unit('s').asi8
+
+
+def _floats(values: np.ndarray) -> list:
+    # JSON has no NaN; the chart leaves null points out
+    return [None if np.isnan(value) else round(float(value), 6) for value in values]
+
+
+class ChartDeltas:
+    """
+    Incremental state behind one symbol's dashboard chart: the short and
+    long SMA lines and their crossovers, with the rules of
+    flask_app.calculate_signals. ``update`` advances it by newly closed
+    bars and returns only what the chart has to append to its traces.
+    """
+
+    def __init__(self, short_window: int = 20, long_window: int = 50):
+        self.short = RollingMean(short_window)
+        self.long = RollingMean(long_window)
+        # Whether short <= long and short >= long held on the previous bar
+        self._below = False
+        self._above = False
+        self.last_bar = None
+
+    def update(self, bars: pd.DataFrame) -> dict:
+        """
+        Advance by ``bars`` and return the delta: bar times, OHLC, both SMAs
+        and the buy/sell markers among the new bars, in the trace order of
+        flask_app.create_chart
+        """
+        close = bars['Close'].to_numpy(dtype=np.float64)
+        short = self.short.update_batch(close)
+        long = self.long.update_batch(close)
+        with np.errstate(invalid='ignore'):
+            below = np.concatenate([[self._below], short <= long])
+            above = np.concatenate([[self._above], short >= long])
+            buy = (short > long) & below[:-1]
+            sell = (short < long) & above[:-1]
+        self._below, self._above = bool(below[-1]), bool(above[-1])
+        self.last_bar = bars.index[-1]
+
+        index = pd.DatetimeIndex(bars.index)
+        wall = index.tz_localize(None) if index.tz is not None else index
+        times = list(wall.strftime('%Y-%m-%d %H:%M:%S'))
+        low = bars['Low'].to_numpy(dtype=np.float64)
+        high = bars['High'].to_numpy(dtype=np.float64)
+        return {
+            'id': int(bar_ids(index[-1:])[0]),
+            't': times,
+            'open': _floats(bars['Open'].to_numpy(dtype=np.float64)),
+            'high': _floats(high),
+            'low': _floats(low),
+            'close': _floats(close),
+            'sma_short': _floats(short),
+            'sma_long': _floats(long),
+            'buy': {'t': [times[i] for i in np.flatnonzero(buy)], 'y': _floats(low[buy] * 0.99)},
+            'sell': {'t': [times[i] for i in np.flatnonzero(sell)], 'y': _floats(high[sell] * 1.01)},
+        }
+
+
+class Subscription:
+    """
+    One browser's stream of a symbol; read ``queue`` or iterate ``frames``.
+    Events up to ``after``, the newest bar the browser already has, are
+    not delivered.
+    """
+
+    def __init__(self, hub, symbol: str, events, after: int = None):
+        self.hub = hub
+        self.symbol = symbol
+        self.queue = events
+        self.after = after
+        self.closed = False
+
+    def frames(self, keepalive: float = 15.0):
+        """
+        Blocking iterator over the server-sent event frames, for threaded
+        servers. A comment line is sent after ``keepalive`` quiet seconds so
+        proxies keep the connection open. Ends when the hub drops the
+        subscription, and unsubscribes when the client goes away.
+        """
+        try:
+            yield b'retry: 3000\n\n'
+            while not (self.closed and self.queue.empty()):
+                try:
+                    _, frame = self.queue.get(timeout=keepalive)
+                except queue.Empty:
+                    yield b': keep-alive\n\n'
+                    continue
+                yield frame
+        finally:
+            self.close()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class StreamHub:
+    """
+    Live dashboard chart updates, fanned out to every subscriber of a symbol.
+
+    Each symbol with at least one subscriber has one task. At every bar
+    boundary it fetches the bars closed since the last one from a
+    live.BarFeed and advances the symbol's ChartDeltas. The delta is
+    encoded once as a server-sent event and put on every subscriber's
+    queue. So a symbol costs one fetch and one update per bar however many
+    browsers watch it, and each browser receives a few hundred bytes per
+    bar instead of a reloaded page. The task stops when the last
+    subscriber leaves.
+
+    The newest ``backlog`` events of every symbol are kept. A reconnecting
+    browser (Last-Event-ID), or a page rendered a few bars ago, first gets
+    the events it missed. A subscriber that falls ``queue_size`` events
+    behind is dropped; its browser reconnects and catches up from the
+    backlog.
+
+    Subscribing works from any thread. Threaded servers get ``queue.Queue``
+    subscriptions, and symbol tasks run on a background event loop. Async
+    servers subscribe from their own loop with ``asynchronous=True``, and
+    the tasks run on that loop.
+    """
+
+    def __init__(self, feed, interval: str = '1d', clock=None, short_window: int = 20,
+                 long_window: int = 50, queue_size: int = 64, backlog: int = 256,
+                 max_concurrency: int = 64):
+        """
+        Args:
+            feed (BarFeed): Source of closed bars, e.g. live.ProviderFeed
+            interval (str): Bar interval streamed
+            clock: live.WallClock (default) or live.ReplayClock
+            short_window (int): Short SMA window, as on the dashboard chart
+            long_window (int): Long SMA window
+            queue_size (int): Events buffered per subscriber before it is dropped
+            backlog (int): Events kept per symbol for catching up
+            max_concurrency (int): Feed requests in flight at once
+        """
+        self.feed = feed
+        self.interval = interval
+        self.step = interval_to_timedelta(interval)
+        self.clock = clock if clock is not None else WallClock()
+        self.short_window = short_window
+        self.long_window = long_window
+        self.queue_size = queue_size
+        self.backlog = backlog
+        self.max_concurrency = max_concurrency
+        self.events = 0
+        self.deliveries = 0
+        self.dropped = 0
+        self._subscribers = {}
+        self._tasks = {}
+        self._backlogs = {}
+        self._last_id = {}
+        self._semaphore = None
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+
+    def subscribe(self, symbol: str, after: int = None, asynchronous: bool = False) -> Subscription:
+        """
+        Start receiving the symbol's events
+
+        Args:
+            symbol (str): Symbol to stream
+            after (int): Id of the newest bar the client already has; newer
+                events still in the backlog are delivered first, and live
+                events up to it are skipped
+            asynchronous (bool): Use an asyncio.Queue; call from the event loop that reads it
+        """
+        symbol = symbol.upper()
+        loop = self._event_loop(asynchronous)
+        events = asyncio.Queue(self.queue_size) if asynchronous else queue.Queue(self.queue_size)
+        subscription = Subscription(self, symbol, events, after)
+        with self._lock:
+            if after is not None:
+                missed = [event for event in self._backlogs.get(symbol, ()) if event[0] > after]
+                for event in missed[-self.queue_size:]:
+                    events.put_nowait(event)
+            self._subscribers.setdefault(symbol, []).append(subscription)
+            start = symbol not in self._tasks
+            if start:
+                self._tasks[symbol] = None
+        if start:
+            loop.call_soon_threadsafe(self._start, symbol)
+        metrics.inc('stream_subscriptions_total')
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Stop a subscription; the symbol's task stops with its last subscriber"""
+        subscription.closed = True
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.symbol, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if subscribers or subscription.symbol not in self._tasks:
+                return
+            del self._subscribers[subscription.symbol]
+            task = self._tasks.pop(subscription.symbol)
+        if task is not None:
+            self._loop.call_soon_threadsafe(task.cancel)
+
+    def subscribers(self, symbol: str = None) -> int:
+        """Subscriptions of one symbol, or of all of them"""
+        with self._lock:
+            if symbol is not None:
+                return len(self._subscribers.get(symbol.upper(), ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _start(self, symbol: str):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        with self._lock:
+            # The last subscriber may have left before the loop got here
+            if symbol in self._tasks and self._tasks[symbol] is None:
+                self._tasks[symbol] = asyncio.ensure_future(self._run(symbol))
+
+    async def _run(self, symbol: str):
+        state = ChartDeltas(self.short_window, self.long_window)
+        while True:
+            try:
+                await self._advance(symbol, state)
+            except Exception as e:
+                print(f"Error streaming {symbol}: {str(e)}")
+            now = self.clock.now()
+            await self.clock.sleep_until(now.floor(self.step) + self.step)
+
+    async def _advance(self, symbol: str, state: ChartDeltas):
+        if state.last_bar is None:
+            # Warm the SMAs up on history; only bars newer than the last
+            # event sent (before the task last stopped) are published
+            async with self._semaphore:
+                bars = await self.feed.history(symbol, self.interval, self.clock.now())
+            if bars is None or bars.empty:
+                return
+            seen = self._last_id.get(symbol)
+            split = len(bars) if seen is None else int(np.searchsorted(bar_ids(bars.index), seen, side='right'))
+            if split:
+                state.update(bars.iloc[:split])
+            bars = bars.iloc[split:]
+        else:
+            async with self._semaphore:
+                bars = await self.feed.latest_bars(symbol, self.interval, state.last_bar, self.clock.now())
+        if bars is not None and not bars.empty:
+            self._publish(symbol, state.update(bars))
+
+    def _publish(self, symbol: str, delta: dict):
+        event_id = delta['id']
+        data = json.dumps({'symbol': symbol, **delta}, separators=(',', ':'))
+        frame = f'id: {event_id}\nevent: bars\ndata: {data}\n\n'.encode()
+        with self._lock:
+            backlog = self._backlogs.get(symbol)
+            if backlog is None:
+                backlog = self._backlogs[symbol] = deque(maxlen=self.backlog)
+            backlog.append((event_id, frame))
+            self._last_id[symbol] = event_id
+            subscribers = list(self._subscribers.get(symbol, ()))
+        delivered = 0
+        for subscription in subscribers:
+            # A page rendered with a bar still in progress already shows it
+            # once the bar closes
+            if subscription.after is not None and event_id <= subscription.after:
+                continue
+            try:
+                subscription.queue.put_nowait((event_id, frame))
+                delivered += 1
+            except (queue.Full, asyncio.QueueFull):
+                self.dropped += 1
+                self.unsubscribe(subscription)
+        self.events += 1
+        self.deliveries += delivered
+        metrics.inc('stream_events_total')
+        metrics.inc('stream_bytes_total', len(frame) * delivered)
+
+    def _event_loop(self, asynchronous: bool):
+        with self._lock:
+            if self._loop is None:
+                if asynchronous:
+                    self._loop = asyncio.get_running_loop()
+                else:
+                    self._loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(target=self._loop.run_forever, daemon=True,
+                                                    name='stream-hub')
+                    self._thread.start()
+            return self._loop
+
+    def close(self):
+        """Stop every symbol task, and the background event loop if one was started"""
+        with self._lock:
+            tasks = [task for task in self._tasks.values() if task is not None]
+            self._tasks.clear()
+            self._subscribers.clear()
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if thread is not None:
+            # Let the cancelled tasks unwind before the loop stops
+            asyncio.run_coroutine_threadsafe(_cancel(tasks), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        else:
+            for task in tasks:
+                loop.call_soon_threadsafe(task.cancel)
+
+    def stats(self) -> dict:
+        """Symbols streamed, subscribers, events published and delivered, and subscribers dropped"""
+        with self._lock:
+            symbols = len(self._tasks)
+            subscribers = sum(len(subscribers) for subscribers in self._subscribers.values())
+        return {'symbols': symbols, 'subscribers': subscribers, 'events': self.events,
+                'deliveries': self.deliveries, 'dropped': self.dropped}
+
+
+async def _cancel(tasks: list):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+from benchmarks.synthetic import synthetic_ohlcv
+from data_fetcher import StockDataFetcher
+from data_providers import InMemoryProvider
+from data_store import OHLCVStore
+
+
+@pytest.fixture
+def bars():
+    df = synthetic_ohlcv(300, freq='D', start='2023-01-02', volatility=0.01)
+    # The store hands bars back with nanosecond timestamps
+    df.index = df.index.as_unit('ns')
+    return df
+
+
+def test_round_trip(tmp_path, bars):
+    store = OHLCVStore(str(tmp_path))
+    store.write('sym', '1d', bars)
+    tm.assert_frame_equal(store.read('SYM', '1d'), bars, check_freq=False)
+    assert store.rows('SYM', '1d') == len(bars)
+    tm.assert_frame_equal(store.read('SYM', '1d', start=bars.index[10], end=bars.index[19]),
+                          bars.iloc[10:20], check_freq=False)
+    tm.assert_frame_equal(store.tail('SYM', '1d', 5), bars.iloc[-5:], check_freq=False)
+    assert store.read('OTHER', '1d') is None
+
+
+def test_append_replaces_overlapping_bars(tmp_path, bars):
+    store = OHLCVStore(str(tmp_path))
+    store.write('SYM', '1d', bars.iloc[:200])
+    revised = bars.iloc[198:].copy()
+    revised['Close'] += 1.0
+    store.append('SYM', '1d', revised)
+    stored = store.read('SYM', '1d')
+    assert stored.index.is_unique
+    tm.assert_frame_equal(stored.iloc[:198], bars.iloc[:198], check_freq=False)
+    tm.assert_frame_equal(stored.iloc[198:], revised, check_freq=False)
+
+
+@pytest.mark.parametrize('stored_tz, new_tz', [(True, False), (False, True)])
+def test_append_mixes_naive_and_aware_bars(tmp_path, bars, stored_tz, new_tz):
+    naive = bars.tz_localize(None)
+    store = OHLCVStore(str(tmp_path))
+    store.write('SYM', '1d', (bars if stored_tz else naive).iloc[:200])
+    store.append('SYM', '1d', (bars if new_tz else naive).iloc[190:])
+    stored = store.read('SYM', '1d')
+    tm.assert_frame_equal(stored, bars, check_freq=False)
+
+
+def test_append_to_missing_partition_covers_only_its_bars(tmp_path, bars):
+    store = OHLCVStore(str(tmp_path))
+    store.append('SYM', '1d', bars.iloc[-10:])
+    assert store.covers('SYM', '1d', bars.index[-10])
+    assert not store.covers('SYM', '1d', bars.index[0])
+    assert not store.covers('SYM', '1d', None)
+
+
+def test_fetcher_serves_fresh_bars_from_store(tmp_path, bars):
+    provider = InMemoryProvider({'SYM': bars})
+    fetcher = StockDataFetcher(store_dir=str(tmp_path), provider=provider)
+    first = fetcher.get_multiple_stocks(['SYM'], period='6mo')['SYM']
+    second = fetcher.get_multiple_stocks(['SYM'], period='6mo')['SYM']
+    assert provider.requests == 1
+    tm.assert_frame_equal(first, second)
+    assert first.index[0] >= bars.index[-1] - pd.DateOffset(months=6)
+
+
+def test_fetcher_appends_new_bars(tmp_path, bars):
+    provider = InMemoryProvider({'SYM': bars.iloc[:250]})
+    fetcher = StockDataFetcher(store_dir=str(tmp_path), provider=provider,
+                               max_staleness=pd.Timedelta(0))
+    fetcher.get_multiple_stocks(['SYM'], period='max')
+    provider.frames['SYM'] = bars
+    provider.now = None
+    fetched = fetcher.get_multiple_stocks(['SYM'], period='max')['SYM']
+    assert provider.requests == 2
+    np.testing.assert_array_equal(fetched['Close'].to_numpy(), bars['Close'].to_numpy())
+
+
+def test_period_shorter_than_requested_is_not_covered(tmp_path, bars):
+    # The provider only holds the newest 30 bars, as with 1m bars past 7 days
+    provider = InMemoryProvider({'SYM': bars.iloc[-30:]})
+    fetcher = StockDataFetcher(store_dir=str(tmp_path), provider=provider)
+    fetcher.get_multiple_stocks(['SYM'], period='1y')
+    fetcher.get_multiple_stocks(['SYM'], period='1y')
+    assert provider.requests == 2
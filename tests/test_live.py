@@ -0,0 +1,48 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import synthetic_ohlcv, synthetic_universe
+from data_fetcher import StockDataFetcher
+from execution import execute_signals
+from live import LiveTrader, ReplayClock, ReplayFeed
+from strategies import STRATEGIES
+from trading_bot import TradingBot
+
+WARMUP = 100
+
+
+def _replay(frames: dict, strategy: str) -> tuple:
+    feed = ReplayFeed(frames)
+    bot = TradingBot(list(frames), strategy=strategy, data_fetcher=StockDataFetcher(store_dir=None))
+    trader = LiveTrader(bot, feed, '1m', clock=ReplayClock(feed.start('1m', WARMUP)))
+    end = max(df.index[-1] for df in frames.values()) + pd.Timedelta(minutes=1)
+    stats = asyncio.run(trader.run(until=end))
+    return bot, stats
+
+
+@pytest.mark.parametrize('kind', ['MA', 'RSI', 'MACD', 'BB', 'VWAP'])
+def test_replayed_run_matches_batch_run(kind):
+    df = synthetic_ohlcv(600, freq='min', start='2024-01-02 14:30', volatility=0.003)
+    bot, stats = _replay({'SYM': df}, kind)
+
+    # Bars up to the warmup one prime the state; the rest are traded live
+    live = slice(WARMUP + 1, None)
+    signal = np.asarray(STRATEGIES[kind]().compute(df).signal)
+    capital, held, _, ledger = execute_signals(signal[live], df['Close'].to_numpy()[live], 10000)
+
+    assert stats['bars'] == len(df) - WARMUP - 1
+    assert stats['skipped'] == 0
+    assert bot.capital == capital
+    assert bot.positions['SYM'] == held
+    trades = list(bot.trades)
+    assert [trade['date'] for trade in trades] == list(df.index[live][ledger['bar']])
+    assert [trade['shares'] for trade in trades] == list(ledger['shares'])
+
+
+def test_stats_report_per_tick_throughput():
+    frames = synthetic_universe(5, 300, freq='min', start='2024-01-02 14:30', volatility=0.003)
+    _, stats = _replay(frames, 'MA')
+    assert stats['bars'] == 5 * (300 - WARMUP - 1)
+    assert stats['symbols_per_sec'] > 0
+    assert stats['bars_per_sec'] > 0
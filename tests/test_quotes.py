@@ -0,0 +1,73 @@
+import time
+import pytest
+from quotes import FakeQuoteServer, HTTPQuoteSource, QuoteService
+
+
+@pytest.fixture
+def server():
+    with FakeQuoteServer(slow_latency=2.0) as server:
+        yield server
+
+
+@pytest.fixture
+def service(server):
+    service = QuoteService(HTTPQuoteSource(server.url, timeout=1.0), ttl=0, timeout=0.3)
+    yield service
+    service.close()
+
+
+def test_prices_are_batched(server, service):
+    prices = service.get_prices(['A', 'B', 'C'])
+    assert all(isinstance(price, float) for price in prices.values())
+    assert server.requests == 1
+
+
+def test_stuck_symbol_falls_back_to_last_price(server, service):
+    before = service.get_prices(['A', 'B', 'C'])
+    server.slow = {'C'}
+
+    start = time.perf_counter()
+    during = service.get_prices(['A', 'B', 'C'])
+    assert time.perf_counter() - start < 1.0
+    assert during['C'] == before['C']
+    assert service.stats()['fallbacks'] >= 1
+
+    # The timed-out batch is split, so the others arrive without C
+    deadline = time.perf_counter() + 2.0
+    while time.perf_counter() < deadline and (service.last_price('A') == before['A']
+                                              or service.last_price('B') == before['B']):
+        time.sleep(0.05)
+    assert service.last_price('A') != before['A']
+    assert service.last_price('B') != before['B']
+    assert service.last_price('C') == before['C']
+    assert service.stats()['timeouts'] >= 2
+
+
+def test_unknown_symbol_without_history_is_none(server, service):
+    server.slow = {'NEW'}
+    assert service.get_prices(['NEW']) == {'NEW': None}
+
+
+def test_http_source_gives_up_after_its_timeout(server):
+    server.slow = {'C'}
+    source = HTTPQuoteSource(server.url, timeout=0.2)
+    start = time.perf_counter()
+    with pytest.raises(OSError):
+        source._get(['C'])
+    assert time.perf_counter() - start < 1.0
+
+
+def test_split_retries_do_not_deadlock():
+    # Splitting ['A', 'B', 'C', 'SLOW'] nests deeper than two permits
+    with FakeQuoteServer(slow={'SLOW'}, slow_latency=0.5) as server:
+        source = HTTPQuoteSource(server.url, max_batch_size=4, timeout=1.0)
+        service = QuoteService(source, ttl=0, timeout=0.2, max_concurrency=2)
+        try:
+            service.get_prices(['A', 'B', 'C', 'SLOW'])
+            deadline = time.perf_counter() + 3.0
+            while time.perf_counter() < deadline and service._inflight:
+                time.sleep(0.05)
+            assert not service._inflight
+            assert all(service.last_price(symbol) is not None for symbol in ['A', 'B', 'C'])
+        finally:
+            service.close()
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from benchmarks.synthetic import synthetic_universe
+from data_store import OHLCVStore
+from screener import SIGNAL_NAMES, Screener, signal_strength
+from strategies import STRATEGIES
+
+
+@pytest.fixture
+def store(tmp_path):
+    frames = synthetic_universe(20, 300)
+    names = sorted(frames)
+    # A halted day, a late listing and a symbol that stopped trading
+    frames[names[3]] = frames[names[3]].drop(frames[names[3]].index[-10])
+    frames[names[5]] = frames[names[5]].iloc[40:]
+    frames[names[7]] = frames[names[7]].iloc[:-3]
+    store = OHLCVStore(str(tmp_path))
+    for symbol, df in frames.items():
+        store.write(symbol, '1d', df)
+    return store
+
+
+@pytest.mark.parametrize('kind', sorted(STRATEGIES))
+def test_scan_matches_per_symbol_compute(store, kind):
+    strategy = STRATEGIES[kind](causal=True) if kind == 'SR' else STRATEGIES[kind]()
+    ranked = Screener(store, bars=300, ttl=0).scan(strategy).set_index('symbol')
+
+    for symbol in store.symbols('1d'):
+        df = store.tail(symbol, '1d', 300)
+        result = strategy.compute(df)
+        row = ranked.loc[symbol]
+        assert row['date'] == df.index[-1]
+        assert row['signal'] == SIGNAL_NAMES[int(result.signal[-1])]
+        expected = signal_strength(strategy, result, df['Close'].to_numpy())[-1]
+        assert np.isclose(row['strength'], expected, equal_nan=True)
+
+
+def test_scan_of_empty_store(tmp_path):
+    ranked = Screener(OHLCVStore(str(tmp_path))).scan(STRATEGIES['RSI']())
+    assert ranked.empty
+    assert list(ranked.columns) == ['symbol', 'date', 'close', 'signal', 'strength']
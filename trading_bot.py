@@ -1,231 +1,159 @@
+import asyncio
 import pandas as pd
 import numpy as np
 from data_fetcher import StockDataFetcher
-from strategies import (MovingAverageCrossover, RSIStrategy, MACDStrategy,
-                      BollingerBandsStrategy, VWAPStrategy, SupportResistanceStrategy)
-import matplotlib.pyplot as plt
+from execution import execute_signals
+from instrumentation import metrics, profiled
+from ledger import TradeLedger
+from live import LiveTrader, ProviderFeed
+from portfolio import PortfolioBacktester
+from rendering import ChartRenderer
+from strategies import STRATEGIES
 import seaborn as sns
 
 class TradingBot:
-    def __init__(self, symbols: list, strategy: str = 'MA', initial_capital: float = 10000):
+    def __init__(self, symbols: list, strategy: str = 'MA', initial_capital: float = 10000,
+                 data_fetcher: StockDataFetcher = None, plot_mode: str = 'sync',
+                 trade_log: str = None):
+        """
+        Args:
+            symbols (list): Symbols to trade
+            strategy (str): Key into STRATEGIES
+            initial_capital (float): Starting cash
+            data_fetcher (StockDataFetcher): Source of bars, defaults to a new fetcher
+            plot_mode (str): 'sync', 'parallel' (process pool), 'deferred'
+                (drawn when the run finishes) or 'none'
+            trade_log (str): Stream trades to this TradeLedger segment file
+        """
         self.symbols = symbols
-        self.data_fetcher = StockDataFetcher()
+        self.data_fetcher = data_fetcher if data_fetcher is not None else StockDataFetcher()
         self.strategy = self._get_strategy(strategy)
         self.capital = initial_capital
         self.positions = {symbol: 0 for symbol in symbols}
-        self.trades = []
+        self.trades = TradeLedger(trade_log)
+        self.renderer = ChartRenderer(plot_mode)
     
     def _get_strategy(self, strategy_name: str):
         """Initialize the selected trading strategy"""
-        if strategy_name.upper() == 'MA':
-            return MovingAverageCrossover()
-        elif strategy_name.upper() == 'RSI':
-            return RSIStrategy()
-        elif strategy_name.upper() == 'MACD':
-            return MACDStrategy()
-        elif strategy_name.upper() == 'BB':
-            return BollingerBandsStrategy()
-        elif strategy_name.upper() == 'VWAP':
-            return VWAPStrategy()
-        elif strategy_name.upper() == 'SR':
-            return SupportResistanceStrategy()
-        else:
+        strategy_cls = STRATEGIES.get(strategy_name.upper())
+        if strategy_cls is None:
             raise ValueError(f"Unknown strategy: {strategy_name}")
+        return strategy_cls()
     
-    def run(self, period: str = "1mo", interval: str = "1d"):
-        """Run the trading bot"""
-        for symbol in self.symbols:
-            # Fetch data
-            data = self.data_fetcher.get_stock_data(symbol, period, interval)
-            if data is None:
-                continue
-            
-            # Generate signals
-            signals = self.strategy.generate_signals(data)
-            
-            # Execute trades
-            self._execute_trades(symbol, signals)
-            
-            # Plot results
-            self._plot_results(symbol, signals)
+    def run(self, period: str = "1mo", interval: str = "1d", profile: bool = False):
+        """
+        Run the trading bot
+
+        Args:
+            period (str): Data period to fetch
+            interval (str): Bar interval
+            profile (bool): Profile the run with cProfile and print the hottest functions
+        """
+        with profiled(profile):
+            # Fetch all symbols concurrently, then trade them in list order
+            with metrics.timer('bot_stage_seconds', stage='fetch'):
+                all_data = self.data_fetcher.get_multiple_stocks(self.symbols, period, interval)
+            for symbol in self.symbols:
+                data = all_data[symbol]
+                if data is None:
+                    metrics.inc('bot_symbols_total', status='missing')
+                    continue
+                metrics.inc('bot_symbols_total', status='ok')
+                metrics.inc('bot_bars_total', len(data), symbol=symbol)
+                
+                # Generate signals
+                with metrics.timer('bot_stage_seconds', stage='signals'):
+                    signals = self.strategy.generate_signals(data)
+                
+                # Execute trades
+                trades_before = len(self.trades)
+                with metrics.timer('bot_stage_seconds', stage='execute'):
+                    self._execute_trades(symbol, signals)
+                metrics.inc('bot_trades_total', len(self.trades) - trades_before, symbol=symbol)
+                
+                # Plot results
+                with metrics.timer('bot_stage_seconds', stage='plot'):
+                    self._plot_results(symbol, signals)
+            
+            # Wait for charts still rendering in the background; the worker
+            # pool is shut down and started again by the next run
+            with metrics.timer('bot_stage_seconds', stage='plot_wait'):
+                self.renderer.close()
+            self.trades.flush()
+    
+    def run_portfolio(self, period: str = "1mo", interval: str = "1d"):
+        """
+        Run all symbols as one portfolio sharing the bot's capital, stepping
+        through time once instead of trading each symbol's history in turn
+
+        Returns:
+            dict: Result of PortfolioBacktester.run, including the equity curve
+        """
+        all_data = self.data_fetcher.get_multiple_stocks(self.symbols, period, interval)
+        result = PortfolioBacktester(self.strategy, self.capital).run(all_data, self.positions)
+        self.capital = result['cash']
+        for symbol, shares in result['positions'].items():
+            self.positions[symbol] = shares
+        self.trades.extend(result['trades'])
+        self.trades.flush()
+        return result
+    
+    def run_live(self, interval: str = "1m", feed=None, ticks: int = None, clock=None, **kwargs):
+        """
+        Trade continuously as bars close, until ``ticks`` bar boundaries have
+        passed (forever if None). See live.LiveTrader for the options.
+
+        Args:
+            interval (str): Bar interval to wake up on
+            feed (BarFeed): Source of new bars, defaults to the fetcher's provider
+            ticks (int): Number of bar boundaries to run for
+            clock: WallClock (default) or a ReplayClock for replays
+
+        Returns:
+            dict: Throughput and tick-to-signal latency statistics
+        """
+        if feed is None:
+            feed = ProviderFeed(self.data_fetcher.provider)
+        trader = LiveTrader(self, feed, interval, clock=clock, **kwargs)
+        return asyncio.run(trader.run(ticks))
     
     def _execute_trades(self, symbol: str, signals: pd.DataFrame):
         """Execute trades based on signals"""
-        position = 0
-        for index, row in signals.iterrows():
-            if row['Signal'] == 1 and position <= 0:  # Buy signal
-                price = row['Close']
-                shares = int(self.capital * 0.1 / price)  # Use 10% of capital
-                if shares > 0:
-                    cost = shares * price
-                    self.capital -= cost
-                    self.positions[symbol] += shares
-                    self.trades.append({
-                        'date': index,
-                        'symbol': symbol,
-                        'type': 'BUY',
-                        'shares': shares,
-                        'price': price,
-                        'cost': cost
-                    })
-                    position = 1
-                    
-            elif row['Signal'] == -1 and position >= 0:  # Sell signal
-                if self.positions[symbol] > 0:
-                    price = row['Close']
-                    shares = self.positions[symbol]
-                    revenue = shares * price
-                    self.capital += revenue
-                    self.positions[symbol] = 0
-                    self.trades.append({
-                        'date': index,
-                        'symbol': symbol,
-                        'type': 'SELL',
-                        'shares': shares,
-                        'price': price,
-                        'revenue': revenue
-                    })
-                    position = -1
+        self.capital, self.positions[symbol], _, ledger = execute_signals(
+            signals['Signal'].to_numpy(), signals['Close'].to_numpy(),
+            self.capital, self.positions[symbol])
+
+        self.trades.append_arrays(symbol, signals.index[ledger['bar']], ledger['side'],
+                                  ledger['shares'], ledger['price'], ledger['amount'])
     
     def _plot_results(self, symbol: str, signals: pd.DataFrame):
         """Plot trading results with strategy-specific indicators"""
-        plt.figure(figsize=(12, 8))
-        
-        # Create subplots based on strategy type
-        if isinstance(self.strategy, RSIStrategy):
-            # Main price plot
-            ax1 = plt.subplot(2, 1, 1)
-            ax1.plot(signals.index, signals['Close'], label='Price')
-            
-            # Plot buy/sell signals
-            buy_signals = signals[signals['Signal'] == 1]
-            sell_signals = signals[signals['Signal'] == -1]
-            ax1.scatter(buy_signals.index, buy_signals['Close'], marker='^', color='g', label='Buy')
-            ax1.scatter(sell_signals.index, sell_signals['Close'], marker='v', color='r', label='Sell')
-            ax1.set_title(f'{symbol} Price and Signals')
-            ax1.legend()
-            
-            # RSI plot
-            ax2 = plt.subplot(2, 1, 2)
-            ax2.plot(signals.index, signals['RSI'], label='RSI')
-            ax2.axhline(y=70, color='r', linestyle='--')
-            ax2.axhline(y=30, color='g', linestyle='--')
-            ax2.set_title('RSI Indicator')
-            ax2.legend()
-            
-        elif isinstance(self.strategy, MACDStrategy):
-            # Main price plot
-            ax1 = plt.subplot(2, 1, 1)
-            ax1.plot(signals.index, signals['Close'], label='Price')
-            
-            # Plot buy/sell signals
-            buy_signals = signals[signals['Signal'] == 1]
-            sell_signals = signals[signals['Signal'] == -1]
-            ax1.scatter(buy_signals.index, buy_signals['Close'], marker='^', color='g', label='Buy')
-            ax1.scatter(sell_signals.index, sell_signals['Close'], marker='v', color='r', label='Sell')
-            ax1.set_title(f'{symbol} Price and Signals')
-            ax1.legend()
-            
-            # MACD plot
-            ax2 = plt.subplot(2, 1, 2)
-            ax2.plot(signals.index, signals['MACD'], label='MACD')
-            ax2.plot(signals.index, signals['Signal_Line'], label='Signal Line')
-            ax2.bar(signals.index, signals['MACD_Hist'], label='MACD Histogram')
-            ax2.set_title('MACD Indicator')
-            ax2.legend()
-            
-        elif isinstance(self.strategy, BollingerBandsStrategy):
-            # Main price plot
-            ax1 = plt.subplot(2, 1, 1)
-            ax1.plot(signals.index, signals['Close'], label='Price')
-            ax1.plot(signals.index, signals['BB_Middle'], label='Middle Band')
-            ax1.plot(signals.index, signals['BB_Upper'], label='Upper Band')
-            ax1.plot(signals.index, signals['BB_Lower'], label='Lower Band')
-            
-            # Plot buy/sell signals
-            buy_signals = signals[signals['Signal'] == 1]
-            sell_signals = signals[signals['Signal'] == -1]
-            ax1.scatter(buy_signals.index, buy_signals['Close'], marker='^', color='g', label='Buy')
-            ax1.scatter(sell_signals.index, sell_signals['Close'], marker='v', color='r', label='Sell')
-            ax1.set_title(f'{symbol} Price and Signals')
-            ax1.legend()
-            
-            # Bollinger Bands plot
-            ax2 = plt.subplot(2, 1, 2)
-            ax2.plot(signals.index, signals['BB_Width'], label='Band Width')
-            ax2.set_title('Bollinger Bands Indicator')
-            ax2.legend()
-            
-        elif isinstance(self.strategy, VWAPStrategy):
-            # Main price plot
-            ax1 = plt.subplot(2, 1, 1)
-            ax1.plot(signals.index, signals['Close'], label='Price')
-            ax1.plot(signals.index, signals['VWAP'], label='VWAP')
-            
-            # Plot buy/sell signals
-            buy_signals = signals[signals['Signal'] == 1]
-            sell_signals = signals[signals['Signal'] == -1]
-            ax1.scatter(buy_signals.index, buy_signals['Close'], marker='^', color='g', label='Buy')
-            ax1.scatter(sell_signals.index, sell_signals['Close'], marker='v', color='r', label='Sell')
-            ax1.set_title(f'{symbol} Price and Signals')
-            ax1.legend()
-            
-            # VWAP plot
-            ax2 = plt.subplot(2, 1, 2)
-            ax2.plot(signals.index, signals['VWAP'], label='VWAP')
-            ax2.set_title('VWAP Indicator')
-            ax2.legend()
-            
-        elif isinstance(self.strategy, SupportResistanceStrategy):
-            # Main price plot
-            ax1 = plt.subplot(2, 1, 1)
-            ax1.plot(signals.index, signals['Close'], label='Price')
-            
-            # Plot buy/sell signals
-            buy_signals = signals[signals['Signal'] == 1]
-            sell_signals = signals[signals['Signal'] == -1]
-            ax1.scatter(buy_signals.index, buy_signals['Close'], marker='^', color='g', label='Buy')
-            ax1.scatter(sell_signals.index, sell_signals['Close'], marker='v', color='r', label='Sell')
-            ax1.set_title(f'{symbol} Price and Signals')
-            ax1.legend()
-            
-            # Support/Resistance plot
-            ax2 = plt.subplot(2, 1, 2)
-            ax2.plot(signals.index, signals['Support'], label='Support')
-            ax2.plot(signals.index, signals['Resistance'], label='Resistance')
-            ax2.set_title('Support/Resistance Indicator')
-            ax2.legend()
-            
-        else:  # Moving Average strategy
-            plt.plot(signals.index, signals['Close'], label='Price')
-            if 'SMA_short' in signals.columns:
-                plt.plot(signals.index, signals['SMA_short'], label='Short MA')
-                plt.plot(signals.index, signals['SMA_long'], label='Long MA')
-            
-            # Plot buy/sell signals
-            buy_signals = signals[signals['Signal'] == 1]
-            sell_signals = signals[signals['Signal'] == -1]
-            plt.scatter(buy_signals.index, buy_signals['Close'], marker='^', color='g', label='Buy')
-            plt.scatter(sell_signals.index, sell_signals['Close'], marker='v', color='r', label='Sell')
-            
-            plt.title(f'{symbol} Trading Signals')
-            plt.legend()
-        
-        plt.tight_layout()
-        plt.savefig(f'{symbol}_trading_signals.png')
-        plt.close()
+        return self.renderer.submit(symbol, self.strategy, signals)
     
+    def close(self):
+        """Finish outstanding charts, stop the render pool and write out the trade ledger"""
+        self.renderer.close()
+        self.trades.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
     def get_portfolio_status(self):
         """Get current portfolio status"""
         total_value = self.capital
-        for symbol, shares in self.positions.items():
-            if shares > 0:
-                try:
-                    current_price = self.data_fetcher.get_live_price(symbol)
-                    if current_price:
-                        total_value += shares * current_price
-                except Exception as e:
-                    print(f"Error fetching live price for {symbol}: {str(e)}")
+        held = [symbol for symbol, shares in self.positions.items() if shares > 0]
+        # One batched quote lookup for every held symbol
+        prices = self.data_fetcher.get_live_prices(held) if held else {}
+        for symbol in held:
+            current_price = prices.get(symbol)
+            if current_price:
+                total_value += self.positions[symbol] * current_price
+            else:
+                print(f"Error fetching live price for {symbol}: no quote available")
         
         return {
             'cash': self.capital,
@@ -234,9 +162,10 @@ class TradingBot:
         }
 
 if __name__ == "__main__":
+    metrics.enable()
     # Test with multiple tech stocks using RSI strategy
     symbols = ['AAPL', 'MSFT', 'GOOGL', 'NVDA', 'META']
-    bot = TradingBot(symbols, strategy='RSI', initial_capital=10000)
+    bot = TradingBot(symbols, strategy='RSI', initial_capital=10000, plot_mode='parallel')
     
     # Use 10 days of data with 1-hour intervals
     bot.run(period="10d", interval="1h")
@@ -249,3 +178,6 @@ if __name__ == "__main__":
     for symbol, shares in portfolio['positions'].items():
         print(f"{symbol}: {shares} shares")
     print(f"\nTotal Portfolio Value: ${portfolio['total_value']:.2f}")
+    
+    print("\nRun Metrics:")
+    print(metrics.summary())
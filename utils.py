@@ -2,10 +2,11 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
+from ledger import TradeLedger
 
 def calculate_returns(prices: pd.Series) -> float:
     """Calculate percentage returns"""
-    return (prices[-1] / prices[0] - 1) * 100
+    return (prices.iloc[-1] / prices.iloc[0] - 1) * 100
 
 def calculate_sharpe_ratio(returns: pd.Series, risk_free_rate: float = 0.01) -> float:
     """Calculate Sharpe ratio"""
@@ -14,9 +15,12 @@ def calculate_sharpe_ratio(returns: pd.Series, risk_free_rate: float = 0.01) ->
 
 def calculate_max_drawdown(prices: pd.Series) -> float:
     """Calculate maximum drawdown"""
-    rolling_max = prices.expanding().max()
-    drawdowns = prices / rolling_max - 1.0
-    return drawdowns.min() * 100
+    values = np.asarray(prices, dtype=np.float64)
+    if not np.isfinite(values).any():
+        return np.nan
+    # fmax skips NaNs the way expanding().max() does
+    drawdowns = values / np.fmax.accumulate(values) - 1.0
+    return np.nanmin(drawdowns) * 100
 
 def calculate_volatility(returns: pd.Series) -> float:
     """Calculate annualized volatility"""
@@ -45,21 +49,179 @@ def calculate_risk_metrics(prices: pd.Series, market_prices: pd.Series = None) -
     
     return metrics
 
-def save_trade_log(trades: list, filename: str = 'trade_log.json'):
-    """Save trade history to a JSON file"""
+def calculate_risk_metrics_matrix(prices: pd.DataFrame, market_prices: pd.Series = None,
+                                  risk_free_rate: float = 0.01) -> pd.DataFrame:
+    """
+    ``calculate_risk_metrics`` for every column of a dates x symbols price
+    matrix in one vectorized pass
+
+    Args:
+        prices (pd.DataFrame): Prices, one column per symbol; NaN where a
+            symbol has no bar (before listing, after delisting, gaps);
+            returns that would span a gap are left out
+        market_prices (pd.Series): Benchmark prices for beta
+        risk_free_rate (float): Per-period rate subtracted for the Sharpe ratio
+
+    Returns:
+        pd.DataFrame: One row per symbol with total_return, volatility,
+        max_drawdown, sharpe_ratio (and beta with a benchmark)
+    """
+    values = prices.to_numpy(dtype=np.float64)
+    returns = _matrix_returns(values)
+    valid = ~np.isnan(values)
+    has_data = valid.any(axis=0)
+    columns = np.arange(values.shape[1])
+    first = values[np.argmax(valid, axis=0), columns]
+    last = values[len(values) - 1 - np.argmax(valid[::-1], axis=0), columns]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean, std = _nan_mean_std(returns)
+        metrics = {
+            'total_return': np.where(has_data, (last / first - 1) * 100, np.nan),
+            'volatility': std * np.sqrt(252) * 100,
+            # fmin/fmax skip NaNs, matching expanding().max() and min()
+            'max_drawdown': np.fmin.reduce(values / np.fmax.accumulate(values, axis=0) - 1.0, axis=0) * 100,
+            'sharpe_ratio': np.sqrt(252) * (mean - risk_free_rate) / std,
+        }
+        if market_prices is not None:
+            market = market_prices.pct_change().dropna()
+            aligned = market.reindex(prices.index[1:]).to_numpy(dtype=np.float64)
+            both = ~np.isnan(returns) & ~np.isnan(aligned)[:, None]
+            count = both.sum(axis=0)
+            x = np.where(both, returns, 0.0)
+            y = np.where(both, aligned[:, None], 0.0)
+            covariance = ((x * y).sum(axis=0) - x.sum(axis=0) * y.sum(axis=0) / count) / (count - 1)
+            metrics['beta'] = covariance / market.var()
+    return pd.DataFrame(metrics, index=prices.columns)
+
+def rolling_sharpe_ratio(prices: pd.DataFrame, window: int, risk_free_rate: float = 0.01) -> pd.DataFrame:
+    """
+    Annualized Sharpe ratio of each column's returns over a trailing window,
+    from running sums in O(n) per column regardless of ``window``
+    """
+    returns = _matrix_returns(prices.to_numpy(dtype=np.float64))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean, var = _rolling_mean_var(returns, window)
+        sharpe = np.sqrt(252) * (mean - risk_free_rate) / np.sqrt(var)
+    return pd.DataFrame(_pad_first_row(sharpe), index=prices.index, columns=prices.columns)
+
+def rolling_drawdown(prices: pd.DataFrame, window: int) -> pd.DataFrame:
+    """
+    Percent below the highest price of the trailing ``window`` bars. The
+    window maximum uses the van Herk/Gil-Werman scheme: three passes over
+    the data whatever the window length.
+    """
+    values = prices.to_numpy(dtype=np.float64)
+    peak = _rolling_max(values, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        drawdown = (values / peak - 1.0) * 100
+    return pd.DataFrame(drawdown, index=prices.index, columns=prices.columns)
+
+def rolling_beta(prices: pd.DataFrame, market_prices: pd.Series, window: int) -> pd.DataFrame:
+    """Beta of each column against the benchmark over a trailing window of returns, in O(n)"""
+    returns = _matrix_returns(prices.to_numpy(dtype=np.float64))
+    market = market_prices.reindex(prices.index).to_numpy(dtype=np.float64)
+    market = _matrix_returns(market[:, None])
+    both = ~np.isnan(returns) & ~np.isnan(market)
+    x = np.where(both, returns, 0.0)
+    y = np.where(both, market, 0.0)
+    count = _rolling_sum(both.astype(np.float64), window)
+    sum_x, sum_y = _rolling_sum(x, window), _rolling_sum(y, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariance = (_rolling_sum(x * y, window) - sum_x * sum_y / count) / (count - 1)
+        variance = (_rolling_sum(y * y, window) - sum_y * sum_y / count) / (count - 1)
+        beta = np.where(count >= window, covariance / variance, np.nan)
+    return pd.DataFrame(_pad_first_row(beta), index=prices.index, columns=prices.columns)
+
+def _matrix_returns(values: np.ndarray) -> np.ndarray:
+    """Simple returns down each column, one row shorter than ``values``"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return values[1:] / values[:-1] - 1
+
+def _nan_mean_std(values: np.ndarray) -> tuple:
+    """Column means and sample standard deviations ignoring NaNs"""
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=0)
+    mean = np.where(valid, values, 0.0).sum(axis=0) / count
+    deviations = np.where(valid, values - mean, 0.0)
+    return mean, np.sqrt((deviations * deviations).sum(axis=0) / (count - 1))
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing-window sums down each column as differences of one cumulative sum"""
+    total = np.cumsum(values, axis=0)
+    out = total.copy()
+    out[window:] -= total[:-window]
+    return out
+
+def _rolling_mean_var(values: np.ndarray, window: int) -> tuple:
+    """
+    Trailing-window mean and sample variance; NaN until a window holds
+    ``window`` valid values, as pandas rolling does
+    """
+    valid = ~np.isnan(values)
+    # Centering on the column mean keeps the sum-of-squares difference well conditioned
+    center = np.nanmean(values, axis=0) if len(values) else 0.0
+    x = np.where(valid, values - center, 0.0)
+    count = _rolling_sum(valid.astype(np.float64), window)
+    sum_x = _rolling_sum(x, window)
+    mean = sum_x / count
+    var = np.maximum((_rolling_sum(x * x, window) - sum_x * mean) / (count - 1), 0.0)
+    full = count >= window
+    return np.where(full, mean + center, np.nan), np.where(full, var, np.nan)
+
+def _rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing-window maximum down each column, NaN-skipping, min_periods=1"""
+    n, m = values.shape
+    blocks = -(-n // window)
+    padded = np.full((blocks * window, m), -np.inf)
+    padded[:n] = np.where(np.isnan(values), -np.inf, values)
+    shaped = padded.reshape(blocks, window, m)
+    # Running max from each block's start, and to each block's end
+    prefix = np.maximum.accumulate(shaped, axis=1).reshape(-1, m)
+    suffix = np.maximum.accumulate(shaped[:, ::-1], axis=1)[:, ::-1].reshape(-1, m)
+    out = prefix[:n].copy()
+    start = np.arange(n) - window + 1
+    inside = start > 0
+    out[inside] = np.maximum(suffix[start[inside]], prefix[:n][inside])
+    out[out == -np.inf] = np.nan
+    return out
+
+def _pad_first_row(values: np.ndarray) -> np.ndarray:
+    """Align return-based results with the price rows (the first bar has no return)"""
+    return np.vstack([np.full((1, values.shape[1]), np.nan), values])
+
+def save_trade_log(trades, filename: str = 'trade_log.json'):
+    """
+    Save trade history. A ``.ledger`` filename writes the binary TradeLedger
+    format; anything else writes JSON as before.
+    """
+    if filename.endswith('.ledger'):
+        if not isinstance(trades, TradeLedger):
+            ledger = TradeLedger()
+            ledger.extend(trades)
+            trades = ledger
+        trades.save(filename)
+        return
     with open(filename, 'w') as f:
-        json.dump(trades, f, indent=4, default=str)
+        json.dump(list(trades), f, indent=4, default=str)
 
-def load_trade_log(filename: str = 'trade_log.json') -> list:
-    """Load trade history from a JSON file"""
+def load_trade_log(filename: str = 'trade_log.json'):
+    """
+    Load trade history: a memory-mapped TradeLedger for ``.ledger`` files,
+    a list of dicts for JSON
+    """
+    if filename.endswith('.ledger'):
+        return TradeLedger.load(filename)
     try:
         with open(filename, 'r') as f:
             return json.load(f)
     except FileNotFoundError:
         return []
 
-def calculate_trade_metrics(trades: list) -> dict:
+def calculate_trade_metrics(trades) -> dict:
     """Calculate comprehensive trading metrics"""
+    if isinstance(trades, TradeLedger):
+        return trades.metrics()
     if not trades:
         return {}
     
@@ -0,0 +1,229 @@
+import inspect
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from feature_cache import FeatureStore
+from optimizer import SharedPriceArrays, attach_shared_frames, param_grid, score_signals, _shared_frames
+from strategies import STRATEGIES
+from utils import calculate_returns, calculate_sharpe_ratio, calculate_max_drawdown
+
+# Per worker process: its own indicator store, and full-history signals by
+# (symbol, strategy, params) so overlapping folds slice instead of recompute
+_features = None
+_signal_cache = OrderedDict()
+_SIGNAL_CACHE_ENTRIES = 4096
+
+
+def walk_forward_folds(n_bars: int, train_size: int, test_size: int, step: int = None,
+                       anchored: bool = False) -> list:
+    """
+    Rolling train/test splits over ``n_bars`` bars
+
+    Args:
+        n_bars (int): Length of the history
+        train_size (int): Bars each train window covers (the first one, when anchored)
+        test_size (int): Bars each test window covers; the last one may be shorter
+        step (int): Bars between consecutive folds, defaults to ``test_size``
+        anchored (bool): Start every train window at bar 0 (expanding window)
+
+    Returns:
+        list: (train_start, train_end, test_end) bar positions per fold; the
+        test window is ``[train_end, test_end)``
+    """
+    step = step or test_size
+    folds = []
+    train_end = train_size
+    while train_end < n_bars:
+        train_start = 0 if anchored else train_end - train_size
+        folds.append((train_start, train_end, min(train_end + test_size, n_bars)))
+        train_end += step
+    return folds
+
+
+def _signals(symbol: str, strategy_cls, params: dict) -> np.ndarray:
+    """Signal column of ``strategy_cls(**params)`` over the symbol's whole history"""
+    key = (symbol, strategy_cls, tuple(sorted(params.items())))
+    signal = _signal_cache.get(key)
+    if signal is not None:
+        _signal_cache.move_to_end(key)
+        return signal
+    strategy = strategy_cls(**params)
+    strategy.features = _features
+    signal = strategy.compute(_shared_frames[symbol]).signal
+    _signal_cache[key] = signal
+    while len(_signal_cache) > _SIGNAL_CACHE_ENTRIES:
+        _signal_cache.popitem(last=False)
+    return signal
+
+
+def _fold_task(task: tuple) -> dict:
+    symbol, fold, bounds, strategy_cls, combinations, initial_capital, rank_by = task
+    train_start, train_end, test_end = bounds
+    data = _shared_frames[symbol]
+    close = data['Close'].to_numpy()
+    index = data.index
+
+    best, best_score, best_metrics = None, -np.inf, None
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for params in combinations:
+            signal = _signals(symbol, strategy_cls, params)
+            metrics, _ = score_signals(signal[train_start:train_end], close[train_start:train_end],
+                                       index[train_start:train_end], initial_capital)
+            score = metrics[rank_by]
+            if best is None or score > best_score:
+                best, best_score, best_metrics = params, score, metrics
+        signal = _signals(symbol, strategy_cls, best)
+        test_metrics, equity = score_signals(signal[train_end:test_end], close[train_end:test_end],
+                                             index[train_end:test_end], initial_capital)
+
+    row = {'symbol': symbol, 'fold': fold,
+           'train_start': index[train_start], 'test_start': index[train_end],
+           'test_end': index[test_end - 1], **best}
+    row.update({f'train_{key}': value for key, value in best_metrics.items()})
+    row.update({f'test_{key}': value for key, value in test_metrics.items()})
+    return {'row': row, 'equity': equity.to_numpy()}
+
+
+class WalkForward:
+    """
+    Walk-forward optimization of a strategy's parameters.
+
+    Each symbol's history is split into rolling train/test folds. On every
+    fold the parameter grid is searched on the train window, the best set
+    (by ``rank_by``) is traded on the following test window, and the test
+    windows are chained into one out-of-sample equity curve per symbol.
+
+    Folds are independent and run in a process pool over price arrays
+    placed once in shared memory (see optimizer.SharedPriceArrays). Every
+    worker has its own FeatureStore and keeps the full-history signals of
+    each parameter set it has computed, so the many folds that overlap the
+    same bars slice one computation instead of repeating it. This is exact
+    because every indicator is trailing; strategies with a ``causal``
+    option are run with ``causal=True`` unless the grid says otherwise, so
+    no fold sees bars after its own.
+    """
+
+    def __init__(self, strategy, grid: dict, train_size: int, test_size: int, step: int = None,
+                 anchored: bool = False, initial_capital: float = 10000, processes: int = None,
+                 rank_by: str = 'sharpe_ratio'):
+        """
+        Args:
+            strategy: Strategy class or its short name ('MA', 'RSI', ...)
+            grid (dict): Parameter name -> list of values to try on each train window
+            train_size (int): Bars per train window
+            test_size (int): Bars per test window
+            step (int): Bars between folds, defaults to ``test_size``
+            anchored (bool): Grow the train window from the start instead of rolling it
+            initial_capital (float): Starting capital of every window's backtest
+            processes (int): Worker processes, defaults to all cores; 1 runs in-process
+            rank_by (str): Train metric to maximize
+        """
+        self.strategy_cls = STRATEGIES[strategy.upper()] if isinstance(strategy, str) else strategy
+        grid = dict(grid)
+        if 'causal' in inspect.signature(self.strategy_cls.__init__).parameters:
+            grid.setdefault('causal', [True])
+        self.combinations = param_grid(grid)
+        self.train_size = train_size
+        self.test_size = test_size
+        self.step = step or test_size
+        self.anchored = anchored
+        self.initial_capital = initial_capital
+        self.processes = processes or os.cpu_count()
+        self.rank_by = rank_by
+        self.folds = pd.DataFrame()
+        self.equity = {}
+
+    def run(self, data: dict) -> pd.DataFrame:
+        """
+        Run every fold of every symbol
+
+        Args:
+            data (dict): Symbol -> OHLCV DataFrame
+
+        Returns:
+            pd.DataFrame: One row per (symbol, fold) with the chosen parameters
+            and their train_* and test_* metrics. The stitched out-of-sample
+            equity curves are left in ``self.equity`` (symbol -> pd.Series).
+        """
+        with SharedPriceArrays(data) as shared:
+            tasks = []
+            for symbol in shared.specs:
+                folds = walk_forward_folds(len(data[symbol]), self.train_size, self.test_size,
+                                           self.step, self.anchored)
+                tasks.extend((symbol, fold, bounds, self.strategy_cls, self.combinations,
+                              self.initial_capital, self.rank_by)
+                             for fold, bounds in enumerate(folds))
+            if not tasks:
+                self.folds, self.equity = pd.DataFrame(), {}
+                return self.folds
+
+            if self.processes == 1:
+                _init_worker({})
+                _shared_frames.update({symbol: data[symbol] for symbol in shared.specs})
+                results = [_fold_task(task) for task in tasks]
+                _shared_frames.clear()
+                _signal_cache.clear()
+            else:
+                # Consecutive folds of a symbol go to the same worker, where
+                # they share cached signals
+                chunksize = max(1, len(tasks) // (self.processes * 4))
+                with ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker,
+                                         initargs=(shared.specs,)) as pool:
+                    results = list(pool.map(_fold_task, tasks, chunksize=chunksize))
+
+        self.folds = pd.DataFrame([result['row'] for result in results])
+        self.equity = self._stitch(data, tasks, results)
+        return self.folds
+
+    def _stitch(self, data: dict, tasks: list, results: list) -> dict:
+        """Chain each symbol's test windows, compounding from the previous window's end value"""
+        curves = {}
+        for task, result in zip(tasks, results):
+            symbol, fold, (_, train_end, _) = task[:3]
+            # Overlapping test windows (step < test_size) are cut where the next one starts
+            growth = result['equity'][:self.step] / self.initial_capital
+            index = data[symbol].index[train_end:train_end + len(growth)]
+            curves.setdefault(symbol, []).append((index, growth))
+        equity = {}
+        for symbol, pieces in curves.items():
+            value = self.initial_capital
+            values = []
+            for _, growth in pieces:
+                values.append(value * growth)
+                value = values[-1][-1]
+            equity[symbol] = pd.Series(np.concatenate(values),
+                                       index=pieces[0][0].append([index for index, _ in pieces[1:]]))
+        return equity
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Out-of-sample performance per symbol: total_return, sharpe_ratio and
+        max_drawdown of the stitched curve, mean train and test Sharpe, and
+        how many distinct parameter sets were chosen across folds
+        """
+        rows = []
+        param_columns = [c for c in self.combinations[0] if c in self.folds.columns] if len(self.folds) else []
+        for symbol, equity in self.equity.items():
+            folds = self.folds[self.folds['symbol'] == symbol]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rows.append({
+                    'symbol': symbol,
+                    'folds': len(folds),
+                    'total_return': calculate_returns(equity),
+                    'sharpe_ratio': calculate_sharpe_ratio(equity.pct_change().dropna()),
+                    'max_drawdown': calculate_max_drawdown(equity),
+                    'train_sharpe': folds['train_sharpe_ratio'].mean(),
+                    'test_sharpe': folds['test_sharpe_ratio'].mean(),
+                    'distinct_params': len(folds[param_columns].drop_duplicates()),
+                })
+        return pd.DataFrame(rows)
+
+
+def _init_worker(specs: dict):
+    global _features
+    _features = FeatureStore()
+    _signal_cache.clear()
+    if specs:
+        attach_shared_frames(specs)